@@ -0,0 +1,162 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import hashlib
+import json
+import threading
+import time
+
+from jobs import JobStore
+from wallets import TransactionLane, WalletPool
+
+
+class QueueFull(Exception):
+    """The queue (or one wallet's share of it) is at its depth limit"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different request"""
+
+
+class ActionQueue:
+    """Runs submitted actions in the background on their wallet's lane.
+
+    submit() returns at once with a job, so HTTP latency no longer depends
+    on the chain. Jobs for one wallet run in submission order on that
+    wallet's TransactionLane (shared with the agent's tools, so chat and
+    HTTP actions on a wallet never interleave). At most `max_concurrency`
+    actions are in flight across all wallets. Submissions past
+    `max_depth` queued or running jobs, or `max_depth_per_wallet` for one
+    wallet, raise QueueFull. A repeated idempotency key returns the
+    original job for `idempotency_ttl` seconds instead of running twice;
+    keys are scoped to the wallet, so two wallets never share one.
+    """
+
+    def __init__(self, run: Callable[[Any], Any], wallets: WalletPool, jobs: Optional[JobStore] = None,
+                 max_depth: int = 100, max_depth_per_wallet: int = 20, max_concurrency: int = 4,
+                 idempotency_ttl: float = 86_400.0):
+        self.run = run
+        self.wallets = wallets
+        self.jobs = jobs or JobStore()
+        self.max_depth = max_depth
+        self.max_depth_per_wallet = max_depth_per_wallet
+        self.max_concurrency = max_concurrency
+        self.idempotency_ttl = idempotency_ttl
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._depth: Dict[Optional[str], int] = {}
+        self._futures: Dict[str, Future] = {}
+        # (wallet id, idempotency key) -> (job id, request fingerprint, expiry)
+        self._keys: 'OrderedDict[Tuple[Optional[str], str], Tuple[str, str, float]]' = OrderedDict()
+        # Used when no wallets are configured (e.g. a cassette's replay wallet)
+        self._fallback_lane = TransactionLane('default')
+        self.seconds_per_action = 5.0
+
+    @property
+    def depth(self) -> int:
+        return sum(self._depth.values())
+
+    def _lane(self, wallet_id: Optional[str]) -> TransactionLane:
+        lane = self.wallets.lanes.get(wallet_id)
+        return lane if lane is not None else self._fallback_lane
+
+    def _retry_after(self, queued: int) -> float:
+        # Rough time for the backlog ahead to drain
+        return round(max(1.0, queued * self.seconds_per_action / max(1, self.max_concurrency)), 1)
+
+    def _expire_keys(self, now: float) -> None:
+        while self._keys:
+            key, (_, _, expires_at) = next(iter(self._keys.items()))
+            if expires_at > now:
+                break
+            del self._keys[key]
+
+    def submit(self, wallet_id: Optional[str], payload: Dict[str, Any], request: Any,
+               idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue `request` for `wallet_id`; returns (job, created) where created is False for a replayed key"""
+        wallet_id = wallet_id or self.wallets.default_id
+        fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        key = (wallet_id, idempotency_key)
+        now = time.monotonic()
+
+        with self._lock:
+            if idempotency_key is not None:
+                self._expire_keys(now)
+                existing = self._keys.get(key)
+                if existing is not None:
+                    job_id, existing_fingerprint, _ = existing
+                    if existing_fingerprint != fingerprint:
+                        raise IdempotencyConflict(f"Idempotency key {idempotency_key} was used for a different request")
+                    job = self.jobs.get(job_id)
+                    if job is not None:
+                        return job, False
+
+            wallet_depth = self._depth.get(wallet_id, 0)
+            if self.depth >= self.max_depth:
+                raise QueueFull(f"Action queue is full ({self.max_depth} jobs)", self._retry_after(self.depth))
+            if wallet_depth >= self.max_depth_per_wallet:
+                raise QueueFull(
+                    f"Wallet {wallet_id or 'default'} already has {wallet_depth} queued actions",
+                    self._retry_after(wallet_depth)
+                )
+            self._depth[wallet_id] = wallet_depth + 1
+
+            job = self.jobs.create(kind='aave', status='queued', wallet=wallet_id, queuedAt=time.time(), **payload)
+            if idempotency_key is not None:
+                self._keys[key] = (job['id'], fingerprint, now + self.idempotency_ttl)
+
+        future = self._lane(wallet_id).submit(self._execute, job['id'], wallet_id, request)
+        with self._lock:
+            self._futures[job['id']] = future
+        return job, True
+
+    def _execute(self, job_id: str, wallet_id: Optional[str], request: Any) -> Any:
+        try:
+            with self._slots:
+                started = time.monotonic()
+                self.jobs.update(job_id, status='running', startedAt=time.time())
+                try:
+                    result = self.run(request)
+                except Exception as e:
+                    self.jobs.update(job_id, status='error', error=str(e), finishedAt=time.time())
+                    return None
+                finally:
+                    # Smoothed action time, for Retry-After
+                    self.seconds_per_action = 0.8 * self.seconds_per_action + 0.2 * (time.monotonic() - started)
+                self.jobs.update(job_id, status='confirmed', result=result, finishedAt=time.time())
+                return result
+        finally:
+            with self._lock:
+                self._depth[wallet_id] -= 1
+                if not self._depth[wallet_id]:
+                    del self._depth[wallet_id]
+                self._futures.pop(job_id, None)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once it finishes, or as it stands after `timeout` seconds"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except FutureTimeout:
+                pass
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_wallet = {wallet_id or 'default': depth for wallet_id, depth in self._depth.items()}
+        return {
+            'depth': sum(by_wallet.values()),
+            'maxDepth': self.max_depth,
+            'maxDepthPerWallet': self.max_depth_per_wallet,
+            'maxConcurrency': self.max_concurrency,
+            'running': self.jobs.count('running'),
+            'byWallet': by_wallet,
+            'idempotencyKeys': len(self._keys),
+            'avgActionSeconds': round(self.seconds_per_action, 3),
+        }
@@ -11,6 +11,18 @@ from web3 import Web3
 from web3.exceptions import ContractLogicError
 from cdp.errors import ApiError, UnsupportedAssetError
 from dotenv import load_dotenv
+from contracts import load_abi, AAVE_POOL_METHODS, USDC_METHODS, EIP2612_ABI
+from eth_account.messages import encode_typed_data
+from eth_utils import keccak
+from functools import lru_cache
+import threading
+import time
+from tool_cache import tool_cache
+from metrics import instrument_tools
+from strategies import strategy_engine, describe, RISK_PROFILES
+from indexer import activity_indexer
+from wallets import WalletPool
+from positions import PositionReader
 
 load_dotenv()
 
@@ -21,39 +33,61 @@ WALLET_ID = os.environ.get("WALLET_ID")
 WALLET_DATA = os.environ.get("WALLET_DATA")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
-# Read abi json for aave and usdc
-with open('/Users/jayasudhajayakumaran/coinbase/public/jayasudha/agent-karma/api/abi/aave_v3.json', 'r') as f:
-    aave_abi = json.load(f)
-
-with open('/Users/jayasudhajayakumaran/coinbase/public/jayasudha/agent-karma/api/abi/usdc.json', 'r') as f:
-    usdc_abi = json.load(f)
+# Read abi json for aave and usdc, trimmed to the methods we call
+aave_abi = load_abi('aave_v3.json', AAVE_POOL_METHODS)
+usdc_abi = load_abi('usdc.json', USDC_METHODS)
 
 AAVE_POOL_ADDRESS = "0x07eA79F68B2B3df564D0A34F8e19D9B1e339814b"
 USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
 NETWORK_ID = "base-sepolia"
-
-# Configure CDP with environment variables
-Cdp.configure(API_KEY_NAME, PRIVATE_KEY)
-
-# Create a new wallet on the Base Sepolia testnet
-# You could make this a function for the agent to create a wallet on any network
-# If you want to use Base Mainnet, change Wallet.create() to Wallet.create(network_id="base-mainnet")
-# see https://docs.cdp.coinbase.com/mpc-wallet/docs/wallets for more information
-
-# read the wallet_data as json and get the seed
-wallet_seed = json.loads(WALLET_DATA)[WALLET_ID]
-
-dict = WalletData.from_dict(dict({
-    "wallet_id": WALLET_ID,
-    "seed": wallet_seed['seed']
-}))
-
-agent_wallet = Wallet.import_data(dict)
-address = agent_wallet.default_address
-
-print(f"Agent's wallet imported: {agent_wallet}")
-print(f"Agent's wallet default address: {agent_wallet.default_address.address_id}")
-
+CHAIN_ID = 84532
+
+# Sign an EIP-2612 permit and use supplyWithPermit / repayWithPermit instead of approve + action
+USDC_PERMIT_MODE = os.environ.get("USDC_PERMIT_MODE", "false").lower() in ("1", "true", "yes")
+PERMIT_TTL_SECONDS = int(os.environ.get("PERMIT_TTL_SECONDS", "1800"))
+
+_cdp_configured = False
+_cdp_lock = threading.Lock()
+
+def _import_wallet(wallet_id, wallet_data):
+    """Import one CDP wallet from its WALLET_DATA entry, configuring CDP first if needed"""
+    global _cdp_configured
+    with _cdp_lock:
+        if not _cdp_configured:
+            # Configure CDP with environment variables
+            Cdp.configure(API_KEY_NAME, PRIVATE_KEY)
+            _cdp_configured = True
+
+    # Wallets live on the Base Sepolia testnet
+    # If you want to use Base Mainnet, import a wallet created with Wallet.create(network_id="base-mainnet")
+    # see https://docs.cdp.coinbase.com/mpc-wallet/docs/wallets for more information
+    wallet = Wallet.import_data(WalletData.from_dict({
+        "wallet_id": wallet_id,
+        "seed": wallet_data['seed']
+    }))
+
+    print(f"Agent's wallet imported: {wallet}")
+    print(f"Agent's wallet default address: {wallet.default_address.address_id}")
+    return wallet
+
+# Every wallet in WALLET_DATA, WALLET_ID first; chat sessions and /api/aave callers are routed across them
+wallet_pool = WalletPool(json.loads(WALLET_DATA) if WALLET_DATA else {}, WALLET_ID, _import_wallet)
+
+# Cached tool results belong to the wallet they were read for
+tool_cache.scope = wallet_pool.current_id
+
+def get_wallet():
+    """The current wallet (see wallets.use_wallet), imported on first use rather than at import time"""
+    return wallet_pool.get()
+
+def set_wallet(wallet) -> None:
+    """Use `wallet` as the agent's wallet instead of importing one (e.g. a cassette's replay wallet)"""
+    wallet_pool.set_override(wallet)
+
+def wallet_ready() -> bool:
+    return wallet_pool.ready()
+
+@tool_cache.read_tool('address', ttl=float('inf'))
 def get_default_address():
     """
     Get the address of the agent's wallet.
@@ -62,9 +96,11 @@ def get_default_address():
         str: The agent's wallet address.
     """
 
-    return f"My wallet is {agent_wallet.default_address.address_id} on Ethereum."
+    return f"My wallet is {get_wallet().default_address.address_id} on Ethereum."
 
 # Function to transfer assets
+@tool_cache.invalidates('balance', 'position')
+@wallet_pool.serialized
 def transfer_asset(amount, asset_id, destination_address):
     """
     Transfer an asset to a specific address.
@@ -79,13 +115,13 @@ def transfer_asset(amount, asset_id, destination_address):
     """
     try:
         # Check if we're on Base Mainnet and the asset is USDC for gasless transfer
-        is_mainnet = agent_wallet.network_id == "base-mainnet"
+        is_mainnet = get_wallet().network_id == "base-mainnet"
         is_usdc = asset_id.lower() == "usdc"
         gasless = is_mainnet and is_usdc
 
         # For ETH and USDC, we can transfer directly without checking balance
         if asset_id.lower() in ["eth", "usdc"]:
-            transfer = agent_wallet.transfer(amount,
+            transfer = get_wallet().transfer(amount,
                                              asset_id,
                                              destination_address,
                                              gasless=gasless)
@@ -95,14 +131,14 @@ def transfer_asset(amount, asset_id, destination_address):
 
         # For other assets, check balance first
         try:
-            balance = agent_wallet.balance(asset_id)
+            balance = get_wallet().balance(asset_id)
         except UnsupportedAssetError:
             return f"Error: The asset {asset_id} is not supported on this network. It may have been recently deployed. Please try again in about 30 minutes."
 
         if balance < amount:
             return f"Insufficient balance. You have {balance} {asset_id}, but tried to transfer {amount}."
 
-        transfer = agent_wallet.transfer(amount, asset_id, destination_address)
+        transfer = get_wallet().transfer(amount, asset_id, destination_address)
         transfer.wait()
         return f"Transferred {amount} {asset_id} to {destination_address}"
     except Exception as e:
@@ -110,6 +146,7 @@ def transfer_asset(amount, asset_id, destination_address):
 
 
 # Function to get the balance of a specific asset
+@tool_cache.read_tool('balance')
 def get_balance(asset_id):
     """
     Get the balance of a specific asset in the agent's wallet.
@@ -120,11 +157,13 @@ def get_balance(asset_id):
     Returns:
         str: A message showing the current balance of the specified asset
     """
-    balance = agent_wallet.balance(asset_id)
+    balance = get_wallet().balance(asset_id)
     return f"Current balance of {asset_id}: {balance}"
 
 
 # Function to request ETH from the faucet (testnet only)
+@tool_cache.invalidates('balance')
+@wallet_pool.serialized
 def request_eth_from_faucet():
     """
     Request ETH from the Base Sepolia testnet faucet.
@@ -132,10 +171,10 @@ def request_eth_from_faucet():
     Returns:
         str: Status message about the faucet request
     """
-    if agent_wallet.network_id == "base-mainnet":
+    if get_wallet().network_id == "base-mainnet":
         return "Error: The faucet is only available on Base Sepolia testnet."
 
-    faucet_tx = agent_wallet.faucet()
+    faucet_tx = get_wallet().faucet()
     return f"Requested ETH from faucet. Transaction: {faucet_tx}"
 
 # Aave pool deployed on base sepolia
@@ -143,6 +182,9 @@ AAVE_POOL_ADDRESS = "0x07eA79F68B2B3df564D0A34F8e19D9B1e339814b"
 # USDC deployed on base sepolia
 USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
 
+position_reader = PositionReader()
+
+@tool_cache.read_tool('position')
 def get_position():
     """
     Get agent's position in Aave and USDC balance
@@ -151,89 +193,217 @@ def get_position():
         dict: User's position data including collateral, debt, and USDC balance
     """
     try:
-        # Get user account data from Aave
-        account_data = SmartContract.read(
-            network_id=NETWORK_ID,
-            contract_address=AAVE_POOL_ADDRESS,
-            method="getUserAccountData",
-            args={"user": "0xAbA75B6adC1314C8707Cd357DC256e33C6006431"},
-            abi=aave_abi
-        )
+        address = get_wallet().default_address.address_id
 
-        # Get USDC balance
-        usdc_balance = SmartContract.read(
-            network_id=NETWORK_ID,
-            contract_address=USDC_ADDRESS,
-            method="balanceOf",
-            args={"account": "0xAbA75B6adC1314C8707Cd357DC256e33C6006431"},
-            abi=usdc_abi
-        )
+        # Aave account data and USDC balance in one Multicall, read at the same block
+        block_number, (position,) = position_reader.read([address])
+        if position is None:
+            raise Exception(f"Position read failed for {address}")
 
-        print("address:", address.address_id)
-        print("account_data:", account_data)
-
-        return {
-            "totalCollateralBase": account_data[0],
-            "totalDebtBase": account_data[1],
-            "availableBorrowsBase": account_data[2],
-            "currentLiquidationThreshold": account_data[3],
-            "ltv": account_data[4],
-            "healthFactor": account_data[5],
-            "usdcBalance": usdc_balance
-        }
+        print("address:", address)
+        print("position:", position)
+
+        return {**position.to_dict(), "blockNumber": block_number}
 
     except Exception as e:
         print(f"Error calling getUserAccountData: {e}")
         raise Exception(status_code=500, detail=str(e))
 
-# Supply USDC to Aave
-def supply_usdc_to_aave(amount):
+def get_reputation(address: str = None):
     """
-    Supply USDC to Aave after approving the spend
-    
+    Get the onchain reputation of an address from its indexed Aave and USDC activity
+
     Args:
-        amount (str): Amount to supply
-        
+        address (str): Address to score; defaults to the agent's own address
+
     Returns:
-        dict: Transaction hash of the supply operation
+        dict: Score from 0 to 100, its components and the address's action counts
     """
-    amount_to_supply = parse_units(amount, 6)
-
-    # First approve USDC spend
-    approve_invocation = agent_wallet.invoke_contract(
+    if address is None:
+        address = get_wallet().default_address.address_id
+    if not Web3.is_address(address):
+        return {"error": f"{address} is not a valid address"}
+
+    result = activity_indexer.scores([address])
+    if result['indexedBlock'] is None:
+        return {"error": "The activity indexer hasn't indexed any blocks yet"}
+    return {"indexedBlock": result['indexedBlock'], **result['scores'][0]}
+
+# Last known USDC allowance of the agent towards the Aave pool, in base units
+_usdc_allowance = {}
+_usdc_allowance_lock = threading.Lock()
+
+def _get_usdc_allowance(owner):
+    with _usdc_allowance_lock:
+        if owner in _usdc_allowance:
+            return _usdc_allowance[owner]
+
+    allowance = int(SmartContract.read(
+        network_id=NETWORK_ID,
+        contract_address=USDC_ADDRESS,
+        method="allowance",
+        args={"owner": owner, "spender": AAVE_POOL_ADDRESS},
+        abi=usdc_abi
+    ))
+    with _usdc_allowance_lock:
+        _usdc_allowance[owner] = allowance
+    return allowance
+
+def _set_usdc_allowance(owner, value):
+    with _usdc_allowance_lock:
+        if value is None:
+            _usdc_allowance.pop(owner, None)
+        else:
+            _usdc_allowance[owner] = max(0, value)
+
+def _ensure_usdc_allowance(owner, amount):
+    """Approve the Aave pool to spend `amount` USDC unless the current allowance already covers it"""
+    if _get_usdc_allowance(owner) >= amount:
+        print('USDC allowance already covers', amount, 'for address:', owner)
+        return
+
+    approve_invocation = get_wallet().invoke_contract(
         contract_address=USDC_ADDRESS,
         method="approve",
         args={
             "spender": AAVE_POOL_ADDRESS,
-            "value": amount_to_supply
+            "value": str(amount)
         },
         abi=usdc_abi
     )
-    
-    approve_result = approve_invocation.wait()
-    print('USDC spend approved:', approve_result, ' for address:', agent_wallet.default_address.address_id)
 
-    # Supply to Aave
-    print('Attempting to supply USDC to Aave')
-    supply_invocation = agent_wallet.invoke_contract(
-        contract_address=AAVE_POOL_ADDRESS,
-        method="supply",
-        args={
-            "asset": USDC_ADDRESS,
-            "amount": amount_to_supply,
-            "onBehalfOf": agent_wallet.default_address.address_id,
-            "referralCode": "0"
+    approve_result = approve_invocation.wait()
+    _set_usdc_allowance(owner, amount)
+    print('USDC spend approved:', approve_result, ' for address:', owner)
+
+@lru_cache(maxsize=None)
+def _usdc_permit_domain():
+    # Token name and version never change, so read them once
+    name = SmartContract.read(network_id=NETWORK_ID, contract_address=USDC_ADDRESS, method="name", args={}, abi=EIP2612_ABI)
+    version = SmartContract.read(network_id=NETWORK_ID, contract_address=USDC_ADDRESS, method="version", args={}, abi=EIP2612_ABI)
+    return {
+        "name": name,
+        "version": version,
+        "chainId": CHAIN_ID,
+        "verifyingContract": USDC_ADDRESS
+    }
+
+def _sign_usdc_permit(owner, amount):
+    """Sign an EIP-2612 permit letting the Aave pool pull `amount` USDC, returned as pool call args"""
+    nonce = int(SmartContract.read(
+        network_id=NETWORK_ID,
+        contract_address=USDC_ADDRESS,
+        method="nonces",
+        args={"owner": owner},
+        abi=EIP2612_ABI
+    ))
+    deadline = int(time.time()) + PERMIT_TTL_SECONDS
+
+    typed_data = {
+        "types": {
+            "EIP712Domain": [
+                {"name": "name", "type": "string"},
+                {"name": "version", "type": "string"},
+                {"name": "chainId", "type": "uint256"},
+                {"name": "verifyingContract", "type": "address"}
+            ],
+            "Permit": [
+                {"name": "owner", "type": "address"},
+                {"name": "spender", "type": "address"},
+                {"name": "value", "type": "uint256"},
+                {"name": "nonce", "type": "uint256"},
+                {"name": "deadline", "type": "uint256"}
+            ]
         },
-        abi=aave_abi
-    )
+        "primaryType": "Permit",
+        "domain": _usdc_permit_domain(),
+        "message": {
+            "owner": owner,
+            "spender": AAVE_POOL_ADDRESS,
+            "value": amount,
+            "nonce": nonce,
+            "deadline": deadline
+        }
+    }
+
+    signable = encode_typed_data(full_message=typed_data)
+    payload = keccak(b"\x19" + signable.version + signable.header + signable.body).hex()
+    payload_signature = get_wallet().default_address.sign_payload(payload.removeprefix("0x"))
+    signature = payload_signature.signature or payload_signature.wait().signature
+    signature = bytes.fromhex(signature.removeprefix("0x"))
+
+    v = signature[64]
+    return {
+        "deadline": str(deadline),
+        "permitV": str(v + 27 if v < 27 else v),
+        "permitR": "0x" + signature[:32].hex(),
+        "permitS": "0x" + signature[32:64].hex()
+    }
+
+# Supply USDC to Aave
+@tool_cache.invalidates('balance', 'position')
+@wallet_pool.serialized
+def supply_usdc_to_aave(amount):
+    """
+    Supply USDC to Aave, approving the spend only when needed
+    
+    Args:
+        amount (str): Amount to supply
+        
+    Returns:
+        dict: Transaction hash of the supply operation
+    """
+    amount_to_supply = parse_units(amount, 6)
+    owner = get_wallet().default_address.address_id
+
+    if USDC_PERMIT_MODE:
+        # Single transaction: the pool consumes a signed permit instead of a prior approve
+        print('Attempting to supply USDC to Aave with permit')
+        supply_invocation = get_wallet().invoke_contract(
+            contract_address=AAVE_POOL_ADDRESS,
+            method="supplyWithPermit",
+            args={
+                "asset": USDC_ADDRESS,
+                "amount": amount_to_supply,
+                "onBehalfOf": owner,
+                "referralCode": "0",
+                **_sign_usdc_permit(owner, int(amount_to_supply))
+            },
+            abi=aave_abi
+        )
+    else:
+        _ensure_usdc_allowance(owner, int(amount_to_supply))
+
+        # Supply to Aave
+        print('Attempting to supply USDC to Aave')
+        supply_invocation = get_wallet().invoke_contract(
+            contract_address=AAVE_POOL_ADDRESS,
+            method="supply",
+            args={
+                "asset": USDC_ADDRESS,
+                "amount": amount_to_supply,
+                "onBehalfOf": owner,
+                "referralCode": "0"
+            },
+            abi=aave_abi
+        )
     
     print('Wait on supplying USDC to Aave')
-    supply_result = supply_invocation.wait()
+    try:
+        supply_result = supply_invocation.wait()
+    except Exception:
+        _set_usdc_allowance(owner, None)
+        raise
     print('USDC supplied to Aave:', supply_result)
 
+    # The permit resets the allowance to the amount and the supply spends it
+    _set_usdc_allowance(owner, 0 if USDC_PERMIT_MODE else _get_usdc_allowance(owner) - int(amount_to_supply))
+
     return {"txHash": supply_result.transaction_hash}
 
 # Borrow USDC from Aave
+@tool_cache.invalidates('balance', 'position')
+@wallet_pool.serialized
 def borrow_usdc_from_aave(amount):
     """
     Borrow USDC from Aave
@@ -246,7 +416,7 @@ def borrow_usdc_from_aave(amount):
     """
     try:
         amount_to_borrow = parse_units(amount, 6)
-        borrow_invocation = agent_wallet.invoke_contract(
+        borrow_invocation = get_wallet().invoke_contract(
             contract_address=AAVE_POOL_ADDRESS,
             method="borrow",
             args={
@@ -254,7 +424,7 @@ def borrow_usdc_from_aave(amount):
                 "amount": amount_to_borrow,
                 "interestRateMode": "2",  # Variable rate
                 "referralCode": "0",
-                "onBehalfOf": address.address_id
+                "onBehalfOf": get_wallet().default_address.address_id
             },
             abi=aave_abi
         )
@@ -269,6 +439,8 @@ def borrow_usdc_from_aave(amount):
         raise Exception(status_code=500, detail=str(e))
 
 # Withdraw USDC from Aave
+@tool_cache.invalidates('balance', 'position')
+@wallet_pool.serialized
 def withdraw_usdc_from_aave(amount):
     """
     Withdraw USDC from Aave
@@ -282,13 +454,13 @@ def withdraw_usdc_from_aave(amount):
     try:
         amount_to_withdraw = parse_units(amount, 6)
 
-        withdraw_invocation = agent_wallet.invoke_contract(
+        withdraw_invocation = get_wallet().invoke_contract(
             contract_address=AAVE_POOL_ADDRESS,
             method="withdraw",
             args={
                 "asset": USDC_ADDRESS,
                 "amount": amount_to_withdraw,
-                "to": address.address_id
+                "to": get_wallet().default_address.address_id
             },
             abi=aave_abi
         )
@@ -304,6 +476,8 @@ def withdraw_usdc_from_aave(amount):
 
 
 # Repay USDC loan to Aave
+@tool_cache.invalidates('balance', 'position')
+@wallet_pool.serialized
 def repay_usdc_to_aave(amount):
     """
     Repay USDC loan to Aave
@@ -316,37 +490,49 @@ def repay_usdc_to_aave(amount):
     """
     try:
         amount_to_repay = parse_units(amount, 6)
+        owner = get_wallet().default_address.address_id
+
+        if USDC_PERMIT_MODE:
+            # Repay in one transaction with a signed permit
+            repay_invocation = get_wallet().invoke_contract(
+                contract_address=AAVE_POOL_ADDRESS,
+                method="repayWithPermit",
+                args={
+                    "asset": USDC_ADDRESS,
+                    "amount": amount_to_repay,
+                    "interestRateMode": "2",  # Variable rate
+                    "onBehalfOf": owner,
+                    **_sign_usdc_permit(owner, int(amount_to_repay))
+                },
+                abi=aave_abi
+            )
+        else:
+            # Approve USDC spend only if the allowance doesn't cover it
+            _ensure_usdc_allowance(owner, int(amount_to_repay))
+
+            # Repay the loan
+            repay_invocation = get_wallet().invoke_contract(
+                contract_address=AAVE_POOL_ADDRESS,
+                method="repay",
+                args={
+                    "asset": USDC_ADDRESS,
+                    "amount": amount_to_repay,
+                    "interestRateMode": "2",  # Variable rate
+                    "onBehalfOf": owner
+                },
+                abi=aave_abi
+            )
 
-        # First approve USDC spend
-        approve_invocation = agent_wallet.invoke_contract(
-            contract_address=USDC_ADDRESS,
-            method="approve",
-            args={
-                "spender": AAVE_POOL_ADDRESS,
-                "value": amount_to_repay
-            },
-            abi=usdc_abi
-        )
-        
-        approve_result = approve_invocation.wait()
-        print('USDC spend approved for repayment:', approve_result)
-
-        # Repay the loan
-        repay_invocation = agent_wallet.invoke_contract(
-            contract_address=AAVE_POOL_ADDRESS,
-            method="repay",
-            args={
-                "asset": USDC_ADDRESS,
-                "amount": amount_to_repay,
-                "interestRateMode": "2",  # Variable rate
-                "onBehalfOf": address.address_id
-            },
-            abi=aave_abi
-        )
-
-        repay_result = repay_invocation.wait()
+        try:
+            repay_result = repay_invocation.wait()
+        except Exception:
+            _set_usdc_allowance(owner, None)
+            raise
         print('USDC repaid to Aave:', repay_result)
 
+        # Repay may pull less than the amount when the debt is smaller, so this errs low
+        _set_usdc_allowance(owner, 0 if USDC_PERMIT_MODE else _get_usdc_allowance(owner) - int(amount_to_repay))
+
         return {"success": True, "txHash": repay_result.transaction_hash}
 
     except Exception as e:
@@ -357,9 +543,28 @@ def parse_units(amount: str, decimals: int) -> str:
     """Convert human readable amount to wei"""
     return str(int(Decimal(amount) * Decimal(10 ** decimals)))
 
+def _ranked_strategy(profile, fallback):
+    """Top strategies for `profile` from live reserve data, or one of the fallback picks if the chain can't be read"""
+    label = RISK_PROFILES[profile].label
+    try:
+        ranked = strategy_engine.strategies(profile)
+    except Exception as e:
+        print(f"Error ranking {profile} strategies: {e}")
+        ranked = None
+
+    if not ranked or not ranked['strategies']:
+        return f"I have selected {random.choice(fallback)} as for you as a {label} investment."
+
+    lines = [f"{s['rank']}. {describe(s)}" for s in ranked['strategies']]
+    return (
+        f"Top {label} strategies across {ranked['markets']} live markets (block {ranked['blockNumber']}):\n"
+        + "\n".join(lines)
+    )
+
+@tool_cache.read_tool('reserves')
 def get_bearish_strategy(): 
     """
-    Get a bearish strategy for the market
+    Get a bearish strategy for the market, ranked from live Aave and Compound rates
     
     Returns:
         str: A bearish strategy
@@ -369,14 +574,12 @@ def get_bearish_strategy():
         "Morpho USDC market (Highly variable - 4-12.31% APY)",
     ]
 
-    # Find a random strategy
-    random_strategy = random.choice(strategies)
-
-    return f"I have selected {random_strategy} as for you as a Bearish investment."
+    return _ranked_strategy('bearish', strategies)
 
+@tool_cache.read_tool('reserves')
 def get_buffet_strategy():
     """
-    Get a buffet strategy for the market
+    Get a buffet strategy for the market, ranked from live Aave and Compound rates
     
     Returns:
         str: A buffet strategy
@@ -388,14 +591,12 @@ def get_buffet_strategy():
         "Supply USDC to Aave lending pool, borrow 10% and supply back to Aave"
     ]
 
-    # Find a random strategy
-    random_strategy = random.choice(strategies)
-
-    return f"I have selected {random_strategy} as for you as a Buffet investment."
+    return _ranked_strategy('buffet', strategies)
 
+@tool_cache.read_tool('reserves')
 def get_bullish_strategy():
     """
-    Get a bullish strategy for the market
+    Get a bullish strategy for the market, ranked from live Aave and Compound rates
     
     Returns:
         str: A bullish strategy
@@ -406,14 +607,12 @@ def get_bullish_strategy():
         "Add stETH to Definitive hyperstaking (14.44%)",
     ]
 
-    # Find a random strategy
-    random_strategy = random.choice(strategies)
-
-    return f"I have selected {random_strategy} as for you as a Bullish investment."
+    return _ranked_strategy('bullish', strategies)
 
+@tool_cache.read_tool('reserves')
 def get_moon_strategy():
     """
-    Get a moon strategy for the market
+    Get a moon strategy for the market, ranked from live Aave and Compound rates
     
     Returns:
         str: A moon strategy
@@ -425,10 +624,7 @@ def get_moon_strategy():
         "Deposit USDC into Hyperliquid (Appchain), Aevo (Base) or Drift (Solana), 2-5x leveraged on BTC"
     ]
 
-    # Find a random strategy
-    random_strategy = random.choice(strategies)
-
-    return f"I have selected {random_strategy} as for you as a Moon investment."
+    return _ranked_strategy('moon', strategies)
 
 # Create the Reputation Agent with all available functions
 reputation_agent = Agent(
@@ -445,6 +641,7 @@ reputation_agent = Agent(
         withdraw_usdc_from_aave,
         repay_usdc_to_aave,
         get_position,
+        get_reputation,
         get_bearish_strategy,
         get_buffet_strategy,
         get_bullish_strategy,
@@ -452,4 +649,5 @@ reputation_agent = Agent(
     ],
 )
 
-
+# Time every tool call the agent makes, for /metrics
+instrument_tools(reputation_agent)
@@ -1,9 +1,22 @@
-from typing import Dict, Any
-from web3 import Web3
+from typing import Dict, Any, List
+from web3 import Web3, AsyncWeb3
+import asyncio
+import weakref
 from decimal import Decimal
 import json
 import os
 from dotenv import load_dotenv
+from multicall import Multicall
+from contracts import ContractRegistry
+from snapshot_cache import BlockSnapshotCache
+from nonces import nonce_manager
+from jobs import JobStore
+from receipts import ReceiptWatcher
+from fees import FeeOracle
+from metrics import instrument_web3
+
+# Fallback when a supply can't be estimated (e.g. missing approval); the old hardcoded limit
+DEFAULT_LEND_GAS = 300000
 
 load_dotenv()
 
@@ -50,12 +63,19 @@ CHAINLINK_ABI = json.loads('''[
     }
 ]''')
 
+def _raw_transaction(signed_tx) -> bytes:
+    # web3 v7 renamed rawTransaction to raw_transaction
+    return getattr(signed_tx, 'raw_transaction', None) or signed_tx.rawTransaction
+
 class LendingAgent:
     def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(os.getenv('BASE_SEPOLIA_RPC')))
+        self.rpc_url = os.getenv('BASE_SEPOLIA_RPC')
+        self.w3 = self._connect()
         self.private_key = os.getenv('PRIVATE_KEY')
         self.account = self.w3.eth.account.from_key(self.private_key)
         self.wallet_address = self.account.address
+        # Shared per signing account, so concurrent lends never race for a nonce
+        self.nonces = nonce_manager(self.wallet_address)
         
         # Contract addresses
         self.price_feeds = {
@@ -78,109 +98,387 @@ class LendingAgent:
             }
         }
 
+        self.multicall = Multicall(self.w3)
+
+        self.fees = FeeOracle(self.w3)
+        self.fee_speed = os.getenv('LENDING_FEE_SPEED', 'medium')
+
+        # lend returns right away; one background watcher records every receipt on its job
+        self.jobs = JobStore()
+        self.receipts = ReceiptWatcher(
+            self._background_w3(),
+            self.jobs,
+            poll_interval=float(os.getenv('RECEIPT_POLL_INTERVAL', '1'))
+        )
+
+        # Pool data only changes once per block, so serve it from a block-keyed snapshot
+        self.pool_cache = BlockSnapshotCache(
+            fresh_for=float(os.getenv('POOLS_CACHE_FRESH_FOR', '2')),
+            max_staleness=float(os.getenv('POOLS_CACHE_MAX_STALENESS', '30'))
+        )
+
+        # Build contract objects and pool call data once; none of it changes per request
+        self.registry = ContractRegistry(self.w3)
+        for asset, pool_info in self.lending_pools.items():
+            self.registry.register(f'feed:{asset}', self.price_feeds[asset], CHAINLINK_ABI)
+            self.registry.register(f'pool:{asset}', pool_info['address'], COMPOUND_ABI)
+        self._pool_calls = {
+            asset: [
+                self.registry.call(f'feed:{asset}', 'latestAnswer'),
+                self.registry.call(f'pool:{asset}', 'getSupplyRate'),
+                self.registry.call(f'pool:{asset}', 'totalSupply'),
+            ]
+            for asset in self.lending_pools
+        }
+
+    def _connect(self):
+        return instrument_web3(Web3(Web3.HTTPProvider(self.rpc_url)))
+
+    def _background_w3(self):
+        """Blocking client for the background watcher threads"""
+        return self.w3
+
+    def warm_up(self) -> None:
+        """Make the first RPC round trips (chain id, feed decimals) before the first request needs them"""
+        w3 = self._background_w3()
+        self.registry.immutable('chain_id', lambda: w3.eth.chain_id)
+        for feed_address in self.price_feeds.values():
+            feed = w3.eth.contract(address=self.registry.checksum(feed_address), abi=CHAINLINK_ABI)
+            self.registry.immutable(('decimals', feed.address), feed.functions.decimals().call)
+
+    def get_feed_decimals(self, asset: str) -> int:
+        """Chainlink feed decimals, fetched once and cached for the life of the process"""
+        return self.registry.feed_decimals(self.price_feeds[asset])
+
     def get_price(self, asset: str) -> float:
         """Get current price from Chainlink price feeds"""
         try:
-            price_feed = self.w3.eth.contract(
-                address=self.w3.to_checksum_address(self.price_feeds[asset]),
-                abi=CHAINLINK_ABI
-            )
-            
+            price_feed = self.registry.get(f'feed:{asset}')
+
             latest_price = price_feed.functions.latestAnswer().call()
-            decimals = price_feed.functions.decimals().call()
+            decimals = self.get_feed_decimals(asset)
             
             return float(latest_price) / (10 ** decimals)
         except Exception as e:
             print(f"Error getting price for {asset}: {str(e)}")
             return 0
 
-    async def get_pools(self) -> Dict[str, Any]:
-        """Get all available lending pools and their current rates"""
+    def _build_pool(self, asset: str, price: float, supply_rate, total_supply: int) -> Dict[str, Any]:
+        """Turn raw on-chain values into a pool record"""
+        pool_info = self.lending_pools[asset]
+
+        if supply_rate is None:
+            print(f"Error calculating APY for {asset}: getSupplyRate call failed")
+            apy = 0
+        else:
+            # Convert supply rate to APY
+            blocks_per_year = 2_102_400  # ~2s blocks
+            apy = ((1 + (supply_rate / 1e18) / blocks_per_year) ** blocks_per_year - 1) * 100
+
+        tvl = float(total_supply) * price / (10 ** pool_info['decimals'])
+
+        return {
+            'asset': asset,
+            'apy': round(apy, 2),
+            'protocol': 'Compound III',
+            'available': float(total_supply) / (10 ** pool_info['decimals']),
+            'tokenAddress': pool_info['token'],
+            'poolAddress': pool_info['address'],
+            'priceUSD': price,
+            'riskLevel': pool_info['risk_level'],
+            'tvl': round(tvl, 2)
+        }
+
+    def _collect_pools(self, assets: List[str], results: list, decimals: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Build pool records from Multicall results laid out as `_pool_calls` for `assets`"""
         pools = []
-        
-        for asset, pool_info in self.lending_pools.items():
+
+        for i, asset in enumerate(assets):
+            answer, supply_rate, total_supply = results[i * 3:(i + 1) * 3]
             try:
-                # Get price from Chainlink
-                price = self.get_price(asset)
-                if price == 0:
+                if not answer.success or answer.value == 0 or asset not in decimals:
                     print(f"Skipping {asset} due to price feed error")
                     continue
-                
-                # Get pool data from Compound
-                pool_contract = self.w3.eth.contract(
-                    address=self.w3.to_checksum_address(pool_info['address']),
-                    abi=COMPOUND_ABI
-                )
-                
-                try:
-                    # Get supply rate (convert to APY)
-                    supply_rate = pool_contract.functions.getSupplyRate().call()
-                    blocks_per_year = 2_102_400  # ~2s blocks
-                    apy = ((1 + (supply_rate / 1e18) / blocks_per_year) ** blocks_per_year - 1) * 100
-                except Exception as e:
-                    print(f"Error calculating APY for {asset}: {str(e)}")
-                    apy = 0
-                
-                # Get total supply and TVL
-                total_supply = pool_contract.functions.totalSupply().call()
-                tvl = float(total_supply) * price / (10 ** pool_info['decimals'])
-                
-                pools.append({
-                    'asset': asset,
-                    'apy': round(apy, 2),
-                    'protocol': 'Compound III',
-                    'available': float(total_supply) / (10 ** pool_info['decimals']),
-                    'tokenAddress': pool_info['token'],
-                    'poolAddress': pool_info['address'],
-                    'priceUSD': price,
-                    'riskLevel': pool_info['risk_level'],
-                    'tvl': round(tvl, 2)
-                })
+                if not total_supply.success:
+                    print(f"Skipping {asset}: totalSupply call failed")
+                    continue
+
+                price = float(answer.value) / (10 ** decimals[asset])
+                pools.append(self._build_pool(
+                    asset,
+                    price,
+                    supply_rate.value if supply_rate.success else None,
+                    total_supply.value
+                ))
             except Exception as e:
                 print(f"Error getting pool data for {asset}: {str(e)}")
                 continue
-        
+
+        return pools
+
+    async def get_pools(self, block_identifier='latest') -> Dict[str, Any]:
+        """Get all available lending pools, served from the block snapshot cache"""
+        if block_identifier != 'latest':
+            return self.fetch_pools(block_identifier)
+        return self.pool_cache.get(self._load_pools, self.get_block_number)
+
+    def get_block_number(self) -> int:
+        return self.w3.eth.block_number
+
+    def _load_pools(self):
+        pools = self.fetch_pools()
+        return pools['blockNumber'], pools
+
+    def fetch_pools(self, block_identifier='latest') -> Dict[str, Any]:
+        """Read all available lending pools and their current rates in one batched read"""
+        assets = list(self.lending_pools)
+        calls = [call for asset in assets for call in self._pool_calls[asset]]
+        batch = self.multicall.aggregate(calls, block_identifier=block_identifier)
+
+        decimals = {}
+        for asset in assets:
+            try:
+                decimals[asset] = self.get_feed_decimals(asset)
+            except Exception as e:
+                print(f"Error getting feed decimals for {asset}: {str(e)}")
+
+        pools = self._collect_pools(assets, batch.results, decimals)
         if not pools:
             raise Exception("No pools could be loaded")
-            
-        return {'pools': pools}
+
+        return {'pools': pools, 'blockNumber': batch.block_number}
+
+    def _track_lend(self, asset: str, pool_address: str, tx_hash) -> Dict[str, Any]:
+        """Record a submitted lend as a pending job and hand its receipt to the watcher"""
+        tx_hash = Web3.to_hex(tx_hash)
+        job = self.jobs.create(kind='lend', asset=asset, poolAddress=pool_address, txHash=tx_hash)
+        self.receipts.track(tx_hash, job['id'])
+
+        return {
+            'success': True,
+            'jobId': job['id'],
+            'status': job['status'],
+            'txHash': tx_hash
+        }
 
     async def lend(self, asset: str, token_amount: float, pool_address: str) -> Dict[str, Any]:
-        """Execute lending transaction"""
+        """Submit a lending transaction; its receipt is tracked in the background"""
         try:
-            pool_contract = self.w3.eth.contract(
-                address=self.w3.to_checksum_address(pool_address),
-                abi=COMPOUND_ABI
-            )
-            
+            pool_contract = self.registry.contract(pool_address, COMPOUND_ABI)
+
             # Convert amount to Wei
             amount_wei = self.w3.to_wei(token_amount, 'ether')
             
-            # Build transaction
-            tx = pool_contract.functions.supply(
-                self.w3.to_checksum_address(self.lending_pools[asset]['token']),
+            supply = pool_contract.functions.supply(
+                self.registry.checksum(self.lending_pools[asset]['token']),
                 amount_wei
-            ).build_transaction({
-                'from': self.wallet_address,
-                'gas': 300000,
-                'maxFeePerGas': self.w3.eth.gas_price * 2,
-                'maxPriorityFeePerGas': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # Wait for transaction receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            )
+            fees = self.fees.suggest(self.fee_speed)
+            chain_id = self.registry.immutable('chain_id', lambda: self.w3.eth.chain_id)
+            try:
+                gas = self.fees.estimate_gas(supply, {'from': self.wallet_address})
+            except Exception as e:
+                print(f"Gas estimate failed for {asset} supply, using default: {str(e)}")
+                gas = DEFAULT_LEND_GAS
+
+            def submit(nonce):
+                # Build transaction
+                tx = supply.build_transaction({
+                    'from': self.wallet_address,
+                    'gas': gas,
+                    'chainId': chain_id,
+                    'nonce': nonce,
+                    **fees
+                })
+
+                # Sign and send transaction
+                signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
+                return self.w3.eth.send_raw_transaction(_raw_transaction(signed_tx))
+
+            tx_hash = self.nonces.send(
+                submit,
+                lambda: self.w3.eth.get_transaction_count(self.wallet_address, 'pending')
+            )
+
+            return self._track_lend(asset, pool_address, tx_hash)
             
+        except Exception as e:
             return {
-                'success': True,
-                'transaction_hash': tx_hash.hex(),
-                'block_number': receipt['blockNumber']
+                'success': False,
+                'error': str(e)
             }
-            
+
+
+class AsyncLendingAgent(LendingAgent):
+    """LendingAgent on AsyncWeb3: pool reads fan out concurrently instead of blocking the worker.
+
+    By default every pool goes into one Multicall, whose getBlockNumber gives
+    the block. With `pools_per_batch` set, pools are split into batches of
+    that size, pinned to one block and read together under a concurrency
+    limit with a per-call timeout.
+    """
+
+    def __init__(self, max_concurrency: int = None, call_timeout: float = None, pools_per_batch: int = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('LENDING_RPC_CONCURRENCY', '8'))
+        self.call_timeout = call_timeout or float(os.getenv('LENDING_RPC_TIMEOUT', '10'))
+        # 0 reads every pool in a single batch
+        self.pools_per_batch = pools_per_batch or int(os.getenv('LENDING_POOLS_PER_BATCH', '0'))
+        # asyncio primitives are bound to one loop, and Flask runs each async view in its own
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._sync_w3 = None
+        super().__init__()
+
+    def _connect(self):
+        return instrument_web3(AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(
+            self.rpc_url,
+            request_kwargs={'timeout': self.call_timeout}
+        )))
+
+    def _background_w3(self):
+        if self._sync_w3 is None:
+            self._sync_w3 = instrument_web3(Web3(Web3.HTTPProvider(self.rpc_url)))
+        return self._sync_w3
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _rpc(self, awaitable):
+        """Await one RPC under the concurrency limit and per-call timeout"""
+        async with self._semaphore():
+            return await asyncio.wait_for(awaitable, timeout=self.call_timeout)
+
+    async def get_feed_decimals(self, asset: str) -> int:
+        """Chainlink feed decimals, fetched once and cached for the life of the process"""
+        feed = self.registry.get(f'feed:{asset}')
+        return await self.registry.immutable_async(
+            ('decimals', feed.address),
+            lambda: self._rpc(feed.functions.decimals().call())
+        )
+
+    async def get_price(self, asset: str) -> float:
+        """Get current price from Chainlink price feeds"""
+        try:
+            price_feed = self.registry.get(f'feed:{asset}')
+
+            latest_price, decimals = await asyncio.gather(
+                self._rpc(price_feed.functions.latestAnswer().call()),
+                self.get_feed_decimals(asset)
+            )
+
+            return float(latest_price) / (10 ** decimals)
+        except Exception as e:
+            print(f"Error getting price for {asset}: {str(e)}")
+            return 0
+
+    async def get_pools(self, block_identifier='latest') -> Dict[str, Any]:
+        """Get all available lending pools, served from the block snapshot cache"""
+        if block_identifier != 'latest':
+            return await self.fetch_pools(block_identifier)
+        return await self.pool_cache.aget(self._load_pools, self.get_block_number)
+
+    async def get_block_number(self) -> int:
+        return await self._rpc(self.w3.eth.block_number)
+
+    async def _load_pools(self):
+        pools = await self.fetch_pools()
+        return pools['blockNumber'], pools
+
+    async def fetch_pools(self, block_identifier='latest') -> Dict[str, Any]:
+        """Read all available lending pools, reading pool batches concurrently"""
+        assets = list(self.lending_pools)
+        size = self.pools_per_batch or len(assets)
+        batches = [assets[i:i + size] for i in range(0, len(assets), size)]
+
+        if len(batches) > 1 and block_identifier == 'latest':
+            # Pin every batch to the same block so the response stays consistent; a single
+            # batch needs no extra round trip, its getBlockNumber says which block it read
+            block_identifier = await self._rpc(self.w3.eth.block_number)
+
+        results = await asyncio.gather(
+            *(
+                self._rpc(self.multicall.aggregate_async(
+                    [call for asset in batch for call in self._pool_calls[asset]],
+                    block_identifier=block_identifier
+                ))
+                for batch in batches
+            ),
+            *(self.get_feed_decimals(asset) for asset in assets),
+            return_exceptions=True
+        )
+        batch_results, decimal_results = results[:len(batches)], results[len(batches):]
+
+        decimals = {}
+        for asset, result in zip(assets, decimal_results):
+            if isinstance(result, BaseException):
+                print(f"Error getting feed decimals for {asset}: {result!r}")
+            else:
+                decimals[asset] = result
+
+        pools = []
+        block_number = None
+        for batch, result in zip(batches, batch_results):
+            if isinstance(result, BaseException):
+                print(f"Error getting pool data for {', '.join(batch)}: {result!r}")
+                continue
+            block_number = result.block_number
+            pools.extend(self._collect_pools(batch, result.results, decimals))
+
+        if not pools:
+            raise Exception("No pools could be loaded")
+
+        return {'pools': pools, 'blockNumber': block_number}
+
+    async def lend(self, asset: str, token_amount: float, pool_address: str) -> Dict[str, Any]:
+        """Submit a lending transaction; its receipt is tracked in the background"""
+        try:
+            pool_contract = self.registry.contract(pool_address, COMPOUND_ABI)
+
+            # Convert amount to Wei
+            amount_wei = self.w3.to_wei(token_amount, 'ether')
+
+            supply = pool_contract.functions.supply(
+                self.registry.checksum(self.lending_pools[asset]['token']),
+                amount_wei
+            )
+            fees, chain_id, gas = await asyncio.gather(
+                self._rpc(self.fees.asuggest(self.fee_speed)),
+                self.registry.immutable_async('chain_id', lambda: self._rpc(self.w3.eth.chain_id)),
+                self._rpc(self.fees.aestimate_gas(supply, {'from': self.wallet_address})),
+                return_exceptions=True
+            )
+            for result in (fees, chain_id):
+                if isinstance(result, BaseException):
+                    raise result
+            if isinstance(gas, BaseException):
+                print(f"Gas estimate failed for {asset} supply, using default: {gas!r}")
+                gas = DEFAULT_LEND_GAS
+
+            async def submit(nonce):
+                # Build transaction
+                tx = await supply.build_transaction({
+                    'from': self.wallet_address,
+                    'gas': gas,
+                    'chainId': chain_id,
+                    'nonce': nonce,
+                    **fees
+                })
+
+                # Sign and send transaction
+                signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
+                return await self._rpc(self.w3.eth.send_raw_transaction(_raw_transaction(signed_tx)))
+
+            tx_hash = await self.nonces.asend(
+                submit,
+                lambda: self._rpc(self.w3.eth.get_transaction_count(self.wallet_address, 'pending'))
+            )
+
+            return self._track_lend(asset, pool_address, tx_hash)
+
         except Exception as e:
             return {
                 'success': False,
@@ -0,0 +1,284 @@
+# ASGI serving mode: the Flask app's routes and shared state on one event loop (see the README)
+from typing import Callable, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import logging
+import os
+import time
+
+import anyio
+import anyio.to_thread
+import anyio.from_thread
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+
+from index import (
+    ActionRequest, action_request_error, enqueue_aave_action, action_queue, address_list_error, read_positions, read_reputation, issue_credential,
+    credential_recipients_error, issue_credentials,
+    lending_agent, pool_feed, chat_sessions, reputation_agent, readiness, activity_indexer
+)
+from chat import ChatConnection
+from llm import get_llm
+import agents
+from tool_cache import tool_cache
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Threads available to blocking calls; the concurrent-session ceiling no longer depends on it
+ASGI_BLOCKING_THREADS = int(os.getenv('ASGI_BLOCKING_THREADS', '40'))
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The limiter belongs to the running event loop, so it's created at startup
+    global _limiter
+    _limiter = anyio.CapacityLimiter(ASGI_BLOCKING_THREADS)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware('http')
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The router stores the matched route in the scope, so the label is the path template
+    route = getattr(request.scope.get('route'), 'path', None)
+    metrics.record_http(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
+
+async def blocking(func: Callable, *args):
+    """Run a blocking call on the bounded worker pool without stalling the event loop"""
+    return await anyio.to_thread.run_sync(func, *args, limiter=_limiter)
+
+
+def error(message: str, status_code: int = 500, **fields) -> JSONResponse:
+    return JSONResponse({"success": False, "error": message, **fields}, status_code=status_code)
+
+
+@app.post("/api/aave")
+async def handle_aave_action(request: Request):
+    data = await request.json()
+    req = ActionRequest.from_json(data)
+
+    message = action_request_error(req)
+    if message:
+        return error(message, 400)
+
+    idempotency_key = request.headers.get('idempotency-key') or data.get('idempotencyKey')
+    body, status, headers = await blocking(enqueue_aave_action, req, idempotency_key, request.query_params.get('wait'))
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+@app.get("/api/aave/jobs/{job_id}")
+async def get_aave_job(job_id: str):
+    job = action_queue.jobs.get(job_id)
+    if job is None:
+        return error('Unknown job', 404)
+    return job
+
+
+@app.get("/api/aave/queue")
+async def get_aave_queue():
+    return action_queue.stats()
+
+
+@app.get("/api/lending/pools")
+async def get_pools():
+    try:
+        return await lending_agent.get_pools()
+    except Exception as e:
+        return JSONResponse({'error': str(e), 'pools': []}, status_code=500)
+
+
+@app.get("/api/lending/pools/cache")
+async def get_pools_cache_stats():
+    return lending_agent.pool_cache.stats()
+
+
+@app.post("/api/lending/lend")
+async def lend(request: Request):
+    data = await request.json()
+    return await lending_agent.lend(
+        asset=data['asset'],
+        token_amount=float(data['tokenAmount']),
+        pool_address=data['poolAddress']
+    )
+
+
+@app.get("/api/lending/fees")
+async def get_fee_suggestions():
+    try:
+        await lending_agent.fees.asuggest()
+        return lending_agent.fees.suggestions()
+    except Exception as e:
+        return error(str(e))
+
+
+@app.get("/api/lending/jobs/{job_id}")
+async def get_lending_job(job_id: str):
+    job = lending_agent.jobs.get(job_id)
+    if job is None:
+        return error('Unknown job', 404)
+    return job
+
+
+@app.post("/api/positions")
+async def get_positions(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    addresses = data.get('addresses') if isinstance(data, dict) else None
+
+    message = address_list_error(addresses)
+    if message:
+        return error(message, 400)
+
+    try:
+        return await blocking(read_positions, addresses)
+    except Exception as e:
+        return error(str(e))
+
+
+@app.post("/api/reputation")
+async def get_reputation(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    addresses = data.get('addresses') if isinstance(data, dict) else None
+
+    message = address_list_error(addresses)
+    if message:
+        return error(message, 400)
+
+    return await blocking(read_reputation, addresses)
+
+
+@app.get("/api/indexer/stats")
+async def get_indexer_stats():
+    return activity_indexer.stats()
+
+
+@app.api_route("/api/credentials", methods=["GET", "POST"])
+async def get_credentials(request: Request):
+    try:
+        data = None
+        if request.headers.get('content-type', '').startswith('application/json'):
+            data = await request.json()
+        return await blocking(issue_credential, data)
+    except Exception as e:
+        return error(str(e))
+
+
+@app.post("/api/credentials/bulk")
+async def issue_bulk_credentials(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    recipients = data.get('recipients') if isinstance(data, dict) else None
+
+    message = credential_recipients_error(recipients)
+    if message:
+        return error(message, 400)
+
+    try:
+        # One worker thread fans out to the client's own bounded pool
+        return await blocking(issue_credentials, recipients)
+    except Exception as e:
+        return error(str(e))
+
+
+@app.get("/api/ready")
+async def get_readiness():
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    return get_llm().stats()
+
+
+@app.get("/api/wallets")
+async def get_wallets():
+    return agents.wallet_pool.stats()
+
+
+@app.get("/api/tools/cache")
+async def get_tool_cache_stats():
+    return tool_cache.stats()
+
+
+@app.websocket('/ws/chat')
+async def chat_socket(websocket: WebSocket):
+    await websocket.accept()
+    client = get_llm()
+    args = websocket.query_params
+
+    def transmit(text: str) -> None:
+        # Turns run on a worker thread; hop back to the event loop to write to the socket
+        anyio.from_thread.run(websocket.send_text, text)
+
+    # ?session=<id>&offset=<n> resumes a session and replays the frames after offset n
+    session = await blocking(chat_sessions.open, args.get('session'))
+    connection = None
+
+    try:
+        connection = ChatConnection.from_args(session, transmit, args, wallet_id=agents.wallet_pool.route(session.id))
+        await blocking(connection.open, int(args.get('offset', 0)))
+
+        while connection.connected:
+            try:
+                # Waiting for the next message holds no thread
+                message_data = await websocket.receive_text()
+                logger.debug("Chat message for session %s (%d chars)", session.id, len(message_data))
+
+                await blocking(connection.turn, client, reputation_agent, json.loads(message_data))
+
+            except WebSocketDisconnect:
+                break
+            except Exception:
+                logger.exception("Chat socket error in session %s", session.id)
+                break
+    finally:
+        # Both take locks a turn on a worker thread may hold while it waits on this loop to send
+        if connection is not None:
+            await blocking(connection.close)
+        await blocking(chat_sessions.release, session)
+
+
+@app.websocket('/ws/pools')
+async def pools_socket(websocket: WebSocket):
+    await websocket.accept()
+    subscription = pool_feed.subscribe(asyncio.get_running_loop())
+
+    async def send_frames():
+        while True:
+            frame = await subscription.aget()
+            await websocket.send_text(json.dumps(frame))
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(send_frames)
+            # Clients send nothing on this socket; receive() returns once they disconnect
+            while (await websocket.receive())['type'] != 'websocket.disconnect':
+                pass
+            task_group.cancel_scope.cancel()
+    except Exception as e:
+        print(f"Pool feed socket closed: {e}")
+    finally:
+        pool_feed.unsubscribe(subscription)
@@ -0,0 +1,345 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import atexit
+import gzip
+import inspect
+import json
+import os
+import threading
+import time
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(KeyError):
+    """A replayed request that the cassette has no recording for"""
+
+
+def _encode(value: Any) -> Any:
+    # JSON with bytes kept as {"__bytes__": hex}; tuples become lists
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': bytes(value).hex()}
+    if isinstance(value, dict):
+        return {str(key): _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {'__bytes__'}:
+            return bytes.fromhex(value['__bytes__'])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _key(kind: str, name: str, request: Any) -> Tuple[str, str, str]:
+    return kind, name, json.dumps(_encode(request), sort_keys=True)
+
+
+class ReplayInvocation:
+    """Stands in for a CDP ContractInvocation: wait() returns it with the recorded result fields"""
+
+    def __init__(self, cassette: 'Cassette', request: Dict[str, Any], result: Dict[str, Any]):
+        self._cassette = cassette
+        self._request = request
+        self._update(result)
+
+    def _update(self, result: Dict[str, Any]) -> None:
+        self.transaction_hash = result.get('transaction_hash')
+        self.transaction_link = result.get('transaction_link')
+        self.status = result.get('status')
+
+    def wait(self, *args, **kwargs) -> 'ReplayInvocation':
+        entry = self._cassette._take('cdp', 'invoke_contract.wait', self._request)
+        self._cassette._sleep(entry)
+        self._update(self._cassette._result(entry))
+        return self
+
+    def __str__(self) -> str:
+        return f"ContractInvocation: (transaction_hash: {self.transaction_hash}, status: {self.status})"
+
+
+class ReplayAddress:
+    def __init__(self, address_id: str):
+        self.address_id = address_id
+
+    def sign_payload(self, payload: str):
+        raise CassetteMiss("Cassettes don't record payload signatures; replay with USDC_PERMIT_MODE off")
+
+    def __str__(self) -> str:
+        return self.address_id
+
+
+class ReplayWallet:
+    """The agent wallet during replay: its recorded address, with invoke_contract served from the cassette"""
+
+    def __init__(self, cassette: 'Cassette', wallet: Dict[str, Any]):
+        self._cassette = cassette
+        self.id = wallet.get('id')
+        self.network_id = wallet.get('network_id')
+        self.default_address = ReplayAddress(wallet.get('address_id'))
+
+    def invoke_contract(self, **kwargs) -> ReplayInvocation:
+        entry = self._cassette._take('cdp', 'invoke_contract', kwargs)
+        self._cassette._sleep(entry)
+        return ReplayInvocation(self._cassette, kwargs, self._cassette._result(entry))
+
+    def __str__(self) -> str:
+        return f"Wallet: (id: {self.id}, network_id: {self.network_id}) [replay]"
+
+
+class Cassette:
+    """Records JSON-RPC and CDP traffic to a gzipped JSON-lines file, or serves it back offline.
+
+    In "record" mode every request is passed through and stored with its
+    response and latency; the file is written on save() (and at exit). In
+    "replay" mode nothing touches the network: each request gets the next
+    recording with the same parameters, or failing that the next recording
+    of the same method, and the last one is reused once they run out (a
+    polled eth_blockNumber, say). `latency` is "recorded" to sleep as long
+    as the original request took, "zero" to not sleep, or a number to
+    scale the recorded latency.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', latency: Any = 'recorded'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = {'recorded': 1.0, 'zero': 0.0}.get(latency, latency)
+        self.latency_scale = float(self.latency_scale)
+        self.wallet: Optional[Dict[str, Any]] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._patches: List[Tuple[Any, str, Any]] = []
+
+        self._exact: Dict[Tuple, deque] = {}
+        self._loose: Dict[Tuple[str, str], deque] = {}
+        self._last: Dict[Tuple, Dict[str, Any]] = {}
+
+        if mode == 'replay':
+            self._load()
+        else:
+            atexit.register(self.save)
+
+    # Storage
+
+    def _load(self) -> None:
+        with gzip.open(self.path, 'rt') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['kind'] == 'meta':
+                    self.wallet = entry.get('wallet')
+                    continue
+                entry['used'] = False
+                self._exact.setdefault(_key(entry['kind'], entry['name'], entry['request']), deque()).append(entry)
+                self._loose.setdefault((entry['kind'], entry['name']), deque()).append(entry)
+                self._entries.append(entry)
+
+    def save(self) -> None:
+        if self.mode != 'record':
+            return
+        with self._lock:
+            entries = list(self._entries)
+        with gzip.open(self.path, 'wt') as f:
+            meta = {'kind': 'meta', 'version': CASSETTE_VERSION, 'recorded_at': time.time(), 'wallet': self.wallet}
+            f.write(json.dumps(meta) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def _record(self, kind: str, name: str, request: Any, response: Any, seconds: float, error: Optional[str] = None) -> None:
+        entry = {'kind': kind, 'name': name, 'request': _encode(request), 'response': _encode(response), 'seconds': round(seconds, 6)}
+        if error is not None:
+            entry['error'] = error
+        with self._lock:
+            self._entries.append(entry)
+
+    def _take(self, kind: str, name: str, request: Any) -> Dict[str, Any]:
+        key = _key(kind, name, request)
+        with self._lock:
+            for queue in (self._exact.get(key), self._loose.get((kind, name))):
+                while queue:
+                    entry = queue.popleft()
+                    if not entry['used']:
+                        entry['used'] = True
+                        self._last[key] = self._last[(kind, name)] = entry
+                        return entry
+            entry = self._last.get(key) or self._last.get((kind, name))
+        if entry is None:
+            raise CassetteMiss(f"No recording for {kind} {name}")
+        return entry
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        return entry.get('seconds', 0) * self.latency_scale
+
+    def _sleep(self, entry: Dict[str, Any]) -> None:
+        delay = self._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _result(self, entry: Dict[str, Any]) -> Any:
+        if 'error' in entry:
+            raise Exception(entry['error'])
+        return _decode(entry['response'])
+
+    def _patch(self, owner: Any, attribute: str, value: Any) -> None:
+        self._patches.append((owner, attribute, owner.__dict__.get(attribute, getattr(owner, attribute))))
+        setattr(owner, attribute, value)
+
+    def uninstall(self) -> None:
+        """Undo every patch this cassette made"""
+        while self._patches:
+            owner, attribute, original = self._patches.pop()
+            setattr(owner, attribute, original)
+
+    def __enter__(self) -> 'Cassette':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.uninstall()
+        self.save()
+
+    # web3
+
+    def wrap_web3(self, w3):
+        """Record or replay every JSON-RPC request `w3` makes (Web3 or AsyncWeb3)"""
+        provider = w3.provider
+        make_request = provider.make_request
+        make_batch_request = getattr(provider, 'make_batch_request', None)
+        is_async = inspect.iscoroutinefunction(make_request)
+
+        if self.mode == 'replay':
+            if is_async:
+                async def replay_request(method, params):
+                    entry = self._take('rpc', method, params)
+                    delay = self._delay(entry)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    return self._result(entry)
+                self._patch(provider, 'make_request', replay_request)
+            else:
+                def replay_request(method, params):
+                    entry = self._take('rpc', method, params)
+                    self._sleep(entry)
+                    return self._result(entry)
+                self._patch(provider, 'make_request', replay_request)
+
+            if make_batch_request is not None and not inspect.iscoroutinefunction(make_batch_request):
+                def replay_batch(requests):
+                    entry = self._take('rpc', 'batch', [list(request) for request in requests])
+                    self._sleep(entry)
+                    return self._result(entry)
+                self._patch(provider, 'make_batch_request', replay_batch)
+            return w3
+
+        if is_async:
+            async def record_request(method, params):
+                started = time.perf_counter()
+                response = await make_request(method, params)
+                self._record('rpc', method, params, response, time.perf_counter() - started)
+                return response
+            self._patch(provider, 'make_request', record_request)
+        else:
+            def record_request(method, params):
+                started = time.perf_counter()
+                response = make_request(method, params)
+                self._record('rpc', method, params, response, time.perf_counter() - started)
+                return response
+            self._patch(provider, 'make_request', record_request)
+
+        if make_batch_request is not None and not inspect.iscoroutinefunction(make_batch_request):
+            def record_batch(requests):
+                started = time.perf_counter()
+                response = make_batch_request(requests)
+                self._record('rpc', 'batch', [list(request) for request in requests], response, time.perf_counter() - started)
+                return response
+            self._patch(provider, 'make_batch_request', record_batch)
+        return w3
+
+    # CDP
+
+    def _timed_cdp(self, name: str, call: Callable[[], Any], request: Dict[str, Any], serialize: Callable[[Any], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            self._record('cdp', name, request, None, time.perf_counter() - started, error=str(e))
+            raise
+        self._record('cdp', name, request, serialize(result), time.perf_counter() - started)
+        return result
+
+    def install_cdp(self, agents_module) -> None:
+        """Record or replay SmartContract.read and the agent wallet's invoke_contract.
+
+        In replay mode the agent module is given a replay wallet, so no CDP
+        configuration or wallet import happens either.
+        """
+        from cdp import SmartContract, Wallet
+
+        if self.mode == 'replay':
+            def replay_read(*args, **kwargs):
+                entry = self._take('cdp', 'read', kwargs)
+                self._sleep(entry)
+                return self._result(entry)
+            self._patch(SmartContract, 'read', staticmethod(replay_read))
+            agents_module.set_wallet(ReplayWallet(self, self.wallet or {}))
+            return
+
+        wallet = agents_module.get_wallet()
+        self.wallet = {
+            'id': getattr(wallet, 'id', None),
+            'network_id': wallet.network_id,
+            'address_id': wallet.default_address.address_id,
+        }
+
+        read = SmartContract.read
+
+        def record_read(*args, **kwargs):
+            return self._timed_cdp('read', lambda: read(*args, **kwargs), kwargs, lambda result: result)
+        self._patch(SmartContract, 'read', staticmethod(record_read))
+
+        invoke_contract = Wallet.invoke_contract
+        cassette = self
+
+        def record_invoke(wallet_self, **kwargs):
+            invocation = cassette._timed_cdp(
+                'invoke_contract', lambda: invoke_contract(wallet_self, **kwargs), kwargs, cassette._invocation_fields
+            )
+            wait = invocation.wait
+
+            def recorded_wait(*args, **wait_kwargs):
+                return cassette._timed_cdp(
+                    'invoke_contract.wait', lambda: wait(*args, **wait_kwargs), kwargs, cassette._invocation_fields
+                )
+            invocation.wait = recorded_wait
+            return invocation
+        self._patch(Wallet, 'invoke_contract', record_invoke)
+
+    @staticmethod
+    def _invocation_fields(invocation) -> Dict[str, Any]:
+        fields = {}
+        for name in ('transaction_hash', 'transaction_link', 'status'):
+            try:
+                fields[name] = getattr(invocation, name)
+            except Exception:
+                fields[name] = None
+        return fields
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """A Cassette configured by CASSETTE_MODE (record/replay), CASSETTE_PATH and CASSETTE_LATENCY, if set"""
+    mode = os.getenv('CASSETTE_MODE')
+    if not mode:
+        return None
+    return Cassette(
+        os.getenv('CASSETTE_PATH', 'cassette.jsonl.gz'),
+        mode=mode,
+        latency=os.getenv('CASSETTE_LATENCY', 'recorded')
+    )
@@ -0,0 +1,50 @@
+from typing import Optional
+import os
+import threading
+
+from web3 import Web3
+from contracts import ContractRegistry, load_abi, AAVE_POOL_METHODS, USDC_METHODS
+from multicall import Multicall
+from metrics import instrument_web3
+
+# Aave pool and USDC deployed on base sepolia
+AAVE_POOL_ADDRESS = "0x07eA79F68B2B3df564D0A34F8e19D9B1e339814b"
+USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+
+# Reentrant: get_registry() and get_multicall() call get_web3() while holding it
+_lock = threading.RLock()
+_w3: Optional[Web3] = None
+_registry: Optional[ContractRegistry] = None
+_multicall: Optional[Multicall] = None
+
+
+def get_web3() -> Web3:
+    """Shared blocking Web3 client for direct RPC reads, created on first use"""
+    global _w3
+    if _w3 is None:
+        with _lock:
+            if _w3 is None:
+                _w3 = instrument_web3(Web3(Web3.HTTPProvider(os.getenv('BASE_SEPOLIA_RPC'))))
+    return _w3
+
+
+def get_registry() -> ContractRegistry:
+    """Shared registry with the Aave pool and USDC registered as 'aave_pool' and 'usdc'"""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                registry = ContractRegistry(get_web3())
+                registry.register('aave_pool', AAVE_POOL_ADDRESS, load_abi('aave_v3.json', AAVE_POOL_METHODS))
+                registry.register('usdc', USDC_ADDRESS, load_abi('usdc.json', USDC_METHODS))
+                _registry = registry
+    return _registry
+
+
+def get_multicall() -> Multicall:
+    global _multicall
+    if _multicall is None:
+        with _lock:
+            if _multicall is None:
+                _multicall = Multicall(get_web3())
+    return _multicall
@@ -0,0 +1,141 @@
+from typing import Any, Callable, Dict, Mapping, Optional
+import json
+import os
+
+from sessions import ChatSession
+from streaming import DeltaBatcher
+from wallets import use_wallet
+
+# Defaults for incremental chat streaming; clients can override per connection in the query string
+CHAT_STREAM_FLUSH_MS = float(os.getenv('CHAT_STREAM_FLUSH_MS', '50'))
+CHAT_STREAM_FLUSH_TOKENS = int(os.getenv('CHAT_STREAM_FLUSH_TOKENS', '8'))
+
+
+class ChatConnection:
+    """One client connection to a chat session, independent of the server it runs under.
+
+    `transmit` sends one encoded frame and may block; both the Flask and the
+    ASGI socket call `open` and `turn` from a worker thread. Frames go to
+    every connection attached to the session, so a client that reconnects
+    mid-turn receives the rest of that turn. If the client drops mid-turn
+    the turn still finishes, and its frames stay in the session log for
+    replay.
+    """
+
+    def __init__(
+        self,
+        session: ChatSession,
+        transmit: Callable[[str], None],
+        stream: bool = True,
+        flush_ms: float = CHAT_STREAM_FLUSH_MS,
+        flush_tokens: int = CHAT_STREAM_FLUSH_TOKENS,
+        wallet_id: Optional[str] = None
+    ):
+        self.session = session
+        self.transmit = transmit
+        self.stream = stream
+        self.flush_ms = flush_ms
+        self.flush_tokens = flush_tokens
+        # The wallet this session's tool calls act for
+        self.wallet_id = wallet_id
+        self.connected = True
+
+    @classmethod
+    def from_args(cls, session: ChatSession, transmit: Callable[[str], None], args: Mapping[str, str],
+                  wallet_id: Optional[str] = None) -> 'ChatConnection':
+        # ?stream=0 turns delta frames off; the final content frame is always sent
+        return cls(
+            session,
+            transmit,
+            stream=args.get('stream', '1') != '0',
+            flush_ms=float(args.get('flush_ms', CHAT_STREAM_FLUSH_MS)),
+            flush_tokens=int(args.get('flush_tokens', CHAT_STREAM_FLUSH_TOKENS)),
+            wallet_id=wallet_id
+        )
+
+    def send(self, frame: Dict[str, Any], persist: bool = True) -> None:
+        # Frames are logged before sending, so a turn finishes and stays replayable if the client drops
+        with self.session.send_lock:
+            if persist:
+                frame = self.session.record(frame)
+            for connection in list(self.session.attached):
+                connection.deliver(frame)
+
+    def deliver(self, frame: Dict[str, Any]) -> None:
+        if self.connected:
+            try:
+                self.transmit(json.dumps(frame))
+            except Exception as e:
+                print(f"WebSocket send failed, finishing turn offline: {e}")
+                self.connected = False
+
+    def send_delta(self, text: str) -> None:
+        # Deltas are not logged; a resuming client gets the final content frame instead
+        if self.stream:
+            self.send({
+                "type": "delta",
+                "data": text
+            }, persist=False)
+
+    def open(self, last_seen: int = 0) -> None:
+        """Announce the session, replay the frames the client missed after `last_seen` and attach for new ones"""
+        session = self.session
+        # Under the send lock, so a frame from a turn in flight is either replayed or sent live, never both
+        with session.send_lock:
+            self.deliver({"type": "session", "session_id": session.id, "offset": session.offset})
+            for frame in session.frames_after(last_seen):
+                self.deliver(frame)
+            session.attached.append(self)
+
+    def close(self) -> None:
+        with self.session.send_lock:
+            if self in self.session.attached:
+                self.session.attached.remove(self)
+        self.connected = False
+
+    def turn(self, client, agent, user_message: Dict[str, Any]) -> None:
+        """Run one user message through `agent`, streaming its output to the client"""
+        session = self.session
+        with session.lock, use_wallet(self.wallet_id):
+            session.add_messages([user_message])
+
+            # Run the agent
+            response = client.run(
+                agent=agent,
+                messages=session.history.messages,
+                stream=True
+            )
+
+            # Forward content deltas as they arrive, batched to limit frame overhead
+            batcher = DeltaBatcher(self.send_delta, flush_ms=self.flush_ms, flush_tokens=self.flush_tokens)
+
+            # Stream the response
+            for chunk in response:
+                try:
+                    if chunk.get("content"):
+                        batcher.add(chunk["content"])
+
+                    if chunk.get("tool_calls"):
+                        batcher.flush()
+                        for tool_call in chunk["tool_calls"]:
+                            self.send({
+                                "type": "tool_call",
+                                "data": tool_call
+                            })
+
+                    if chunk.get("response"):
+                        session.add_messages(chunk["response"].messages)
+
+                except Exception as e:
+                    print(f"Error processing chunk: {e}")
+                    continue
+
+            batcher.flush()
+
+            # Finish with the full message, which is all clients without delta support use
+            if batcher.content:
+                self.send({
+                    "type": "content",
+                    "data": batcher.content.strip(),
+                    "done": True
+                })
@@ -0,0 +1,210 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from functools import lru_cache
+import json
+import os
+import threading
+
+from eth_utils import function_abi_to_4byte_selector
+from multicall import Call, abi_output_types
+from metrics import name_selector
+
+ABI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'abi')
+
+# Only the Aave pool methods and events the agents actually use
+AAVE_POOL_METHODS = (
+    'getUserAccountData',
+    'getReserveData',
+    'getReservesList',
+    'supply',
+    'borrow',
+    'withdraw',
+    'repay',
+    'supplyWithPermit',
+    'repayWithPermit',
+)
+
+# Pool events the activity indexer follows
+AAVE_POOL_EVENTS = (
+    'Supply',
+    'Borrow',
+    'Repay',
+    'Withdraw',
+    'LiquidationCall',
+)
+
+USDC_METHODS = (
+    'allowance',
+    'approve',
+    'balanceOf',
+    'decimals',
+)
+
+# EIP-2612 permit reads that usdc.json doesn't include
+EIP2612_ABI = json.loads('''[
+    {
+        "inputs": [{"internalType": "address","name": "owner","type": "address"}],
+        "name": "nonces",
+        "outputs": [{"internalType": "uint256","name": "","type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "name",
+        "outputs": [{"internalType": "string","name": "","type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "version",
+        "outputs": [{"internalType": "string","name": "","type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]''')
+
+ERC20_DECIMALS_ABI = json.loads('''[
+    {
+        "inputs": [],
+        "name": "decimals",
+        "outputs": [{"internalType": "uint8","name": "","type": "uint8"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]''')
+
+
+ERC20_SYMBOL_ABI = json.loads('''[
+    {
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"internalType": "string","name": "","type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]''')
+
+
+@lru_cache(maxsize=None)
+def _read_abi(name: str) -> str:
+    with open(os.path.join(ABI_DIR, name), 'r') as f:
+        return f.read()
+
+
+def trim_abi(abi: list, names: Iterable[str]) -> list:
+    """Keep only the ABI entries (functions, events, errors) whose name is in `names`"""
+    names = set(names)
+    return [entry for entry in abi if entry.get('name') in names]
+
+
+def load_abi(name: str, names: Optional[Iterable[str]] = None) -> list:
+    """Load an ABI from api/abi, optionally trimmed down to `names`"""
+    abi = json.loads(_read_abi(name))
+    return trim_abi(abi, names) if names is not None else abi
+
+
+class ContractRegistry:
+    """Builds contract objects and selectors once and caches immutable on-chain metadata.
+
+    Contracts are registered under a short name at startup; metadata such as
+    feed decimals or reserve token addresses never changes, so it is fetched
+    at most once per process.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._lock = threading.Lock()
+        self._addresses: Dict[str, str] = {}
+        self._contracts: Dict[str, Any] = {}
+        self._selectors: Dict[str, Dict[str, bytes]] = {}
+        self._functions: Dict[str, Dict[str, dict]] = {}
+        self._metadata: Dict[Any, Any] = {}
+
+    def checksum(self, address: str) -> str:
+        """Checksum an address, memoized"""
+        cached = self._addresses.get(address)
+        if cached is None:
+            cached = self.w3.to_checksum_address(address)
+            self._addresses[address] = cached
+        return cached
+
+    def register(self, name: str, address: str, abi: list) -> Any:
+        """Build and store a contract object and its function selectors under `name`"""
+        contract = self.w3.eth.contract(address=self.checksum(address), abi=abi)
+        functions = {entry['name']: entry for entry in abi if entry.get('type') == 'function'}
+        with self._lock:
+            self._contracts[name] = contract
+            self._functions[name] = functions
+            self._selectors[name] = {
+                fn_name: function_abi_to_4byte_selector(entry) for fn_name, entry in functions.items()
+            }
+        for fn_name, fn_selector in self._selectors[name].items():
+            name_selector(fn_selector, fn_name)
+        return contract
+
+    def get(self, name: str) -> Any:
+        return self._contracts[name]
+
+    def contract(self, address: str, abi: list) -> Any:
+        """Get a contract by address, registering it on first use"""
+        name = f"{self.checksum(address)}:{id(abi)}"
+        contract = self._contracts.get(name)
+        if contract is None:
+            contract = self.register(name, address, abi)
+        return contract
+
+    def selector(self, name: str, method: str) -> bytes:
+        return self._selectors[name][method]
+
+    def call(self, name: str, method: str, *args) -> Call:
+        """Encode a call with the precomputed selector, ready for Multicall"""
+        fn_abi = self._functions[name][method]
+        data = self._selectors[name][method]
+        if args:
+            input_types = [param['type'] for param in fn_abi['inputs']]
+            data += self.w3.codec.encode(input_types, list(args))
+        return Call(self._contracts[name].address, data, abi_output_types(fn_abi), method)
+
+    def immutable(self, key: Any, loader: Callable[[], Any]) -> Any:
+        """Return permanently cached metadata, calling `loader` only on the first lookup"""
+        if key in self._metadata:
+            return self._metadata[key]
+        value = loader()
+        with self._lock:
+            self._metadata.setdefault(key, value)
+        return self._metadata[key]
+
+    async def immutable_async(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """`immutable` for loaders that return an awaitable (AsyncWeb3 calls)"""
+        if key in self._metadata:
+            return self._metadata[key]
+        value = await loader()
+        with self._lock:
+            self._metadata.setdefault(key, value)
+        return self._metadata[key]
+
+    def feed_decimals(self, feed_address: str) -> int:
+        """Decimals of a Chainlink feed"""
+        feed = self.contract(feed_address, ERC20_DECIMALS_ABI)
+        return self.immutable(('decimals', feed.address), lambda: feed.functions.decimals().call())
+
+    def token_decimals(self, token_address: str) -> int:
+        """Decimals of an ERC-20 token"""
+        token = self.contract(token_address, ERC20_DECIMALS_ABI)
+        return self.immutable(('decimals', token.address), lambda: token.functions.decimals().call())
+
+    def reserve_tokens(self, pool_address: str, asset: str, pool_abi: list) -> Dict[str, str]:
+        """aToken and debt token addresses of an Aave reserve (from getReserveData)"""
+        pool = self.contract(pool_address, pool_abi)
+        asset = self.checksum(asset)
+
+        def load():
+            reserve = pool.functions.getReserveData(asset).call()
+            return {
+                'aTokenAddress': reserve[8],
+                'stableDebtTokenAddress': reserve[9],
+                'variableDebtTokenAddress': reserve[10],
+            }
+
+        return self.immutable(('reserve_tokens', pool.address, asset), load)
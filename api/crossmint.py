@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CROSSMINT_STAGING_URL = "https://staging.crossmint.com"
+
+# Statuses worth retrying: rate limits and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CrossmintClient:
+    """Issues Crossmint verifiable credentials over one pooled, keep-alive session.
+
+    Requests time out after `timeout` seconds (connect, read) and are retried
+    with exponential backoff on connection errors and 429/5xx, honouring
+    Retry-After. Every issue request carries an `x-idempotency-key`, which
+    stays the same across retries, so a retried request never issues a
+    second credential.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        template_id: str,
+        base_url: str = CROSSMINT_STAGING_URL,
+        pool_size: int = 20,
+        timeout: tuple = (5.0, 30.0),
+        max_retries: int = 3,
+        backoff_factor: float = 0.5
+    ):
+        self.template_id = template_id
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # POST is safe to retry because of the idempotency key
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True,
+            # Hand back the last response so raise_for_status reports the real status
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "X-API-KEY": api_key,
+            "Content-Type": "application/json",
+        })
+
+    @staticmethod
+    def credential_params(email: str, subject: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "recipient": f"email:{email}:polygon-amoy",
+            "credential": {
+                "subject": subject,
+                "expiresAt": "2034-02-02",
+            },
+        }
+
+    def issue(self, email: str, subject: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Issue one credential; raises requests.RequestException once retries are exhausted"""
+        response = self.session.post(
+            f"{self.base_url}/api/v1-alpha1/credentials/templates/{self.template_id}/vcs",
+            json=self.credential_params(email, subject),
+            headers={"x-idempotency-key": idempotency_key or uuid.uuid4().hex},
+            timeout=self.timeout
+        )
+
+        # Raise exception for bad status codes
+        response.raise_for_status()
+
+        return response.json()
+
+    def _issue_one(self, recipient: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"email": recipient["email"], "idempotencyKey": recipient["idempotencyKey"]}
+        try:
+            credential = self.issue(recipient["email"], recipient["subject"], recipient["idempotencyKey"])
+            return {**result, "success": True, "credential": credential}
+        except requests.RequestException as e:
+            return {**result, "success": False, "error": str(e)}
+
+    def issue_many(self, recipients: Sequence[Dict[str, Any]], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """Issue credentials for `recipients` ({email, subject, idempotencyKey?}) at most `max_workers` at a time.
+
+        Returns one result per recipient, in order; a failure for one
+        recipient doesn't stop the others. Keys are generated for recipients
+        without one and returned, so a client can resend a partly failed
+        batch without issuing anyone's credential twice.
+        """
+        recipients = [
+            {**recipient, "idempotencyKey": recipient.get("idempotencyKey") or uuid.uuid4().hex}
+            for recipient in recipients
+        ]
+        # Never more workers than pooled connections, so no request waits on the pool
+        workers = max(1, min(max_workers, self.pool_size, len(recipients)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._issue_one, recipients))
@@ -0,0 +1,122 @@
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import statistics
+import threading
+import time
+
+# Reward percentiles sampled from eth_feeHistory for each speed
+SPEEDS = {
+    'low': 10,
+    'medium': 50,
+    'fast': 90,
+}
+
+
+class FeeSample(NamedTuple):
+    fetched_at: float
+    next_base_fee: int
+    priority_fees: Dict[str, int]
+
+
+class FeeOracle:
+    """EIP-1559 fee suggestions sampled once per block, plus cached gas estimates.
+
+    `eth_feeHistory` is fetched at most once per `block_time` seconds and
+    turned into low/medium/fast suggestions. Gas estimates are cached per
+    contract, method and argument types for `estimate_ttl` seconds and
+    padded by `gas_margin`.
+    """
+
+    def __init__(
+        self,
+        w3,
+        history_blocks: int = 10,
+        block_time: float = 2.0,
+        gas_margin: float = 1.2,
+        estimate_ttl: float = 300.0
+    ):
+        self.w3 = w3
+        self.history_blocks = history_blocks
+        self.block_time = block_time
+        self.gas_margin = gas_margin
+        self.estimate_ttl = estimate_ttl
+        self._sample: Optional[FeeSample] = None
+        self._estimates: Dict[Tuple, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return self._sample is not None and time.monotonic() - self._sample.fetched_at < self.block_time
+
+    def _fee_history_args(self) -> tuple:
+        return (self.history_blocks, 'latest', list(SPEEDS.values()))
+
+    def _store(self, history) -> None:
+        rewards = history['reward'] or [[0] * len(SPEEDS)]
+        priority_fees = {
+            speed: int(statistics.median(block[i] for block in rewards))
+            for i, speed in enumerate(SPEEDS)
+        }
+        # The last base fee in the history is the one for the next block
+        self._sample = FeeSample(time.monotonic(), int(history['baseFeePerGas'][-1]), priority_fees)
+
+    def _suggestion(self, speed: str) -> Dict[str, int]:
+        sample = self._sample
+        priority_fee = sample.priority_fees[speed]
+        return {
+            # Two base fees of headroom keeps the tx valid through several full blocks
+            'maxFeePerGas': 2 * sample.next_base_fee + priority_fee,
+            'maxPriorityFeePerGas': priority_fee,
+        }
+
+    def suggest(self, speed: str = 'medium') -> Dict[str, int]:
+        """maxFeePerGas / maxPriorityFeePerGas for `speed` (low, medium or fast)"""
+        if not self._fresh():
+            self._store(self.w3.eth.fee_history(*self._fee_history_args()))
+        return self._suggestion(speed)
+
+    async def asuggest(self, speed: str = 'medium') -> Dict[str, int]:
+        """`suggest` for an AsyncWeb3 instance"""
+        if not self._fresh():
+            self._store(await self.w3.eth.fee_history(*self._fee_history_args()))
+        return self._suggestion(speed)
+
+    def suggestions(self) -> Dict[str, Any]:
+        """All speeds from the current sample (call suggest/asuggest first to refresh it)"""
+        if self._sample is None:
+            return {}
+        return {
+            'baseFee': self._sample.next_base_fee,
+            **{speed: self._suggestion(speed) for speed in SPEEDS},
+        }
+
+    @staticmethod
+    def _estimate_key(fn) -> Tuple:
+        # Gas rarely depends on argument values, only on which call it is and its argument types
+        return (fn.address, fn.fn_name, tuple(type(arg).__name__ for arg in fn.args))
+
+    def _cached_estimate(self, key) -> Optional[int]:
+        cached = self._estimates.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.estimate_ttl:
+            return cached[1]
+        return None
+
+    def _store_estimate(self, key, gas: int) -> int:
+        gas = int(gas * self.gas_margin)
+        with self._lock:
+            self._estimates[key] = (time.monotonic(), gas)
+        return gas
+
+    def estimate_gas(self, fn, tx: Dict[str, Any]) -> int:
+        """Padded gas estimate for a bound contract function, cached by call shape"""
+        key = self._estimate_key(fn)
+        cached = self._cached_estimate(key)
+        if cached is not None:
+            return cached
+        return self._store_estimate(key, fn.estimate_gas(tx))
+
+    async def aestimate_gas(self, fn, tx: Dict[str, Any]) -> int:
+        """`estimate_gas` for AsyncWeb3 contract functions"""
+        key = self._estimate_key(fn)
+        cached = self._cached_estimate(key)
+        if cached is not None:
+            return cached
+        return self._store_estimate(key, await fn.estimate_gas(tx))
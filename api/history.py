@@ -0,0 +1,144 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, otherwise the usual ~4 characters per token"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = 4  # per-message framing overhead
+    tokens += estimate_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def group_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Split messages into units that must stay together: tool results stay with their tool call"""
+    units = []
+    for message in messages:
+        if message.get("role") == "tool" and units:
+            units[-1].append(message)
+        else:
+            units.append([message])
+    return units
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def summarize_turns(units: List[List[Dict[str, Any]]]) -> str:
+    """Cheap extractive summary: one short line per message"""
+    lines = []
+    for unit in units:
+        for message in unit:
+            role = message.get("role")
+            if role == "tool":
+                lines.append(f"- tool {message.get('tool_name', '')} returned: {_clip(message.get('content') or '', 120)}")
+            elif message.get("tool_calls"):
+                names = ", ".join(call["function"]["name"] for call in message["tool_calls"])
+                lines.append(f"- {role} called {names}")
+            elif message.get("content"):
+                lines.append(f"- {role}: {_clip(message['content'], 200)}")
+    return "\n".join(lines)
+
+
+class ConversationHistory:
+    """An LLM message list kept within a token budget.
+
+    Recent turns stay verbatim. Large tool results outside the recent window
+    are truncated, and once the budget is exceeded the oldest turns are
+    folded into a single summary message. A tool call and its results are
+    always kept or dropped together, so the list stays valid for the API.
+    Pass `summarizer` to replace the built-in extractive summary (e.g. with
+    an LLM call); it receives the previous summary and the dropped messages.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        keep_recent: int = 8,
+        max_tool_chars: int = 1500,
+        max_summary_chars: int = 4000,
+        summarizer: Optional[Callable[[str, List[Dict[str, Any]]], str]] = None
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_tool_chars = max_tool_chars
+        self.max_summary_chars = max_summary_chars
+        self.summarizer = summarizer
+        self.summary = ""
+        self.turns: List[Dict[str, Any]] = []
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """The messages to send to the LLM"""
+        if not self.summary:
+            return list(self.turns)
+        return [{"role": "system", "content": SUMMARY_PREFIX + self.summary}] + self.turns
+
+    def tokens(self) -> int:
+        return sum(message_tokens(message) for message in self.messages)
+
+    def append(self, message: Dict[str, Any]) -> None:
+        self.turns.append(message)
+        self.compact()
+
+    def extend(self, messages: List[Dict[str, Any]]) -> None:
+        self.turns.extend(messages)
+        self.compact()
+
+    def compact(self) -> None:
+        units = group_turns(self.turns)
+        recent = units[-self.keep_recent:] if self.keep_recent else []
+        older = units[:len(units) - len(recent)]
+
+        # Old tool output is rarely needed verbatim and is often the bulk of the history
+        for unit in older:
+            for i, message in enumerate(unit):
+                content = message.get("content")
+                if message.get("role") == "tool" and content and len(content) > self.max_tool_chars:
+                    unit[i] = {**message, "content": content[:self.max_tool_chars] + f"… [truncated {len(content) - self.max_tool_chars} chars]"}
+
+        # The summary message counts against the budget too, and grows with each fold
+        while older:
+            budget = self.token_budget - self._summary_tokens()
+            dropped = []
+            while older and sum(message_tokens(m) for unit in older + recent for m in unit) > budget:
+                dropped.append(older.pop(0))
+            if not dropped:
+                break
+            self._fold(dropped)
+
+        self.turns = [message for unit in older + recent for message in unit]
+
+    def _summary_tokens(self) -> int:
+        return message_tokens({"role": "system", "content": SUMMARY_PREFIX + self.summary}) if self.summary else 0
+
+    def _fold(self, units: List[List[Dict[str, Any]]]) -> None:
+        if self.summarizer is not None:
+            summary = self.summarizer(self.summary, [message for unit in units for message in unit])
+        else:
+            summary = "\n".join(part for part in (self.summary, summarize_turns(units)) if part)
+
+        # Keep the newest part of the summary when it outgrows its own cap
+        if len(summary) > self.max_summary_chars:
+            summary = summary[-self.max_summary_chars:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        self.summary = summary
@@ -1,12 +1,13 @@
 from agents import supply_usdc_to_aave, borrow_usdc_from_aave, repay_usdc_to_aave, withdraw_usdc_from_aave
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from dataclasses import dataclass
 from flask_sock import Sock
-from swarm import Swarm
-from agents import reputation_agent
+from agents import reputation_agent, get_wallet
 import json
 import os
+import sys
+import time
 from datetime import datetime, timedelta
 import requests
 from typing import Optional
@@ -15,9 +16,46 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# api/agents.py shadows the api/agents/ directory, so load the lending agent from its folder directly
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agents'))
+from lending_agent import AsyncLendingAgent
+from pool_feed import PoolFeed
+from chat import ChatConnection
+from history import ConversationHistory
+from sessions import SessionStore, SessionManager
+from llm import get_llm
+from tool_cache import tool_cache
+from positions import PositionReader
+from crossmint import CrossmintClient, CROSSMINT_STAGING_URL
+from readiness import Readiness
+from strategies import strategy_engine
+from wallets import use_wallet
+from action_queue import ActionQueue, QueueFull, IdempotencyConflict
+from jobs import FINISHED_STATUSES
+import math
+from indexer import activity_indexer
+import metrics
+from cassette import cassette_from_env
+from chain import get_web3
+import agents
+from web3 import Web3
+
 app = Flask(__name__)
 sock = Sock(app)
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    route = request.url_rule.rule if request.url_rule is not None else None
+    # Sockets report through the session gauges instead; their "request" lasts as long as the connection
+    if started is not None and not (route or '').startswith('/ws/'):
+        metrics.record_http(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
 # Get credentials from environment variables
 TEMPLATE_ID = os.getenv('CROSSMINT_TEMPLATE_ID')
 API_KEY = os.getenv('CROSSMINT_API_KEY')
@@ -25,49 +63,185 @@ API_KEY = os.getenv('CROSSMINT_API_KEY')
 if not TEMPLATE_ID or not API_KEY:
     raise ValueError("Missing required environment variables: CROSSMINT_TEMPLATE_ID or CROSSMINT_API_KEY")
 
+crossmint = CrossmintClient(
+    API_KEY,
+    TEMPLATE_ID,
+    base_url=os.getenv('CROSSMINT_BASE_URL', CROSSMINT_STAGING_URL),
+    pool_size=int(os.getenv('CROSSMINT_POOL_SIZE', '20')),
+    timeout=(float(os.getenv('CROSSMINT_CONNECT_TIMEOUT', '5')), float(os.getenv('CROSSMINT_READ_TIMEOUT', '30'))),
+    max_retries=int(os.getenv('CROSSMINT_MAX_RETRIES', '3'))
+)
+CREDENTIALS_BULK_CONCURRENCY = int(os.getenv('CREDENTIALS_BULK_CONCURRENCY', '8'))
+MAX_BULK_CREDENTIALS = int(os.getenv('MAX_BULK_CREDENTIALS', '500'))
+
+lending_agent = AsyncLendingAgent()
+
+# CASSETTE_MODE=record|replay captures or serves back all chain and CDP traffic (see api/cassette.py)
+cassette = cassette_from_env()
+if cassette is not None:
+    for w3 in (lending_agent.w3, lending_agent._background_w3(), get_web3()):
+        cassette.wrap_web3(w3)
+    cassette.install_cdp(agents)
+pool_feed = PoolFeed(lending_agent, poll_interval=float(os.getenv('POOL_FEED_POLL_INTERVAL', '1')))
+
+position_reader = PositionReader(chunk_size=int(os.getenv('POSITIONS_CHUNK_SIZE', '250')))
+MAX_POSITION_ADDRESSES = int(os.getenv('MAX_POSITION_ADDRESSES', '5000'))
+
+# Nothing above touches the network; the wallet import and first RPC round trips happen in the background
+readiness = Readiness(
+    retry_interval=float(os.getenv('WARMUP_RETRY_INTERVAL', '5')),
+    max_attempts=int(os.getenv('WARMUP_MAX_ATTEMPTS', '12'))
+)
+if os.getenv('WARMUP_ON_START', 'true').lower() in ('1', 'true', 'yes'):
+    # A missing or malformed WALLET_DATA entry won't fix itself, so it fails the check at once
+    readiness.add('wallet', get_wallet, fatal=(KeyError,))
+    readiness.add('rpc', lending_agent.warm_up)
+
+# Strategy rankings include the Compound pools, read in the same batch as the Aave reserves
+strategy_engine.lending_agent = lending_agent
+
+# The activity indexer backs reputation scores; it backfills INDEXER_BACKFILL_BLOCKS on first start
+if os.getenv('INDEXER_ENABLED', 'false').lower() in ('1', 'true', 'yes'):
+    activity_indexer.start()
+
+# While the pool feed is watching blocks, cached tool results also expire on each new block
+tool_cache.block_source = lambda: pool_feed.block_number
+
 @dataclass
 class ActionRequest:
     action: str
     amount: str
+    # Wallet to act with; defaults to the wallet of `session`, or the pool's default wallet
+    wallet: Optional[str] = None
+    session: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data) -> 'ActionRequest':
+        return cls(
+            action=data.get('action'),
+            amount=data.get('amount'),
+            wallet=data.get('wallet'),
+            session=data.get('session')
+        )
+
+    def wallet_id(self) -> Optional[str]:
+        if self.wallet is not None:
+            return self.wallet
+        if self.session is not None:
+            return agents.wallet_pool.route(self.session)
+        return None
+
+AAVE_ACTIONS = ("supply", "borrow", "repay", "withdraw")
+
+def action_request_error(req: ActionRequest) -> Optional[str]:
+    """Why `req` can't be run, or None if it can"""
+    if req.action not in AAVE_ACTIONS:
+        return "Invalid action"
+    if req.wallet is not None and req.wallet not in agents.wallet_pool:
+        return f"Unknown wallet {req.wallet}"
+    return None
+
+def run_aave_action(req: ActionRequest):
+    """Run one Aave action with the request's wallet; blocks on CDP until the transaction lands"""
+    with use_wallet(req.wallet_id()):
+        return _run_aave_action(req)
+
+def _run_aave_action(req: ActionRequest):
+    if req.action == "supply":
+        print(f"Supplying {req.amount} USDC to Aave")
+        result =  supply_usdc_to_aave(1)
+        print(result)
+        return result
+        
+    elif req.action == "borrow":
+        return borrow_usdc_from_aave(req.amount)
+        
+    elif req.action == "repay":
+        return repay_usdc_to_aave(req.amount)
+        
+    elif req.action == "withdraw":
+        return withdraw_usdc_from_aave(req.amount)
+
+    raise ValueError(f"Invalid action: {req.action}")
+
+# /api/aave actions run in the background, in order per wallet, with bounded depth and CDP concurrency
+action_queue = ActionQueue(
+    run_aave_action,
+    agents.wallet_pool,
+    max_depth=int(os.getenv('AAVE_QUEUE_MAX_DEPTH', '100')),
+    max_depth_per_wallet=int(os.getenv('AAVE_QUEUE_MAX_DEPTH_PER_WALLET', '20')),
+    max_concurrency=int(os.getenv('AAVE_MAX_CONCURRENT_ACTIONS', '4')),
+    idempotency_ttl=float(os.getenv('AAVE_IDEMPOTENCY_TTL', '86400'))
+)
+# Longest ?wait=<seconds> a request may block for its action's result
+AAVE_ACTION_MAX_WAIT = float(os.getenv('AAVE_ACTION_MAX_WAIT', '60'))
+
+def enqueue_aave_action(req: ActionRequest, idempotency_key: Optional[str] = None, wait: Optional[str] = None):
+    """Queue `req`; returns (body, status, headers): 202 while it runs, 200 once confirmed, 500 if it failed, 429 when full"""
+    try:
+        wait = min(float(wait), AAVE_ACTION_MAX_WAIT) if wait else 0
+    except ValueError:
+        return {"success": False, "error": "wait must be a number of seconds"}, 400, {}
+
+    try:
+        job, created = action_queue.submit(
+            req.wallet_id(),
+            {"action": req.action, "amount": req.amount},
+            req,
+            idempotency_key
+        )
+    except QueueFull as e:
+        return {"success": False, "error": str(e)}, 429, {"Retry-After": str(math.ceil(e.retry_after))}
+    except IdempotencyConflict as e:
+        return {"success": False, "error": str(e)}, 409, {}
+
+    if wait:
+        job = action_queue.wait(job['id'], wait)
+
+    body = {
+        "success": job['status'] == 'confirmed',
+        "jobId": job['id'],
+        "status": job['status'],
+        "deduplicated": not created,
+        "job": job,
+    }
+    if job['status'] not in FINISHED_STATUSES:
+        return body, 202, {}
+    if job['status'] != 'confirmed':
+        body["error"] = job.get('error') or f"Action {job['status']}"
+        return body, 500, {}
+    body["response"] = job.get('result')
+    return body, 200, {}
 
 @app.post("/api/aave")
 async def handle_aave_action():
     data = request.get_json()
-    req = ActionRequest(
-        action=data.get('action'),
-        amount=data.get('amount')
-    )
-    
-    try:
-        if req.action == "supply":
-            print(f"Supplying {req.amount} USDC to Aave")
-            result =  supply_usdc_to_aave(1)
-            print(result)
-            return jsonify({"success": True, "response": result})
-            
-        elif req.action == "borrow":
-            result =  borrow_usdc_from_aave(req.amount)
-            return jsonify({"success": True, "response": result})
-            
-        elif req.action == "repay":
-            result =  repay_usdc_to_aave(req.amount)
-            return jsonify({"success": True, "response": result})
-            
-        elif req.action == "withdraw":
-            result =  withdraw_usdc_from_aave(req.amount)
-            return jsonify({"success": True, "response": result})
-            
-        else:
-            return jsonify({
-                "success": False, 
-                "error": "Invalid action"
-            }), 400
-            
-    except Exception as e:
+    req = ActionRequest.from_json(data)
+
+    error = action_request_error(req)
+    if error:
         return jsonify({
             "success": False, 
-            "error": str(e)
-        }), 500
+            "error": error
+        }), 400
+
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotencyKey')
+    body, status, headers = enqueue_aave_action(req, idempotency_key, request.args.get('wait'))
+    return jsonify(body), status, headers
+
+@app.route("/api/aave/jobs/<job_id>", methods=["GET"])
+def get_aave_job(job_id):
+    job = action_queue.jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job'
+        }), 404
+    return jsonify(job)
+
+@app.route("/api/aave/queue", methods=["GET"])
+def get_aave_queue():
+    return jsonify(action_queue.stats())
 
 @app.route("/api/lending/pools", methods=["GET"])
 async def get_pools():
@@ -80,6 +254,10 @@ async def get_pools():
             'pools': []
         }), 500
 
+@app.route("/api/lending/pools/cache", methods=["GET"])
+def get_pools_cache_stats():
+    return jsonify(lending_agent.pool_cache.stats())
+
 @app.route("/api/lending/lend", methods=["POST"])
 async def lend():
     data = request.json
@@ -90,47 +268,125 @@ async def lend():
     )
     return jsonify(result)
 
+@app.route("/api/lending/fees", methods=["GET"])
+async def get_fee_suggestions():
+    try:
+        await lending_agent.fees.asuggest()
+        return jsonify(lending_agent.fees.suggestions())
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route("/api/lending/jobs/<job_id>", methods=["GET"])
+def get_lending_job(job_id):
+    job = lending_agent.jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job'
+        }), 404
+    return jsonify(job)
+
+def address_list_error(addresses) -> Optional[str]:
+    """Why `addresses` can't be read as a positions request, or None if it can"""
+    if not isinstance(addresses, list) or not addresses:
+        return "addresses must be a non-empty list"
+    if len(addresses) > MAX_POSITION_ADDRESSES:
+        return f"At most {MAX_POSITION_ADDRESSES} addresses per request"
+    invalid = [address for address in addresses if not isinstance(address, str) or not Web3.is_address(address)]
+    if invalid:
+        return f"Invalid addresses: {', '.join(map(str, invalid[:10]))}"
+    return None
+
+def read_positions(addresses):
+    block_number, positions = position_reader.read(addresses)
+    return {
+        "success": True,
+        "blockNumber": block_number,
+        "positions": [
+            position.to_dict() if position is not None else {"address": address, "error": "Read failed"}
+            for address, position in zip(addresses, positions)
+        ]
+    }
+
+@app.route("/api/positions", methods=["POST"])
+def get_positions():
+    data = request.get_json(silent=True) or {}
+    addresses = data.get('addresses')
+
+    error = address_list_error(addresses)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    try:
+        return jsonify(read_positions(addresses))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def read_reputation(addresses):
+    return {"success": True, **activity_indexer.scores(addresses)}
+
+@app.route("/api/reputation", methods=["POST"])
+def get_reputation():
+    data = request.get_json(silent=True) or {}
+    addresses = data.get('addresses')
+
+    error = address_list_error(addresses)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    return jsonify(read_reputation(addresses))
+
+@app.route("/api/indexer/stats", methods=["GET"])
+def get_indexer_stats():
+    return jsonify(activity_indexer.stats())
+
+# Default values
+DEFAULT_CREDENTIAL_EMAIL = 'richard@gmail.com'
+DEFAULT_CREDENTIAL_SUBJECT = {
+    "course": "DeFi",
+    "grade": "USDC"
+}
+
+def issue_credential(data: Optional[dict] = None):
+    """Issue a Crossmint credential from an optional {email, subject, idempotencyKey} request body"""
+    data = data or {}
+    return crossmint.issue(
+        data.get('email', DEFAULT_CREDENTIAL_EMAIL),
+        data.get('subject', DEFAULT_CREDENTIAL_SUBJECT),
+        data.get('idempotencyKey')
+    )
+
+def credential_recipients_error(recipients) -> Optional[str]:
+    """Why `recipients` can't be issued as a bulk request, or None if it can"""
+    if not isinstance(recipients, list) or not recipients:
+        return "recipients must be a non-empty list"
+    if len(recipients) > MAX_BULK_CREDENTIALS:
+        return f"At most {MAX_BULK_CREDENTIALS} recipients per request"
+    if not all(isinstance(recipient, dict) and isinstance(recipient.get('email'), str) for recipient in recipients):
+        return "Every recipient needs an email"
+    return None
+
+def issue_credentials(recipients):
+    results = crossmint.issue_many(
+        [{**recipient, "subject": recipient.get('subject', DEFAULT_CREDENTIAL_SUBJECT)} for recipient in recipients],
+        max_workers=CREDENTIALS_BULK_CONCURRENCY
+    )
+    return {
+        "success": all(result["success"] for result in results),
+        "issued": sum(result["success"] for result in results),
+        "results": results
+    }
+
 @app.route("/api/credentials", methods=["GET", "POST"])
 async def get_credentials():
     try:
-        # Default values
-        user_email = 'richard@gmail.com'
-        subject = {
-            "course": "DeFi",
-            "grade": "USDC"
-        }
-        
-        # Try to get data from JSON request
-        if request.is_json:
-            data = request.get_json()
-            user_email = data.get('email', user_email)
-            # Update subject if provided in request
-            if 'subject' in data:
-                subject = data['subject']
-        
-        credential_params = {
-            "recipient": f"email:{user_email}:polygon-amoy",
-            "credential": {
-                "subject": subject,
-                "expiresAt": "2034-02-02",
-            },
-        }
-
-        headers = {
-            "X-API-KEY": API_KEY,
-            "Content-Type": "application/json",
-        }
-
-        response = requests.post(
-            f"https://staging.crossmint.com/api/v1-alpha1/credentials/templates/{TEMPLATE_ID}/vcs",
-            json=credential_params,
-            headers=headers
-        )
-
-        # Raise exception for bad status codes
-        response.raise_for_status()
-        
-        return jsonify(response.json())
+        return jsonify(issue_credential(request.get_json() if request.is_json else None))
 
     except requests.RequestException as e:
         return jsonify({
@@ -143,59 +399,104 @@ async def get_credentials():
             "error": str(e)
         }), 500
 
+@app.route("/api/credentials/bulk", methods=["POST"])
+def issue_bulk_credentials():
+    data = request.get_json(silent=True) or {}
+    recipients = data.get('recipients')
+
+    error = credential_recipients_error(recipients)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    try:
+        return jsonify(issue_credentials(recipients))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+# Token budget for the history each chat turn resends to the LLM
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '6000'))
+CHAT_HISTORY_KEEP_RECENT = int(os.getenv('CHAT_HISTORY_KEEP_RECENT', '8'))
+
+# Chat sessions are logged to SQLite so a dropped socket can resume where it left off
+chat_sessions = SessionManager(
+    SessionStore(os.getenv('CHAT_SESSION_DB', 'chat_sessions.db')),
+    history_factory=lambda: ConversationHistory(
+        token_budget=CHAT_HISTORY_TOKEN_BUDGET,
+        keep_recent=CHAT_HISTORY_KEEP_RECENT
+    ),
+    max_active=int(os.getenv('CHAT_MAX_ACTIVE_SESSIONS', '200'))
+)
+
+metrics.websocket_sessions.set_function(lambda: chat_sessions.connection_count, socket='chat')
+metrics.websocket_sessions.set_function(lambda: pool_feed.subscriber_count, socket='pools')
+metrics.transactions_in_flight.set_function(lambda: lending_agent.jobs.count('pending'))
+metrics.indexer_block.set_function(lambda: activity_indexer.indexed_block or 0)
+metrics.action_queue_depth.set_function(lambda: action_queue.depth)
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.registry.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route("/api/ready", methods=["GET"])
+def get_readiness():
+    status = readiness.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route("/api/llm/stats", methods=["GET"])
+def get_llm_stats():
+    return jsonify(get_llm().stats())
+
+@app.route("/api/wallets", methods=["GET"])
+def get_wallets():
+    return jsonify(agents.wallet_pool.stats())
+
+@app.route("/api/tools/cache", methods=["GET"])
+def get_tool_cache_stats():
+    return jsonify(tool_cache.stats())
+
 @sock.route('/ws/chat')
 def chat_socket(ws):
-    client = Swarm()
-    messages = []
-    
-    while True:
-        try:
-            # Receive message from client
-            message_data = ws.receive()
-            print(f"Received message: {message_data}")
-            
-            # Parse the message
-            user_message = json.loads(message_data)
-            messages.append(user_message)
-            
-            # Run the agent
-            response = client.run(
-                agent=reputation_agent, 
-                messages=messages,
-                stream=True
-            )
-            
-            # Accumulate the response content
-            accumulated_content = ""
-            
-            # Stream the response
-            for chunk in response:
-                try:
-                    if chunk.get("content"):
-                        # Accumulate content instead of sending immediately
-                        accumulated_content += chunk["content"]
-                    
-                    if chunk.get("tool_calls"):
-                        for tool_call in chunk["tool_calls"]:
-                            ws.send(json.dumps({
-                                "type": "tool_call",
-                                "data": tool_call
-                            }))
-                    
-                    if chunk.get("response"):
-                        messages.extend(chunk["response"].messages)
+    client = get_llm()
+
+    # ?session=<id>&offset=<n> resumes a session and replays the frames after offset n
+    session = chat_sessions.open(request.args.get('session'))
+    connection = None
+
+    try:
+        connection = ChatConnection.from_args(session, ws.send, request.args, wallet_id=agents.wallet_pool.route(session.id))
+        connection.open(int(request.args.get('offset', 0)))
+
+        while connection.connected:
+            try:
+                # Receive message from client
+                message_data = ws.receive()
+                print(f"Received message: {message_data}")
+                
+                # Parse the message and run the agent
+                connection.turn(client, reputation_agent, json.loads(message_data))
                         
-                except Exception as e:
-                    print(f"Error processing chunk: {e}")
-                    continue
-            
-            # Send the accumulated content as a single message
-            if accumulated_content:
-                ws.send(json.dumps({
-                    "type": "content",
-                    "data": accumulated_content.strip()
-                }))
-                    
-        except Exception as e:
-            print(f"WebSocket error: {e}")
-            break
\ No newline at end of file
+            except Exception as e:
+                print(f"WebSocket error: {e}")
+                break
+    finally:
+        if connection is not None:
+            connection.close()
+        chat_sessions.release(session)
+
+@sock.route('/ws/pools')
+def pools_socket(ws):
+    subscription = pool_feed.subscribe()
+
+    try:
+        while ws.connected:
+            # Time out now and then so a closed socket is noticed even when nothing changes
+            frame = subscription.get(timeout=5)
+            if frame is not None:
+                ws.send(json.dumps(frame))
+    except Exception as e:
+        print(f"Pool feed socket closed: {e}")
+    finally:
+        pool_feed.unsubscribe(subscription)
\ No newline at end of file
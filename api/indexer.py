@@ -0,0 +1,444 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from eth_utils import event_abi_to_log_topic
+
+from chain import AAVE_POOL_ADDRESS, USDC_ADDRESS, get_registry, get_web3
+from contracts import load_abi, AAVE_POOL_EVENTS
+
+# Event kinds, also the columns of the per-account counters
+SUPPLY, BORROW, REPAY, WITHDRAW, LIQUIDATED, TRANSFER_OUT, TRANSFER_IN = range(7)
+KIND_NAMES = ('supply', 'borrow', 'repay', 'withdraw', 'liquidated', 'transferOut', 'transferIn')
+AAVE_KINDS = [SUPPLY, BORROW, REPAY, WITHDRAW]
+
+# Which field is the account, which the token, and which the amount, per event
+EVENT_FIELDS = {
+    'Supply': (SUPPLY, 'onBehalfOf', 'reserve', 'amount'),
+    'Borrow': (BORROW, 'onBehalfOf', 'reserve', 'amount'),
+    'Repay': (REPAY, 'user', 'reserve', 'amount'),
+    'Withdraw': (WITHDRAW, 'user', 'reserve', 'amount'),
+    'LiquidationCall': (LIQUIDATED, 'user', 'debtAsset', 'debtToCover'),
+}
+
+ZERO_ADDRESS = bytes(20)
+
+# ~2s blocks on Base
+BLOCKS_PER_DAY = 43_200
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+# Successful chunks before a range that failed may be tried again
+CEILING_CHUNKS = 50
+
+COLUMNS = ('block', 'log_index', 'kind', 'account', 'token', 'amount')
+
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:] if address.startswith('0x') else address).rjust(20, b'\0')[-20:]
+
+
+class EventDecoder:
+    """Decodes raw logs straight from topics and data, without building web3 event objects"""
+
+    def __init__(self, codec, abi: list):
+        self.codec = codec
+        self.events: Dict[bytes, Tuple[str, List[str], List[str], List[str]]] = {}
+        for entry in abi:
+            if entry.get('type') != 'event':
+                continue
+            indexed = [param['name'] for param in entry['inputs'] if param['indexed']]
+            data = [(param['name'], param['type']) for param in entry['inputs'] if not param['indexed']]
+            self.events[event_abi_to_log_topic(entry)] = (entry['name'], indexed, [t for _, t in data], [n for n, _ in data])
+
+    @property
+    def topics(self) -> List[str]:
+        return ['0x' + topic.hex() for topic in self.events]
+
+    def decode(self, log: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        topics = log['topics']
+        event = self.events.get(bytes(topics[0]))
+        if event is None:
+            return None
+        name, indexed, data_types, data_names = event
+        # Indexed parameters here are all addresses or small ints; addresses stay as 20 raw bytes
+        fields = {param: bytes(topic)[-20:] for param, topic in zip(indexed, topics[1:])}
+        data = log['data']
+        if isinstance(data, str):
+            data = bytes.fromhex(data[2:])
+        fields.update(zip(data_names, self.codec.decode(data_types, bytes(data))))
+        return name, fields
+
+
+class ReputationIndex:
+    """Per-account activity counters, updated in place as new event rows arrive.
+
+    Accounts get a dense integer id on first sight; counts, volumes and the
+    first/last active block live in arrays indexed by that id, so scoring any
+    number of addresses is a lookup plus a few vector operations.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.ids: Dict[bytes, int] = {}
+        self.counts = np.zeros((capacity, len(KIND_NAMES)), dtype=np.int64)
+        self.volume = np.zeros((capacity, len(KIND_NAMES)), dtype=np.float64)
+        self.first_block = np.zeros(capacity, dtype=np.int64)
+        self.last_block = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self.first_block)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        extra = capacity - len(self.first_block)
+        self.counts = np.vstack([self.counts, np.zeros((extra, self.counts.shape[1]), dtype=np.int64)])
+        self.volume = np.vstack([self.volume, np.zeros((extra, self.volume.shape[1]), dtype=np.float64)])
+        self.first_block = np.concatenate([self.first_block, np.zeros(extra, dtype=np.int64)])
+        self.last_block = np.concatenate([self.last_block, np.zeros(extra, dtype=np.int64)])
+
+    def apply(self, columns: Dict[str, np.ndarray]) -> None:
+        """Fold a batch of event rows into the counters"""
+        if not len(columns['block']):
+            return
+        ids = np.empty(len(columns['account']), dtype=np.int64)
+        for i, account in enumerate(columns['account'].tolist()):
+            # numpy drops trailing zero bytes from S20 values; put them back so keys match _address_bytes
+            account = account.ljust(20, b'\0')
+            account_id = self.ids.get(account)
+            if account_id is None:
+                account_id = self.ids[account] = len(self.ids)
+            ids[i] = account_id
+        self._grow(len(self.ids))
+
+        blocks = columns['block'].astype(np.int64)
+        kinds = columns['kind'].astype(np.int64)
+        np.add.at(self.counts, (ids, kinds), 1)
+        np.add.at(self.volume, (ids, kinds), columns['amount'])
+
+        new = self.first_block[ids] == 0
+        self.first_block[ids[new]] = blocks[new]
+        np.minimum.at(self.first_block, ids, blocks)
+        np.maximum.at(self.last_block, ids, blocks)
+
+    def scores(self, addresses: Sequence[str]) -> List[Dict[str, Any]]:
+        """Reputation scores (0-100) with their components, for any number of addresses"""
+        ids = np.array([self.ids.get(_address_bytes(address), -1) for address in addresses], dtype=np.int64)
+        known = ids >= 0
+        rows = np.where(known, ids, 0)
+
+        counts = self.counts[rows]
+        actions = counts.sum(axis=1)
+        borrows, repays, liquidations = counts[:, BORROW], counts[:, REPAY], counts[:, LIQUIDATED]
+
+        activity = np.minimum(1.0, np.log1p(actions) / np.log1p(100))
+        tenure_days = (self.last_block[rows] - self.first_block[rows]) / BLOCKS_PER_DAY
+        tenure = np.minimum(1.0, tenure_days / 90)
+        # No borrowing history counts as neutral rather than perfect
+        with np.errstate(divide='ignore', invalid='ignore'):
+            repayment = np.where(borrows > 0, np.minimum(1.0, repays / borrows), 0.5)
+        protocol_use = (counts[:, AAVE_KINDS] > 0).sum(axis=1) / len(AAVE_KINDS)
+
+        score = 100 * (0.3 * activity + 0.25 * tenure + 0.3 * repayment + 0.15 * protocol_use) * 0.5 ** liquidations
+        score = np.where(known, score, 0.0)
+
+        results = []
+        for i, address in enumerate(addresses):
+            if not known[i]:
+                results.append({'address': address, 'score': 0, 'indexed': False})
+                continue
+            results.append({
+                'address': address,
+                'score': round(float(score[i]), 1),
+                'indexed': True,
+                'actions': {name: int(count) for name, count in zip(KIND_NAMES, counts[i])},
+                'firstBlock': int(self.first_block[rows[i]]),
+                'lastBlock': int(self.last_block[rows[i]]),
+                'components': {
+                    'activity': round(float(activity[i]), 3),
+                    'tenure': round(float(tenure[i]), 3),
+                    'repayment': round(float(repayment[i]), 3),
+                    'protocolUse': round(float(protocol_use[i]), 3),
+                    'liquidations': int(liquidations[i]),
+                },
+            })
+        return results
+
+
+class ActivityIndexer:
+    """Follows Aave pool and USDC events into a local columnar store and a live reputation index.
+
+    Logs come from chunked eth_getLogs over both contracts at once. The
+    block range adapts: it halves when a request fails (too many results,
+    timeouts) or returns more than `target_logs`, and doubles while
+    responses stay small, though not back past a failed size for the next
+    few dozen chunks. Rows are buffered and written as compressed .npz
+    segments of parallel columns; checkpoint.json lists the segments and
+    the last block they cover, and is replaced atomically after each
+    segment, so a restart resumes from the checkpoint and only re-reads
+    blocks that were buffered but not yet written. Blocks closer than
+    `confirmations` to the head are left for later, which keeps reorgs out.
+    """
+
+    def __init__(self, directory: str, w3=None, registry=None, start_block: Optional[int] = None,
+                 backfill_blocks: int = 100_000, confirmations: int = 5, initial_range: int = 2_000,
+                 min_range: int = 10, max_range: int = 50_000, target_logs: int = 5_000,
+                 flush_rows: int = 50_000, flush_interval: float = 60.0, poll_interval: float = 2.0):
+        self.directory = directory
+        self._w3 = w3
+        self._registry = registry
+        self.start_block = start_block
+        self.backfill_blocks = backfill_blocks
+        self.confirmations = confirmations
+        self.range = initial_range
+        self.min_range = min_range
+        self.max_range = max_range
+        self.target_logs = target_logs
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self._ceiling = max_range
+        self._ceiling_ttl = 0
+
+        self.index = ReputationIndex()
+        self.indexed_block: Optional[int] = None
+        self.checkpoint_block: Optional[int] = None
+        self.segments: List[str] = []
+        self._buffer: List[Dict[str, np.ndarray]] = []
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        self._decimals: Dict[bytes, int] = {}
+        self._decoder: Optional[EventDecoder] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loaded = False
+
+    @property
+    def w3(self):
+        if self._w3 is None:
+            self._w3 = get_web3()
+        return self._w3
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            self._registry = get_registry()
+        return self._registry
+
+    @property
+    def decoder(self) -> EventDecoder:
+        if self._decoder is None:
+            abi = load_abi('aave_v3.json', AAVE_POOL_EVENTS) + load_abi('usdc.json', ['Transfer'])
+            self._decoder = EventDecoder(self.w3.codec, abi)
+        return self._decoder
+
+    # Storage
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self) -> None:
+        """Rebuild the reputation index from the segments named in the checkpoint"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._path(CHECKPOINT_FILE)) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for name in checkpoint['segments']:
+            with np.load(self._path(name)) as segment:
+                self.index.apply({column: segment[column] for column in COLUMNS})
+        with self._lock:
+            self.segments = list(checkpoint['segments'])
+            self.checkpoint_block = self.indexed_block = checkpoint['block']
+
+    def _write_atomic(self, name: str, write) -> None:
+        temporary = self._path(name + '.tmp')
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.replace(temporary, self._path(name))
+
+    def flush(self) -> None:
+        """Write buffered rows as one segment and move the checkpoint up to the last indexed block"""
+        if self.indexed_block is None or self.indexed_block == self.checkpoint_block:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            buffer, self._buffer, self._buffered_rows = self._buffer, [], 0
+            block = self.indexed_block
+
+        segments = list(self.segments)
+        if buffer:
+            columns = {column: np.concatenate([rows[column] for rows in buffer]) for column in COLUMNS}
+            first = int(columns['block'][0])
+            name = f'segment-{first:012d}-{block:012d}.npz'
+            self._write_atomic(name, lambda f: np.savez_compressed(f, **columns))
+            segments.append(name)
+
+        checkpoint = json.dumps({'block': block, 'segments': segments}).encode()
+        self._write_atomic(CHECKPOINT_FILE, lambda f: f.write(checkpoint))
+        with self._lock:
+            self.segments = segments
+            self.checkpoint_block = block
+        self._last_flush = time.monotonic()
+
+    # Fetching
+
+    def _get_logs(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        return self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': [self.w3.to_checksum_address(AAVE_POOL_ADDRESS), self.w3.to_checksum_address(USDC_ADDRESS)],
+            'topics': [self.decoder.topics],
+        })
+
+    def _token_decimals(self, token: bytes) -> int:
+        decimals = self._decimals.get(token)
+        if decimals is None:
+            try:
+                decimals = self.registry.token_decimals('0x' + token.hex())
+            except Exception as e:
+                print(f"Error getting decimals for 0x{token.hex()}, assuming 18: {str(e)}")
+                decimals = 18
+            self._decimals[token] = decimals
+        return decimals
+
+    def _rows(self, logs: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Decode logs into columns: one row per account touched (a transfer touches two)"""
+        usdc = _address_bytes(USDC_ADDRESS)
+        rows = []
+        for log in logs:
+            decoded = self.decoder.decode(log)
+            if decoded is None:
+                continue
+            name, fields = decoded
+            block, log_index = log['blockNumber'], log['logIndex']
+            if name == 'Transfer':
+                amount = fields['value'] / 10 ** self._token_decimals(usdc)
+                if fields['from'] != ZERO_ADDRESS:
+                    rows.append((block, log_index, TRANSFER_OUT, fields['from'], usdc, amount))
+                if fields['to'] != ZERO_ADDRESS:
+                    rows.append((block, log_index, TRANSFER_IN, fields['to'], usdc, amount))
+                continue
+            kind, account, token, amount = EVENT_FIELDS[name]
+            token = fields[token]
+            rows.append((block, log_index, kind, fields[account], token, fields[amount] / 10 ** self._token_decimals(token)))
+
+        blocks, log_indexes, kinds, accounts, tokens, amounts = zip(*rows) if rows else ((),) * 6
+        return {
+            'block': np.array(blocks, dtype=np.uint64),
+            'log_index': np.array(log_indexes, dtype=np.uint32),
+            'kind': np.array(kinds, dtype=np.uint8),
+            'account': np.array(accounts, dtype='S20'),
+            'token': np.array(tokens, dtype='S20'),
+            'amount': np.array(amounts, dtype=np.float64),
+        }
+
+    def _first_block(self, head: int) -> int:
+        if self.indexed_block is not None:
+            return self.indexed_block + 1
+        if self.start_block is not None:
+            return self.start_block
+        return max(0, head - self.backfill_blocks)
+
+    def sync(self) -> int:
+        """Index every confirmed block since the last run; returns the number of rows added"""
+        self.load()
+        head = self.w3.eth.block_number - self.confirmations
+        cursor = self._first_block(head)
+        added = 0
+
+        while cursor <= head:
+            end = min(head, cursor + self.range - 1)
+            try:
+                logs = self._get_logs(cursor, end)
+            except Exception as e:
+                if self.range <= self.min_range:
+                    raise
+                # Don't grow back into a range that just failed for a while
+                self._ceiling, self._ceiling_ttl = self.range // 2, CEILING_CHUNKS
+                self.range = max(self.min_range, self.range // 2)
+                print(f"eth_getLogs {cursor}-{end} failed, retrying with {self.range} blocks: {str(e)}")
+                continue
+
+            self._ceiling_ttl -= 1
+            if self._ceiling_ttl <= 0:
+                self._ceiling = self.max_range
+            if len(logs) > self.target_logs and end > cursor:
+                self.range = max(self.min_range, self.range // 2)
+            elif len(logs) < self.target_logs // 4:
+                self.range = min(self.max_range, self._ceiling, self.range * 2)
+
+            columns = self._rows(logs)
+            with self._lock:
+                self.index.apply(columns)
+                if len(columns['block']):
+                    self._buffer.append(columns)
+                    self._buffered_rows += len(columns['block'])
+                self.indexed_block = end
+            added += len(columns['block'])
+            cursor = end + 1
+
+            if self._buffered_rows >= self.flush_rows:
+                self.flush()
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return added
+
+    def scores(self, addresses: Sequence[str]) -> Dict[str, Any]:
+        with self._lock:
+            return {'indexedBlock': self.indexed_block, 'scores': self.index.scores(addresses)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'indexedBlock': self.indexed_block,
+            'checkpointBlock': self.checkpoint_block,
+            'accounts': len(self.index),
+            'segments': len(self.segments),
+            'bufferedRows': self._buffered_rows,
+            'range': self.range,
+        }
+
+    # Background follower
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-indexer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Activity indexer error: {str(e)}")
+            time.sleep(self.poll_interval)
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+activity_indexer = ActivityIndexer(
+    os.getenv('INDEXER_DIR', 'indexer_data'),
+    start_block=_optional_int(os.getenv('INDEXER_START_BLOCK')),
+    backfill_blocks=int(os.getenv('INDEXER_BACKFILL_BLOCKS', '100000')),
+    confirmations=int(os.getenv('INDEXER_CONFIRMATIONS', '5')),
+    initial_range=int(os.getenv('INDEXER_INITIAL_RANGE', '2000')),
+    max_range=int(os.getenv('INDEXER_MAX_RANGE', '50000')),
+    target_logs=int(os.getenv('INDEXER_TARGET_LOGS', '5000')),
+    flush_rows=int(os.getenv('INDEXER_FLUSH_ROWS', '50000')),
+    flush_interval=float(os.getenv('INDEXER_FLUSH_INTERVAL', '60')),
+    poll_interval=float(os.getenv('INDEXER_POLL_INTERVAL', '2'))
+)
@@ -0,0 +1,53 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+FINISHED_STATUSES = ('confirmed', 'failed', 'timeout', 'error')
+
+
+class JobStore:
+    """Thread-safe in-memory status records for background work.
+
+    Each job is a plain dict with an id, a status and timestamps. Only the
+    most recent `max_finished` finished jobs are kept; pending ones are
+    never evicted.
+    """
+
+    def __init__(self, max_finished: int = 10_000):
+        self.max_finished = max_finished
+        self._jobs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, **fields) -> Dict[str, Any]:
+        now = time.time()
+        job = {'id': uuid.uuid4().hex, 'status': 'pending', 'createdAt': now, 'updatedAt': now, **fields}
+        with self._lock:
+            self._jobs[job['id']] = job
+        return dict(job)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updatedAt=time.time())
+            if job['status'] in FINISHED_STATUSES:
+                self._jobs.move_to_end(job_id)
+                self._evict()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] == status)
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
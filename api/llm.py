@@ -0,0 +1,124 @@
+from typing import Any, Dict, Iterator, Optional
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+import httpx
+from openai import OpenAI
+from swarm import Swarm
+
+from metrics import llm_seconds, llm_ttft_seconds
+
+
+class LLMClient:
+    """One OpenAI client and Swarm for the whole process.
+
+    All chat sessions and agent loops share a single keep-alive HTTP
+    connection pool instead of opening a new one (and new TLS handshakes)
+    per connection. A semaphore caps concurrent LLM turns; `stats()`
+    reports how saturated the limiter and pool are.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 60.0,
+        max_concurrency: int = 32,
+        timeout: float = 60.0
+    ):
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+        self.openai = OpenAI(http_client=self.http_client)
+        self.swarm = Swarm(client=self.openai)
+
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the `max_concurrency` LLM slots"""
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.wait_seconds += time.monotonic() - started
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._semaphore.release()
+
+    def run(self, **kwargs) -> Any:
+        """Swarm.run under the concurrency limit; streaming runs hold their slot until consumed"""
+        if kwargs.get('stream'):
+            return self._stream(**kwargs)
+        with self.slot(), llm_seconds.time(stream='false'):
+            return self.swarm.run(**kwargs)
+
+    def _stream(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        with self.slot(), llm_seconds.time(stream='true'):
+            started = time.perf_counter()
+            first_token = False
+            for chunk in self.swarm.run(**kwargs):
+                if not first_token and (chunk.get('content') or chunk.get('tool_calls')):
+                    llm_ttft_seconds.observe(time.perf_counter() - started)
+                    first_token = True
+                yield chunk
+
+    def _pool_connections(self) -> Optional[int]:
+        # httpx doesn't expose pool occupancy publicly; read it from the transport when we can
+        try:
+            return len(self.http_client._transport._pool.connections)
+        except AttributeError:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'inFlight': self.in_flight,
+                'waiting': self.waiting,
+                'maxConcurrency': self.max_concurrency,
+                'saturation': round(self.in_flight / self.max_concurrency, 4),
+                'completed': self.completed,
+                'avgWaitSeconds': round(self.wait_seconds / self.completed, 4) if self.completed else 0,
+                'poolConnections': self._pool_connections(),
+                'maxConnections': self.max_connections,
+            }
+
+
+_llm: Optional[LLMClient] = None
+_llm_lock = threading.Lock()
+
+
+def get_llm() -> LLMClient:
+    """The shared LLMClient, created on first use from LLM_* environment settings"""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = LLMClient(
+                    max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '50')),
+                    max_keepalive=int(os.getenv('LLM_MAX_KEEPALIVE', '20')),
+                    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '32')),
+                    timeout=float(os.getenv('LLM_TIMEOUT', '60'))
+                )
+    return _llm
@@ -0,0 +1,282 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import inspect
+import threading
+import time
+
+# Latency buckets in seconds, from a cached read to a slow LLM turn
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Prometheus namespace for this app's metrics (FAM, Financial Agent Management), so they don't
+# clash with same-named series from other exporters scraped into the same Prometheus
+NAMESPACE = 'fam'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    """One metric family; subclasses render their current values as exposition lines"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), namespace: str = ''):
+        self.name = f'{namespace}_{name}' if namespace else name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}', *self.samples()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), namespace: str = ''):
+        super().__init__(name, help, labelnames, namespace)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in values]
+
+
+class Gauge(Metric):
+    """A value that is set directly or read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), namespace: str = ''):
+        super().__init__(name, help, labelnames, namespace)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in values.items()]
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; observe() is a bisect and a few additions under a lock"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), namespace: str = '',
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames, namespace)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (the last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+rpc_seconds = registry.register(Histogram(
+    'rpc_request_seconds', 'JSON-RPC request latency by method and, for eth_call, contract function',
+    ('method', 'function'), namespace=NAMESPACE
+))
+rpc_errors = registry.register(Counter(
+    'rpc_errors_total', 'JSON-RPC requests that raised', ('method', 'function'), namespace=NAMESPACE
+))
+tool_seconds = registry.register(Histogram(
+    'tool_call_seconds', 'Agent tool call latency', ('tool', 'status'), namespace=NAMESPACE
+))
+llm_ttft_seconds = registry.register(Histogram(
+    'llm_time_to_first_token_seconds', 'Time from starting an LLM run to its first content or tool call chunk',
+    namespace=NAMESPACE
+))
+llm_seconds = registry.register(Histogram(
+    'llm_request_seconds', 'LLM run latency, including tool calls made during the run', ('stream',),
+    namespace=NAMESPACE
+))
+http_seconds = registry.register(Histogram(
+    'http_request_seconds', 'HTTP request latency by route', ('method', 'route', 'status'), namespace=NAMESPACE
+))
+websocket_sessions = registry.register(Gauge(
+    'websocket_sessions', 'Open WebSocket connections', ('socket',), namespace=NAMESPACE
+))
+transactions_in_flight = registry.register(Gauge(
+    'transactions_in_flight', 'Submitted transactions still waiting for a receipt', namespace=NAMESPACE
+))
+action_queue_depth = registry.register(Gauge(
+    'action_queue_depth', 'Queued and running /api/aave actions', namespace=NAMESPACE
+))
+indexer_block = registry.register(Gauge(
+    'indexer_block', 'Last block the activity indexer has read', namespace=NAMESPACE
+))
+
+# 4-byte selectors (hex, 0x-prefixed) to contract function names, for labelling eth_call
+_function_names: Dict[str, str] = {}
+
+
+def name_selector(selector: bytes, function: str) -> None:
+    _function_names['0x' + selector.hex()] = function
+
+
+def _function_label(method: str, params: Any) -> str:
+    if method != 'eth_call' or not params:
+        return ''
+    data = params[0].get('data') or params[0].get('input') or ''
+    if isinstance(data, (bytes, bytearray)):
+        data = '0x' + bytes(data).hex()
+    return _function_names.get(data[:10].lower(), 'unknown')
+
+
+def instrument_web3(w3):
+    """Time every request `w3`'s provider makes; works for Web3 and AsyncWeb3"""
+    provider = w3.provider
+    make_request = provider.make_request
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+
+    def record(method, params, started, failed):
+        function = _function_label(method, params)
+        rpc_seconds.observe(time.perf_counter() - started, method=method, function=function)
+        if failed:
+            rpc_errors.inc(method=method, function=function)
+
+    if inspect.iscoroutinefunction(make_request):
+        async def timed_request(method, params):
+            started, failed = time.perf_counter(), True
+            try:
+                response = await make_request(method, params)
+                failed = 'error' in response
+                return response
+            finally:
+                record(method, params, started, failed)
+    else:
+        def timed_request(method, params):
+            started, failed = time.perf_counter(), True
+            try:
+                response = make_request(method, params)
+                failed = 'error' in response
+                return response
+            finally:
+                record(method, params, started, failed)
+    provider.make_request = timed_request
+
+    if make_batch_request is not None and not inspect.iscoroutinefunction(make_batch_request):
+        def timed_batch(requests):
+            started, failed = time.perf_counter(), True
+            try:
+                response = make_batch_request(requests)
+                failed = False
+                return response
+            finally:
+                record('batch', None, started, failed)
+        provider.make_batch_request = timed_batch
+
+    return w3
+
+
+def timed_tool(function: Callable) -> Callable:
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        started, status = time.perf_counter(), 'error'
+        try:
+            result = function(*args, **kwargs)
+            status = 'ok'
+            return result
+        finally:
+            tool_seconds.observe(time.perf_counter() - started, tool=function.__name__, status=status)
+    return wrapper
+
+
+def instrument_tools(agent) -> None:
+    """Time every tool call a Swarm agent makes"""
+    agent.functions = [timed_tool(function) for function in agent.functions]
+
+
+def record_http(method: str, route: Optional[str], status: int, seconds: float) -> None:
+    http_seconds.observe(seconds, method=method, route=route or '<unmatched>', status=status)
@@ -0,0 +1,129 @@
+from typing import Any, List, NamedTuple, Optional, Sequence
+import json
+
+from eth_utils import function_abi_to_4byte_selector
+from metrics import name_selector
+
+# Multicall3 is deployed at the same address on Base, Base Sepolia and most EVM chains
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MULTICALL3_ABI = json.loads('''[
+    {
+        "inputs": [{"components": [{"internalType": "address","name": "target","type": "address"},
+                                   {"internalType": "bool","name": "allowFailure","type": "bool"},
+                                   {"internalType": "bytes","name": "callData","type": "bytes"}],
+                    "internalType": "struct Multicall3.Call3[]","name": "calls","type": "tuple[]"}],
+        "name": "aggregate3",
+        "outputs": [{"components": [{"internalType": "bool","name": "success","type": "bool"},
+                                    {"internalType": "bytes","name": "returnData","type": "bytes"}],
+                     "internalType": "struct Multicall3.Result[]","name": "returnData","type": "tuple[]"}],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256","name": "blockNumber","type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]''')
+
+# Label Multicall eth_calls by function in the RPC metrics
+for _entry in MULTICALL3_ABI:
+    name_selector(function_abi_to_4byte_selector(_entry), _entry['name'])
+
+
+class Call(NamedTuple):
+    target: str
+    data: bytes
+    output_types: List[str]
+    label: str
+
+
+class CallResult(NamedTuple):
+    success: bool
+    value: Any
+
+
+class MulticallResult(NamedTuple):
+    block_number: int
+    results: List[CallResult]
+
+
+def abi_output_types(abi: dict) -> List[str]:
+    """Flatten ABI outputs (including structs) into eth-abi type strings"""
+    def collapse(param):
+        if param['type'].startswith('tuple'):
+            inner = ','.join(collapse(c) for c in param['components'])
+            return f"({inner}){param['type'][len('tuple'):]}"
+        return param['type']
+
+    return [collapse(o) for o in abi.get('outputs', [])]
+
+
+class Multicall:
+    """Batches contract view calls into a single Multicall3 `aggregate3` eth_call.
+
+    Every call in a batch executes against the same block, and each call is
+    sent with `allowFailure` so one reverting target doesn't sink the batch.
+    """
+
+    def __init__(self, w3, address: str = MULTICALL3_ADDRESS):
+        self.w3 = w3
+        self.contract = w3.eth.contract(
+            address=w3.to_checksum_address(address),
+            abi=MULTICALL3_ABI
+        )
+
+        self._block_number_data = self.contract.functions.getBlockNumber()._encode_transaction_data()
+
+    @staticmethod
+    def prepare(fn: Any) -> Call:
+        """Encode a bound contract function (e.g. `c.functions.totalSupply()`) into a Call"""
+        if isinstance(fn, Call):
+            return fn
+        data = fn._encode_transaction_data()
+        if isinstance(data, str):
+            data = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+        return Call(fn.address, data, abi_output_types(fn.abi), fn.fn_name)
+
+    def encode(self, calls: Sequence[Call]) -> list:
+        """Build the aggregate3 argument list for prepared calls"""
+        # The block number rides along as the first call so results are tagged with their block
+        encoded = [(self.contract.address, False, self._block_number_data)]
+        for call in calls:
+            encoded.append((call.target, True, call.data))
+        return encoded
+
+    def decode(self, calls: Sequence[Call], raw: Sequence[Any]) -> MulticallResult:
+        """Decode aggregate3 return data back into per-call results"""
+        (_, block_data), *returned = raw
+        block_number = self.w3.codec.decode(['uint256'], block_data)[0]
+
+        results = []
+        for call, (success, data) in zip(calls, returned):
+            if not success or not data:
+                results.append(CallResult(False, None))
+                continue
+            try:
+                values = self.w3.codec.decode(call.output_types, data)
+            except Exception as e:
+                print(f"Error decoding {call.label} result from {call.target}: {str(e)}")
+                results.append(CallResult(False, None))
+                continue
+            results.append(CallResult(True, values[0] if len(values) == 1 else tuple(values)))
+
+        return MulticallResult(block_number, results)
+
+    def aggregate(self, calls: Sequence[Any], block_identifier: Optional[Any] = 'latest') -> MulticallResult:
+        """Execute all calls in one eth_call, optionally pinned to `block_identifier`"""
+        calls = [self.prepare(call) for call in calls]
+        raw = self.contract.functions.aggregate3(self.encode(calls)).call(block_identifier=block_identifier)
+        return self.decode(calls, raw)
+
+    async def aggregate_async(self, calls: Sequence[Any], block_identifier: Optional[Any] = 'latest') -> MulticallResult:
+        """`aggregate` for an AsyncWeb3 instance"""
+        calls = [self.prepare(call) for call in calls]
+        raw = await self.contract.functions.aggregate3(self.encode(calls)).call(block_identifier=block_identifier)
+        return self.decode(calls, raw)
@@ -0,0 +1,157 @@
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import threading
+
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+T = TypeVar('T')
+
+# Node error messages that mean our local nonce has fallen behind the chain
+NONCE_ERRORS = (
+    'nonce too low',
+    'nonce is too low',
+    'invalid nonce',
+    'replacement transaction underpriced',
+)
+
+# The node already holds this exact signed transaction, which may well be ours from an earlier
+# attempt; resubmitting under a fresh nonce could send it twice
+AMBIGUOUS_ERRORS = (
+    'already known',
+    'already imported',
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+
+def is_ambiguous(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(fragment in message for fragment in AMBIGUOUS_ERRORS)
+
+
+def is_rejection(error: Exception) -> bool:
+    """Whether `error` proves the transaction was not accepted: the node answered with an error,
+    or building/signing failed. Timeouts, dropped connections and "already known" prove nothing;
+    it may be in the mempool."""
+    return (
+        isinstance(error, (Web3RPCError, ContractLogicError, ValueError, TypeError))
+        and not is_nonce_error(error)
+        and not is_ambiguous(error)
+    )
+
+
+class NonceManager:
+    """Hands out transaction nonces for one signing account without asking the chain each time.
+
+    The first nonce comes from the account's pending transaction count; after
+    that nonces are allocated locally, so transactions from the same wallet
+    can be sent back to back without waiting on each other. A nonce comes
+    back only when the node rejected its transaction; a failed send that
+    leaves a gap, may have been broadcast, or hit "nonce too low" triggers
+    a resync from the pending count instead. Only nonce errors are retried;
+    "already known" means the node may hold this very transaction, so it is
+    resynced and raised rather than sent again.
+    Safe to share between threads and coroutines.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+
+    @property
+    def needs_sync(self) -> bool:
+        return self._next is None
+
+    def sync(self, chain_nonce: int) -> None:
+        """Seed the counter from the chain's pending nonce if it isn't seeded yet"""
+        with self._lock:
+            if self._next is None:
+                self._next = chain_nonce
+
+    def reset(self) -> None:
+        """Forget the local counter; the next allocation resyncs with the chain"""
+        with self._lock:
+            self._next = None
+
+    def take(self) -> int:
+        with self._lock:
+            if self._next is None:
+                raise RuntimeError(f"Nonce manager for {self.address} is not synced")
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int) -> None:
+        """Give back a nonce whose transaction never reached the mempool"""
+        with self._lock:
+            if self._next == nonce + 1:
+                self._next = nonce
+            else:
+                # Later nonces are already out, so there is now a gap only the chain can resolve
+                self._next = None
+
+    def failed(self, nonce: int, error: Exception) -> None:
+        """Undo take() after `submit(nonce)` raised `error`"""
+        if is_rejection(error):
+            self.release(nonce)
+        else:
+            self.reset()
+
+    def next_nonce(self, fetch: Callable[[], int]) -> int:
+        if self._next is None:
+            self.sync(fetch())
+        return self.take()
+
+    async def anext_nonce(self, fetch: Callable[[], Awaitable[int]]) -> int:
+        if self._next is None:
+            self.sync(await fetch())
+        return self.take()
+
+    def send(self, submit: Callable[[int], T], fetch: Callable[[], int], retries: int = 2) -> T:
+        """Call `submit(nonce)`, resyncing and retrying when the node rejects the nonce"""
+        for attempt in range(retries + 1):
+            nonce = self.next_nonce(fetch)
+            try:
+                return submit(nonce)
+            except Exception as e:
+                if is_nonce_error(e) and attempt < retries:
+                    self.reset()
+                    continue
+                self.failed(nonce, e)
+                raise
+
+    async def asend(
+        self,
+        submit: Callable[[int], Awaitable[T]],
+        fetch: Callable[[], Awaitable[int]],
+        retries: int = 2
+    ) -> T:
+        """`send` for coroutine submit/fetch callables"""
+        for attempt in range(retries + 1):
+            nonce = await self.anext_nonce(fetch)
+            try:
+                return await submit(nonce)
+            except Exception as e:
+                if is_nonce_error(e) and attempt < retries:
+                    self.reset()
+                    continue
+                self.failed(nonce, e)
+                raise
+
+
+_managers: Dict[str, NonceManager] = {}
+_managers_lock = threading.Lock()
+
+
+def nonce_manager(address: str) -> NonceManager:
+    """The process-wide NonceManager for `address`"""
+    key = address.lower()
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = NonceManager(address)
+            _managers[key] = manager
+        return manager
@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import inspect
+import queue
+import threading
+import time
+
+
+class Subscription:
+    """A subscriber's outbound frame queue"""
+
+    def __init__(self, max_queue: int):
+        self.frames: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.synced = False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def push(self, frame: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+        try:
+            self.frames.put_nowait(frame)
+        except (queue.Full, asyncio.QueueFull):
+            # Slow consumer: drop its backlog and resync it with a full snapshot
+            while not self.frames.empty():
+                try:
+                    self.frames.get_nowait()
+                except (queue.Empty, asyncio.QueueEmpty):
+                    break
+            self.frames.put_nowait(snapshot)
+
+
+class LoopSubscription(Subscription):
+    """A subscription read from an event loop, which awaits frames instead of polling for them"""
+
+    def __init__(self, max_queue: int, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        # Only touched on `loop`; the feed thread hands frames over with call_soon_threadsafe
+        self.frames: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.synced = False
+
+    async def aget(self) -> Dict[str, Any]:
+        return await self.frames.get()
+
+    def push(self, frame: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(super().push, frame, snapshot)
+        except RuntimeError:
+            # The loop has closed; the socket's unsubscribe is on its way
+            pass
+
+
+def diff_pools(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Changed fields per asset between two pool lists, plus assets that disappeared"""
+    before = {pool['asset']: pool for pool in previous}
+    changes = {}
+    for pool in current:
+        old = before.pop(pool['asset'], None)
+        if old is None:
+            changes[pool['asset']] = pool
+            continue
+        changed = {key: value for key, value in pool.items() if old.get(key) != value}
+        if changed:
+            changes[pool['asset']] = changed
+    return {'changes': changes, 'removed': list(before)}
+
+
+class PoolFeed:
+    """Pushes live pool data to WebSocket subscribers from a single block watcher.
+
+    One background thread polls the block number and, on each new block,
+    reads the pools once, stores the snapshot in the agent's pool cache and
+    broadcasts only the changed fields to every subscriber. RPC load is the
+    same whether one client is listening or a thousand.
+    """
+
+    def __init__(self, agent, poll_interval: float = 1.0, max_queue: int = 64):
+        self.agent = agent
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.block_number: Optional[int] = None
+        self.pools: Optional[List[Dict[str, Any]]] = None
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        """A new subscription; pass the running `loop` to await frames on it with aget()"""
+        subscription = LoopSubscription(self.max_queue, loop) if loop is not None else Subscription(self.max_queue)
+        with self._lock:
+            if self.pools is not None:
+                self._send(subscription, self._snapshot_frame())
+            self._subscribers.append(subscription)
+        self.start()
+        self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='pool-feed', daemon=True)
+                self._thread.start()
+
+    def _resolve(self, result):
+        # The async lending agent returns coroutines; run them on this thread's own loop
+        if inspect.isawaitable(result):
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(result)
+        return result
+
+    def _run(self) -> None:
+        while True:
+            if not self._subscribers:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            try:
+                block_number = self._resolve(self.agent.get_block_number())
+                if self.block_number is None or block_number > self.block_number:
+                    self._update(self._resolve(self.agent.fetch_pools(block_number)))
+            except Exception as e:
+                print(f"Pool feed error: {str(e)}")
+
+            time.sleep(self.poll_interval)
+
+    def _update(self, result: Dict[str, Any]) -> None:
+        pools, block_number = result['pools'], result['blockNumber']
+        self.agent.pool_cache.store(block_number, result)
+
+        with self._lock:
+            delta = diff_pools(self.pools, pools) if self.pools is not None else None
+            self.block_number, self.pools = block_number, pools
+
+            snapshot = self._snapshot_frame()
+            for subscription in self._subscribers:
+                if not subscription.synced:
+                    self._send(subscription, snapshot)
+                elif delta['changes'] or delta['removed']:
+                    self._send(subscription, {'type': 'delta', 'blockNumber': block_number, **delta})
+
+    def _snapshot_frame(self) -> Dict[str, Any]:
+        return {'type': 'snapshot', 'blockNumber': self.block_number, 'pools': self.pools}
+
+    def _send(self, subscription: Subscription, frame: Dict[str, Any]) -> None:
+        if frame['type'] == 'snapshot':
+            subscription.synced = True
+        subscription.push(frame, self._snapshot_frame())
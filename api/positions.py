@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from chain import get_multicall, get_registry
+
+
+class Position(NamedTuple):
+    address: str
+    total_collateral_base: int
+    total_debt_base: int
+    available_borrows_base: int
+    current_liquidation_threshold: int
+    ltv: int
+    health_factor: int
+    usdc_balance: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Same keys as the get_position tool
+        return {
+            "address": self.address,
+            "totalCollateralBase": self.total_collateral_base,
+            "totalDebtBase": self.total_debt_base,
+            "availableBorrowsBase": self.available_borrows_base,
+            "currentLiquidationThreshold": self.current_liquidation_threshold,
+            "ltv": self.ltv,
+            "healthFactor": self.health_factor,
+            "usdcBalance": self.usdc_balance,
+        }
+
+
+class PositionReader:
+    """Reads Aave account data and USDC balances for many addresses in batched Multicalls.
+
+    Addresses are split into chunks of `chunk_size` (two calls each). The
+    first chunk fixes the block; the rest are read in parallel pinned to it,
+    so every position in a result comes from the same block.
+    """
+
+    def __init__(self, registry=None, multicall=None, chunk_size: int = 250, max_workers: int = 4):
+        self._registry = registry
+        self._multicall = multicall
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            self._registry = get_registry()
+        return self._registry
+
+    @property
+    def multicall(self):
+        if self._multicall is None:
+            self._multicall = get_multicall()
+        return self._multicall
+
+    def _read_chunk(self, addresses: Sequence[str], block_identifier) -> Tuple[int, List[Optional[Position]]]:
+        calls = []
+        for address in addresses:
+            calls.append(self.registry.call('aave_pool', 'getUserAccountData', address))
+            calls.append(self.registry.call('usdc', 'balanceOf', address))
+
+        batch = self.multicall.aggregate(calls, block_identifier=block_identifier)
+
+        positions = []
+        for i, address in enumerate(addresses):
+            account, balance = batch.results[i * 2], batch.results[i * 2 + 1]
+            if not (account.success and balance.success):
+                positions.append(None)
+                continue
+            positions.append(Position(address, *account.value, balance.value))
+        return batch.block_number, positions
+
+    def read(self, addresses: Sequence[str], block_identifier='latest') -> Tuple[Optional[int], List[Optional[Position]]]:
+        """Positions for `addresses` (None where a read failed) and the block they were read at"""
+        addresses = [self.registry.checksum(address) for address in addresses]
+        if not addresses:
+            return None, []
+
+        chunks = [addresses[i:i + self.chunk_size] for i in range(0, len(addresses), self.chunk_size)]
+
+        block_number, positions = self._read_chunk(chunks[0], block_identifier)
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for _, chunk_positions in pool.map(lambda chunk: self._read_chunk(chunk, block_number), chunks[1:]):
+                    positions.extend(chunk_positions)
+
+        return block_number, positions
@@ -0,0 +1,79 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import threading
+import time
+
+
+class WarmupTask:
+    def __init__(self, name: str, func: Callable[[], Any], fatal: Tuple[type, ...] = ()):
+        self.name = name
+        self.func = func
+        # Errors that retrying can't fix, such as missing configuration
+        self.fatal = fatal
+        self.ready = False
+        self.failed = False
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+
+class Readiness:
+    """Warms slow dependencies in the background and reports when the process can serve.
+
+    Each task runs on its own daemon thread and is retried every
+    `retry_interval` seconds, so a slow or briefly unavailable dependency
+    delays readiness instead of failing startup. A task that raises one of
+    its `fatal` errors, or fails `max_attempts` times (0 for no limit), is
+    marked failed and reported with its error in status(). Requests that
+    need a dependency before it's warm still work; they just initialize it
+    themselves.
+    """
+
+    def __init__(self, retry_interval: float = 5.0, max_attempts: int = 0):
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self._tasks: Dict[str, WarmupTask] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, func: Callable[[], Any], fatal: Tuple[type, ...] = ()) -> None:
+        task = WarmupTask(name, func, fatal)
+        with self._lock:
+            self._tasks[name] = task
+        threading.Thread(target=self._run, args=(task,), name=f'warmup-{name}', daemon=True).start()
+
+    def _run(self, task: WarmupTask) -> None:
+        started = time.monotonic()
+        while True:
+            task.attempts += 1
+            try:
+                task.func()
+                task.ready, task.error = True, None
+                task.seconds = round(time.monotonic() - started, 3)
+                return
+            except Exception as e:
+                task.error = str(e)
+                print(f"Warm-up of {task.name} failed (attempt {task.attempts}): {e}")
+                if isinstance(e, task.fatal) or (self.max_attempts and task.attempts >= self.max_attempts):
+                    task.failed = True
+                    print(f"Giving up on warm-up of {task.name}")
+                    return
+            time.sleep(self.retry_interval)
+
+    @property
+    def ready(self) -> bool:
+        return all(task.ready for task in self._tasks.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'failed': [task.name for task in self._tasks.values() if task.failed],
+            'checks': {
+                task.name: {
+                    'ready': task.ready,
+                    'failed': task.failed,
+                    'attempts': task.attempts,
+                    'seconds': task.seconds,
+                    'error': task.error,
+                }
+                for task in self._tasks.values()
+            }
+        }
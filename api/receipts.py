@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+from jobs import JobStore
+
+
+class ReceiptWatcher:
+    """Tracks submitted transactions and records their outcome on a JobStore.
+
+    A single background thread checks every pending hash once per new block
+    with one batched eth_getTransactionReceipt request (one request per hash
+    if the batch fails), so request handlers can return as soon as a
+    transaction is sent. Timeouts are checked on every poll, so a stalled
+    node or failing RPC still ends its jobs.
+    """
+
+    def __init__(self, w3, jobs: JobStore, poll_interval: float = 1.0, timeout: float = 600.0):
+        self.w3 = w3
+        self.jobs = jobs
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_block: Optional[int] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def track(self, tx_hash: str, job_id: str) -> None:
+        with self._lock:
+            self._pending[tx_hash] = {'job_id': job_id, 'since': time.monotonic()}
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='receipt-watcher', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            try:
+                block_number = self.w3.eth.block_number
+                if self._last_block is None or block_number > self._last_block:
+                    self._last_block = block_number
+                    self._check(list(self._pending))
+            except Exception as e:
+                print(f"Receipt watcher error: {str(e)}")
+
+            self._expire(time.monotonic())
+            time.sleep(self.poll_interval)
+
+    def _fetch_receipts(self, hashes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        make_batch_request = getattr(self.w3.provider, 'make_batch_request', None)
+        if make_batch_request is not None:
+            try:
+                # web3 returns batch responses sorted back into request order
+                responses = make_batch_request([('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes])
+                return [response.get('result') for response in responses]
+            except Exception as e:
+                print(f"Batch receipt request failed, fetching one by one: {str(e)}")
+
+        receipts = []
+        for tx_hash in hashes:
+            try:
+                receipts.append(self.w3.eth.get_transaction_receipt(tx_hash))
+            except Exception:
+                receipts.append(None)
+        return receipts
+
+    def _check(self, hashes: List[str]) -> None:
+        for tx_hash, receipt in zip(hashes, self._fetch_receipts(hashes)):
+            entry = self._pending.get(tx_hash)
+            if entry is None or receipt is None:
+                continue
+
+            status = _as_int(receipt['status'])
+            self.jobs.update(
+                entry['job_id'],
+                status='confirmed' if status == 1 else 'failed',
+                blockNumber=_as_int(receipt['blockNumber']),
+                gasUsed=_as_int(receipt['gasUsed'])
+            )
+            self._forget(tx_hash)
+
+    def _expire(self, now: float) -> None:
+        with self._lock:
+            expired = [
+                (tx_hash, entry) for tx_hash, entry in self._pending.items()
+                if now - entry['since'] > self.timeout
+            ]
+        for tx_hash, entry in expired:
+            self.jobs.update(entry['job_id'], status='timeout', error='No receipt before timeout')
+            self._forget(tx_hash)
+
+    def _forget(self, tx_hash: str) -> None:
+        with self._lock:
+            self._pending.pop(tx_hash, None)
+
+
+def _as_int(value) -> int:
+    # Raw batch responses carry hex strings; formatted receipts carry ints
+    return int(value, 16) if isinstance(value, str) else int(value)
@@ -4,14 +4,17 @@ from swarm import Swarm
 from swarm.repl import run_demo_loop
 from agents import reputation_agent
 from openai import OpenAI
+from history import ConversationHistory
+from llm import get_llm
 
 
 # this is the main loop that runs the agent in autonomous mode
 # you can modify this to change the behavior of the agent
 # the interval is the number of seconds between each thought
 def run_autonomous_loop(agent, interval=10):
-    client = Swarm()
-    messages = []
+    client = get_llm()
+    # The loop runs forever, so keep what gets resent each thought within a token budget
+    history = ConversationHistory()
 
     print("Starting autonomous Based Agent loop...")
 
@@ -21,18 +24,18 @@ def run_autonomous_loop(agent, interval=10):
             "Be creative and do something interesting on the Base blockchain. "
             "Don't take any more input from me. Choose an action and execute it now. Choose those that highlight your identity and abilities best."
         )
-        messages.append({"role": "user", "content": thought})
+        history.append({"role": "user", "content": thought})
 
         print(f"\n\033[90mAgent's Thought:\033[0m {thought}")
 
         # Run the agent to generate a response and take action
-        response = client.run(agent=agent, messages=messages, stream=True)
+        response = client.run(agent=agent, messages=history.messages, stream=True)
 
         # Process and print the streaming response
         response_obj = process_and_print_streaming_response(response)
 
         # Update messages with the new response
-        messages.extend(response_obj.messages)
+        history.extend(response_obj.messages)
 
         # Wait for the specified interval
         time.sleep(interval)
@@ -42,40 +45,44 @@ def run_autonomous_loop(agent, interval=10):
 # you can modify this to change the behavior of the agent
 def run_openai_conversation_loop(agent):
     """Facilitates a conversation between an OpenAI-powered agent and the Based Agent."""
-    client = Swarm()
-    openai_client = OpenAI()
-    messages = []
+    client = get_llm()
+    openai_client = client.openai
+    history = ConversationHistory()
 
     print("Starting OpenAI-Based Agent conversation loop...")
 
     # Initial prompt to start the conversation
-    openai_messages = [{
+    guide_prompt = {
         "role":
         "system",
         "content":
         "You are a user guiding a blockchain agent through various tasks on the Base blockchain. Engage in a conversation, suggesting actions and responding to the agent's outputs. Be creative and explore different blockchain capabilities. Options include creating tokens, transferring assets, minting NFTs, and getting balances. You're not simulating a conversation, but you will be in one yourself. Make sure you follow the rules of improv and always ask for some sort of function to occur. Be unique and interesting."
-    }, {
+    }
+    # The guide's system prompt always goes first; the rest is budgeted like the agent's history
+    openai_messages = ConversationHistory()
+    openai_messages.append({
         "role":
         "user",
         "content":
         "Start a conversation with the Based Agent and guide it through some blockchain tasks."
-    }]
+    })
 
     while True:
         # Generate OpenAI response
-        openai_response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo", messages=openai_messages)
+        with client.slot():
+            openai_response = openai_client.chat.completions.create(
+                model="gpt-3.5-turbo", messages=[guide_prompt] + openai_messages.messages)
 
         openai_message = openai_response.choices[0].message.content
         print(f"\n\033[92mOpenAI Guide:\033[0m {openai_message}")
 
         # Send OpenAI's message to Based Agent
-        messages.append({"role": "user", "content": openai_message})
-        response = client.run(agent=agent, messages=messages, stream=True)
+        history.append({"role": "user", "content": openai_message})
+        response = client.run(agent=agent, messages=history.messages, stream=True)
         response_obj = process_and_print_streaming_response(response)
 
         # Update messages with Based Agent's response
-        messages.extend(response_obj.messages)
+        history.extend(response_obj.messages)
 
         # Add Based Agent's response to OpenAI conversation
         based_agent_response = response_obj.messages[-1][
@@ -0,0 +1,170 @@
+from typing import Any, Callable, Dict, List, Optional
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from history import ConversationHistory
+
+
+class SessionStore:
+    """Append-only SQLite log of chat messages and outbound frames, per session"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS frames (
+                session_id TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                frame TEXT NOT NULL,
+                PRIMARY KEY (session_id, offset)
+            );
+        """)
+
+    def create(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, created_at) VALUES (?, ?)",
+                (session_id, time.time())
+            )
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def append_messages(self, session_id: str, start_seq: int, messages: List[Dict[str, Any]]) -> None:
+        rows = [(session_id, start_seq + i, json.dumps(message, default=str)) for i, message in enumerate(messages)]
+        with self._lock:
+            self._db.executemany("INSERT INTO messages (session_id, seq, message) VALUES (?, ?, ?)", rows)
+
+    def append_frame(self, session_id: str, offset: int, frame: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO frames (session_id, offset, frame) VALUES (?, ?, ?)",
+                (session_id, offset, json.dumps(frame, default=str))
+            )
+
+    def messages(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def frames_after(self, session_id: str, offset: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT frame FROM frames WHERE session_id = ? AND offset > ? ORDER BY offset",
+                (session_id, offset)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def last_offset(self, session_id: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(MAX(offset), 0) FROM frames WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+
+
+class ChatSession:
+    """One chat conversation: its budgeted LLM history plus its position in the frame log"""
+
+    def __init__(self, session_id: str, store: SessionStore, history: ConversationHistory):
+        self.id = session_id
+        self.store = store
+        self.history = history
+        self.lock = threading.Lock()
+        self.connections = 0
+        # Live connections that frames are sent to, whichever one started the turn
+        self.attached: List[Any] = []
+        self.send_lock = threading.Lock()
+        self._message_count = 0
+        self._offset = store.last_offset(session_id)
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def load(self) -> None:
+        """Rebuild the in-memory history from the log"""
+        messages = self.store.messages(self.id)
+        self.history.extend(messages)
+        self._message_count = len(messages)
+
+    def add_messages(self, messages: List[Dict[str, Any]]) -> None:
+        self.store.append_messages(self.id, self._message_count, messages)
+        self._message_count += len(messages)
+        self.history.extend(messages)
+
+    def record(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """Give a frame the next offset and persist it so a reconnecting client can replay it"""
+        self._offset += 1
+        frame = {**frame, "offset": self._offset}
+        self.store.append_frame(self.id, self._offset, frame)
+        return frame
+
+    def frames_after(self, offset: int) -> List[Dict[str, Any]]:
+        return self.store.frames_after(self.id, offset)
+
+
+class SessionManager:
+    """Keeps up to `max_active` sessions in memory; idle ones are evicted and reloaded from disk on demand"""
+
+    def __init__(self, store: SessionStore, history_factory: Callable[[], ConversationHistory], max_active: int = 200):
+        self.store = store
+        self.history_factory = history_factory
+        self.max_active = max_active
+        self._sessions: 'OrderedDict[str, ChatSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def active_count(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def connection_count(self) -> int:
+        return sum(session.connections for session in list(self._sessions.values()))
+
+    def open(self, session_id: Optional[str] = None) -> ChatSession:
+        """Attach a connection to a session, resuming it if `session_id` is known"""
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                if not session_id or not self.store.exists(session_id):
+                    session_id = uuid.uuid4().hex
+                    self.store.create(session_id)
+                session = ChatSession(session_id, self.store, self.history_factory())
+                session.load()
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.connections += 1
+            self._evict()
+            return session
+
+    def release(self, session: ChatSession) -> None:
+        with self._lock:
+            session.connections -= 1
+            self._evict()
+
+    def _evict(self) -> None:
+        idle = [sid for sid, session in self._sessions.items() if session.connections <= 0]
+        for session_id in idle[:max(0, len(self._sessions) - self.max_active)]:
+            del self._sessions[session_id]
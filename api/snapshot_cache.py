@@ -0,0 +1,194 @@
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from concurrent.futures import Future
+import asyncio
+import threading
+import time
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """A long-lived loop on a daemon thread, for async refreshes that must outlive the request that started them"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name='snapshot-refresh', daemon=True).start()
+        return _background_loop
+
+
+class Snapshot(NamedTuple):
+    block_number: int
+    fetched_at: float
+    data: Any
+
+
+class BlockSnapshotCache:
+    """Caches the latest snapshot of chain data, keyed by the block it was read at.
+
+    Snapshots younger than `fresh_for` (about one block) are served as-is.
+    Older ones, up to `max_staleness` seconds, are still served immediately
+    while a single background refresh runs (stale-while-revalidate). Past
+    that, callers wait on one shared refresh. A refresh first probes the
+    block number and skips the full reload when the chain hasn't moved.
+    """
+
+    def __init__(self, fresh_for: float = 2.0, max_staleness: float = 30.0):
+        self.fresh_for = fresh_for
+        self.max_staleness = max_staleness
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._future: Optional[Future] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.unchanged = 0
+        self.errors = 0
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def store(self, block_number: int, data: Any) -> None:
+        """Store a snapshot unless we already hold one from a later block"""
+        with self._lock:
+            current = self._snapshot
+            if current is None or block_number >= current.block_number:
+                self._snapshot = Snapshot(block_number, time.monotonic(), data)
+
+    def _touch(self, snapshot: Snapshot) -> None:
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._snapshot = snapshot._replace(fetched_at=time.monotonic())
+
+    def _age(self, snapshot: Snapshot) -> float:
+        return time.monotonic() - snapshot.fetched_at
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'hits': self.hits,
+            'staleHits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'unchangedBlocks': self.unchanged,
+            'errors': self.errors,
+            'hitRate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0,
+            'blockNumber': snapshot.block_number if snapshot else None,
+            'ageSeconds': round(self._age(snapshot), 3) if snapshot else None,
+        }
+
+    # Thread-based access, for the blocking web3 client
+
+    def get(self, load: Callable[[], Tuple[int, Any]], probe: Optional[Callable[[], int]] = None) -> Any:
+        """Return cached data, refreshing with `load()` -> (block_number, data) as needed"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = self._age(snapshot)
+            if age <= self.fresh_for:
+                self.hits += 1
+                return snapshot.data
+            if age <= self.max_staleness:
+                self.stale_hits += 1
+                self._refresh_in_background(load, probe)
+                return snapshot.data
+
+        self.misses += 1
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and self._age(snapshot) <= self.fresh_for:
+                return snapshot.data
+            return self._refresh(load, probe)
+
+    def _refresh(self, load, probe) -> Any:
+        snapshot = self._snapshot
+        if probe is not None and snapshot is not None:
+            if probe() <= snapshot.block_number:
+                self.unchanged += 1
+                self._touch(snapshot)
+                return snapshot.data
+
+        self.refreshes += 1
+        block_number, data = load()
+        self.store(block_number, data)
+        return data
+
+    def _refresh_in_background(self, load, probe) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._refresh_lock:
+                    self._refresh(load, probe)
+            except Exception as e:
+                self.errors += 1
+                print(f"Background snapshot refresh failed: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # asyncio access, for AsyncWeb3
+
+    async def aget(
+        self,
+        load: Callable[[], Awaitable[Tuple[int, Any]]],
+        probe: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> Any:
+        """`get` for coroutine loaders; refreshes run as a single task on the background loop"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = self._age(snapshot)
+            if age <= self.fresh_for:
+                self.hits += 1
+                return snapshot.data
+            if age <= self.max_staleness:
+                self.stale_hits += 1
+                self._refresh_future(load, probe)
+                return snapshot.data
+
+        self.misses += 1
+        # Shielded so a cancelled caller doesn't cancel the refresh other callers share
+        return await asyncio.shield(asyncio.wrap_future(self._refresh_future(load, probe)))
+
+    def _refresh_future(self, load, probe) -> Future:
+        # Not the caller's loop: Flask runs each async view on its own loop and cancels
+        # whatever is still pending there once the response is sent
+        with self._lock:
+            future = self._future
+            if future is not None and not future.done():
+                return future
+
+            async def run():
+                try:
+                    return await self._arefresh(load, probe)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Background snapshot refresh failed: {str(e)}")
+                    raise
+
+            self._future = asyncio.run_coroutine_threadsafe(run(), background_loop())
+            return self._future
+
+    async def _arefresh(self, load, probe) -> Any:
+        snapshot = self._snapshot
+        if probe is not None and snapshot is not None:
+            if await probe() <= snapshot.block_number:
+                self.unchanged += 1
+                self._touch(snapshot)
+                return snapshot.data
+
+        self.refreshes += 1
+        block_number, data = await load()
+        self.store(block_number, data)
+        return data
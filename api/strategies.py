@@ -0,0 +1,296 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import os
+import threading
+import time
+
+import numpy as np
+
+from chain import get_multicall, get_registry
+from contracts import ERC20_SYMBOL_ABI
+from snapshot_cache import BlockSnapshotCache
+
+SECONDS_PER_YEAR = 31_536_000
+RAY = 1e27
+
+# Low 64 bits of Aave v3's ReserveConfigurationMap; everything the engine reads lives there
+CONFIG_MASK = (1 << 64) - 1
+LTV_MASK = 0xFFFF
+LIQUIDATION_THRESHOLD_SHIFT = 16
+ACTIVE_BIT = 56
+FROZEN_BIT = 57
+BORROWING_ENABLED_BIT = 58
+PAUSED_BIT = 60
+
+# Leverage levels every reserve is evaluated at (1x is a plain supply)
+LEVERAGE_LEVELS = np.round(np.arange(1.0, 10.0 + 1e-9, 0.25), 2)
+
+STABLE_SYMBOLS = frozenset({'USDC', 'USDbC', 'USDT', 'DAI', 'EURC', 'GHO', 'LUSD', 'crvUSD', 'PYUSD', 'USDS'})
+
+
+class RiskProfile(NamedTuple):
+    label: str
+    max_leverage: float
+    # Health factor the position must keep after the collateral drops by `price_shock` against its debt
+    min_health_factor: float
+    price_shock: float
+    # APY given up per turn of leverage, so safer loops win ties
+    leverage_penalty: float
+    stable_only: bool
+
+
+RISK_PROFILES: Dict[str, RiskProfile] = {
+    'bearish': RiskProfile('Bearish', max_leverage=1.0, min_health_factor=0.0, price_shock=0.0, leverage_penalty=0.0, stable_only=True),
+    'buffet': RiskProfile('Buffet', max_leverage=2.0, min_health_factor=1.5, price_shock=0.2, leverage_penalty=0.01, stable_only=False),
+    'bullish': RiskProfile('Bullish', max_leverage=4.0, min_health_factor=1.2, price_shock=0.1, leverage_penalty=0.002, stable_only=False),
+    'moon': RiskProfile('Moon', max_leverage=10.0, min_health_factor=1.02, price_shock=0.0, leverage_penalty=0.0, stable_only=False),
+}
+
+
+class ReserveTable(NamedTuple):
+    """One row per market, as parallel arrays"""
+    protocol: List[str]
+    asset: List[str]
+    symbol: List[str]
+    supply_apy: np.ndarray
+    borrow_apy: np.ndarray
+    ltv: np.ndarray
+    liquidation_threshold: np.ndarray
+    supply_enabled: np.ndarray
+    borrow_enabled: np.ndarray
+    stable: np.ndarray
+
+
+def apr_to_apy(apr: np.ndarray) -> np.ndarray:
+    """Per-second compounding of an annual rate: (1 + apr/s)^s - 1, without losing precision"""
+    return np.expm1(SECONDS_PER_YEAR * np.log1p(apr / SECONDS_PER_YEAR))
+
+
+def decode_configuration(data: np.ndarray) -> Dict[str, np.ndarray]:
+    """Unpack ReserveConfigurationMap words (as uint64) into LTV, liquidation threshold and flags"""
+    def bit(position):
+        return ((data >> np.uint64(position)) & np.uint64(1)).astype(bool)
+
+    return {
+        'ltv': (data & np.uint64(LTV_MASK)).astype(np.float64) / 10_000,
+        'liquidation_threshold': ((data >> np.uint64(LIQUIDATION_THRESHOLD_SHIFT)) & np.uint64(LTV_MASK)).astype(np.float64) / 10_000,
+        'active': bit(ACTIVE_BIT),
+        'frozen': bit(FROZEN_BIT),
+        'borrowing_enabled': bit(BORROWING_ENABLED_BIT),
+        'paused': bit(PAUSED_BIT),
+    }
+
+
+def loop_metrics(table: ReserveTable, leverage: np.ndarray = LEVERAGE_LEVELS) -> Dict[str, np.ndarray]:
+    """Net APY and health factor of a same-asset supply/borrow loop, for every reserve x leverage.
+
+    With 1 unit of equity at leverage L the position supplies L and borrows
+    L - 1 of the same asset, so net APY is L * supply - (L - 1) * borrow and
+    the health factor is L * liquidation threshold / (L - 1). L is reachable
+    only while the debt stays within LTV: L <= 1 / (1 - ltv).
+    """
+    levels = leverage[np.newaxis, :]
+    debt = levels - 1
+    supply = table.supply_apy[:, np.newaxis]
+    borrow = np.nan_to_num(table.borrow_apy)[:, np.newaxis]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        health_factor = np.where(debt > 0, levels * table.liquidation_threshold[:, np.newaxis] / debt, np.inf)
+        max_leverage = 1 / (1 - np.minimum(table.ltv, 0.9999))
+
+    reachable = (levels <= max_leverage[:, np.newaxis] + 1e-9) & ((debt == 0) | table.borrow_enabled[:, np.newaxis])
+    return {
+        'net_apy': levels * supply - debt * borrow,
+        'health_factor': health_factor,
+        # How far the collateral can fall against the debt before liquidation
+        'liquidation_drop': np.where(debt > 0, 1 - 1 / health_factor, 1.0),
+        # Change in net APY per unit rise in the borrow APY
+        'borrow_rate_sensitivity': -np.broadcast_to(debt, health_factor.shape),
+        'reachable': reachable & table.supply_enabled[:, np.newaxis],
+    }
+
+
+def rank(table: ReserveTable, profile: RiskProfile, limit: int = 3, leverage: np.ndarray = LEVERAGE_LEVELS) -> List[Dict[str, Any]]:
+    """The best leverage per market under `profile`, markets ordered by risk-adjusted net APY"""
+    if not table.protocol:
+        return []
+
+    metrics = loop_metrics(table, leverage)
+    shocked_health_factor = metrics['health_factor'] * (1 - profile.price_shock)
+    allowed = (
+        metrics['reachable']
+        & (leverage[np.newaxis, :] <= profile.max_leverage)
+        & (shocked_health_factor >= profile.min_health_factor)
+    )
+    if profile.stable_only:
+        allowed &= table.stable[:, np.newaxis]
+
+    score = np.where(allowed, metrics['net_apy'] - profile.leverage_penalty * (leverage[np.newaxis, :] - 1), -np.inf)
+    best = np.argmax(score, axis=1)
+    rows = np.arange(len(best))
+    best_score = score[rows, best]
+
+    order = np.argsort(-best_score, kind='stable')
+    order = order[np.isfinite(best_score[order])][:limit]
+
+    strategies = []
+    for position, i in enumerate(order, start=1):
+        j = best[i]
+        borrow_apy = table.borrow_apy[i]
+        strategies.append({
+            'rank': position,
+            'protocol': table.protocol[i],
+            'asset': table.asset[i],
+            'symbol': table.symbol[i],
+            'leverage': float(leverage[j]),
+            'supplyApy': round(float(table.supply_apy[i]) * 100, 2),
+            'borrowApy': None if np.isnan(borrow_apy) else round(float(borrow_apy) * 100, 2),
+            'netApy': round(float(metrics['net_apy'][i, j]) * 100, 2),
+            'healthFactor': None if np.isinf(metrics['health_factor'][i, j]) else round(float(metrics['health_factor'][i, j]), 3),
+            'liquidationDrop': round(float(metrics['liquidation_drop'][i, j]), 4),
+            'borrowRateSensitivity': float(metrics['borrow_rate_sensitivity'][i, j]),
+        })
+    return strategies
+
+
+def describe(strategy: Dict[str, Any]) -> str:
+    if strategy['leverage'] == 1:
+        action = f"Supply {strategy['symbol']} to {strategy['protocol']}"
+    else:
+        action = (
+            f"Loop {strategy['symbol']} on {strategy['protocol']} at {strategy['leverage']:g}x "
+            f"(supply, borrow {strategy['symbol']} at {strategy['borrowApy']}%, resupply)"
+        )
+    line = f"{action} - {strategy['netApy']}% net APY"
+    if strategy['healthFactor'] is not None:
+        line += f", health factor {strategy['healthFactor']} (liquidated after a {strategy['liquidationDrop'] * 100:.1f}% drop against the debt)"
+    return line
+
+
+class StrategyEngine:
+    """Ranks lending strategies from live Aave reserve and Compound pool data.
+
+    Every reserve's getReserveData (plus symbols not seen before and, when a
+    lending agent is attached, the Compound pool reads) goes out in one
+    Multicall. The reserves list itself changes only by governance, so it is
+    re-read every `reserves_ttl` seconds. Tables are cached per block, so
+    the strategy tools can run on every turn; ranking is array math over
+    all reserves x leverage levels at once.
+    """
+
+    def __init__(self, registry=None, multicall=None, lending_agent=None, reserves_ttl: float = 300.0,
+                 fresh_for: float = 2.0, max_staleness: float = 30.0):
+        self._registry = registry
+        self._multicall = multicall
+        self.lending_agent = lending_agent
+        self.reserves_ttl = reserves_ttl
+        self.cache = BlockSnapshotCache(fresh_for=fresh_for, max_staleness=max_staleness)
+        self._lock = threading.Lock()
+        self._reserves: Optional[List[str]] = None
+        self._reserves_loaded_at = 0.0
+        self._symbols: Dict[str, str] = {}
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            self._registry = get_registry()
+        return self._registry
+
+    @property
+    def multicall(self):
+        if self._multicall is None:
+            self._multicall = get_multicall()
+        return self._multicall
+
+    def reserves(self) -> List[str]:
+        if self._reserves is None or time.monotonic() - self._reserves_loaded_at > self.reserves_ttl:
+            reserves = list(self.registry.get('aave_pool').functions.getReservesList().call())
+            with self._lock:
+                self._reserves, self._reserves_loaded_at = reserves, time.monotonic()
+        return self._reserves
+
+    def _compound_calls(self) -> List[Any]:
+        agent = self.lending_agent
+        if agent is None:
+            return []
+        calls = []
+        for asset in agent.lending_pools:
+            calls.extend(agent._pool_calls[asset])
+            calls.append(agent.registry.call(f'feed:{asset}', 'decimals'))
+        return calls
+
+    def _compound_rows(self, results: Sequence[Any]) -> List[Dict[str, Any]]:
+        agent = self.lending_agent
+        assets = list(agent.lending_pools)
+        pool_results, decimals = [], {}
+        for i, asset in enumerate(assets):
+            answer, supply_rate, total_supply, feed_decimals = results[i * 4:(i + 1) * 4]
+            pool_results.extend((answer, supply_rate, total_supply))
+            if feed_decimals.success:
+                decimals[asset] = feed_decimals.value
+        return agent._collect_pools(assets, pool_results, decimals)
+
+    def load(self, block_identifier='latest') -> Tuple[int, ReserveTable]:
+        """Read every market in one Multicall and lay it out as arrays; returns (block_number, table)"""
+        reserves = self.reserves()
+        missing = [asset for asset in reserves if asset not in self._symbols]
+
+        calls = [self.registry.call('aave_pool', 'getReserveData', asset) for asset in reserves]
+        calls += [
+            self.multicall.prepare(self.registry.contract(asset, ERC20_SYMBOL_ABI).functions.symbol())
+            for asset in missing
+        ]
+        compound_calls = self._compound_calls()
+        batch = self.multicall.aggregate(calls + compound_calls, block_identifier=block_identifier)
+
+        results = batch.results
+        reserve_results = results[:len(reserves)]
+        for asset, symbol in zip(missing, results[len(reserves):len(reserves) + len(missing)]):
+            self._symbols[asset] = symbol.value if symbol.success else asset[:10]
+
+        loaded = [(asset, result.value) for asset, result in zip(reserves, reserve_results) if result.success]
+        compound = self._compound_rows(results[len(calls):]) if compound_calls else []
+
+        configuration = np.array([value[0][0] & CONFIG_MASK for _, value in loaded], dtype=np.uint64)
+        config = decode_configuration(configuration)
+        # currentLiquidityRate and currentVariableBorrowRate are annual rates in ray
+        supply_apr = np.array([value[2] for _, value in loaded], dtype=np.float64) / RAY
+        borrow_apr = np.array([value[4] for _, value in loaded], dtype=np.float64) / RAY
+        usable = config['active'] & ~config['frozen'] & ~config['paused']
+
+        symbols = [self._symbols[asset] for asset, _ in loaded] + [pool['asset'] for pool in compound]
+        count = len(compound)
+        table = ReserveTable(
+            protocol=['Aave V3'] * len(loaded) + [pool['protocol'] for pool in compound],
+            asset=[asset for asset, _ in loaded] + [pool['tokenAddress'] for pool in compound],
+            symbol=symbols,
+            supply_apy=np.concatenate([apr_to_apy(supply_apr), np.array([pool['apy'] / 100 for pool in compound], dtype=np.float64)]),
+            # The Compound pools are supply-only here
+            borrow_apy=np.concatenate([apr_to_apy(borrow_apr), np.full(count, np.nan)]),
+            ltv=np.concatenate([config['ltv'], np.zeros(count)]),
+            liquidation_threshold=np.concatenate([config['liquidation_threshold'], np.zeros(count)]),
+            supply_enabled=np.concatenate([usable, np.ones(count, dtype=bool)]),
+            borrow_enabled=np.concatenate([usable & config['borrowing_enabled'], np.zeros(count, dtype=bool)]),
+            stable=np.array([symbol in STABLE_SYMBOLS for symbol in symbols], dtype=bool),
+        )
+        return batch.block_number, table
+
+    def table(self) -> ReserveTable:
+        return self.cache.get(self.load)
+
+    def strategies(self, profile: str, limit: int = 3) -> Dict[str, Any]:
+        """Ranked strategies for one of RISK_PROFILES"""
+        risk = RISK_PROFILES[profile]
+        table = self.table()
+        return {
+            'profile': profile,
+            'blockNumber': self.cache.snapshot.block_number if self.cache.snapshot else None,
+            'markets': len(table.protocol),
+            'strategies': rank(table, risk, limit),
+        }
+
+
+strategy_engine = StrategyEngine(
+    reserves_ttl=float(os.getenv('STRATEGY_RESERVES_TTL', '300')),
+    fresh_for=float(os.getenv('STRATEGY_CACHE_FRESH_FOR', '2')),
+    max_staleness=float(os.getenv('STRATEGY_CACHE_MAX_STALENESS', '30'))
+)
@@ -0,0 +1,34 @@
+from typing import Callable
+import time
+
+
+class DeltaBatcher:
+    """Collects streamed LLM content and forwards it in small batches.
+
+    Pending text is flushed once it holds `flush_tokens` chunks or
+    `flush_ms` milliseconds have passed since the last flush, whichever
+    comes first. Set both to 0 to forward every chunk as it arrives. The
+    full text stays available in `content` for the final frame.
+    """
+
+    def __init__(self, send: Callable[[str], None], flush_ms: float = 50, flush_tokens: int = 8):
+        self.send = send
+        self.flush_ms = flush_ms
+        self.flush_tokens = flush_tokens
+        self.content = ""
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def add(self, text: str) -> None:
+        self.content += text
+        self._pending.append(text)
+
+        elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+        if len(self._pending) >= self.flush_tokens or elapsed_ms >= self.flush_ms:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self.send("".join(self._pending))
+            self._pending = []
+        self._last_flush = time.monotonic()
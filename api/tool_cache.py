@@ -0,0 +1,108 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+
+class ToolCache:
+    """Process-wide memoization for the agent's read-only tools.
+
+    Results are cached per tool and arguments for `ttl` seconds (about one
+    block), and optionally only while `block_source()` still returns the
+    block they were read at. Each read tool declares the state it reads as
+    tags; write tools declare the tags they change and drop those entries
+    whenever they run. When set, `scope()` (e.g. the current wallet) is
+    part of every key, so results are never shared across scopes.
+    """
+
+    def __init__(self, ttl: float = 2.0, block_source: Optional[Callable[[], Optional[int]]] = None,
+                 scope: Optional[Callable[[], Any]] = None):
+        self.ttl = ttl
+        self.block_source = block_source
+        self.scope = scope
+        self._entries: Dict[Tuple, Tuple[Optional[int], float, Any]] = {}
+        self._tags: Dict[Tuple, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _block(self) -> Optional[int]:
+        if self.block_source is None:
+            return None
+        try:
+            return self.block_source()
+        except Exception:
+            return None
+
+    def _key(self, name: str, args: tuple, kwargs: dict) -> Tuple:
+        scope = self.scope() if self.scope is not None else None
+        return (name, scope, json.dumps([args, kwargs], sort_keys=True, default=str))
+
+    def read_tool(self, *tags: str, ttl: Optional[float] = None) -> Callable:
+        """Memoize a read-only tool; `ttl=float('inf')` for values that never change"""
+        def decorator(func):
+            entry_ttl = self.ttl if ttl is None else ttl
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = self._key(func.__name__, args, kwargs)
+                block = self._block()
+                now = time.monotonic()
+
+                cached = self._entries.get(key)
+                if cached is not None:
+                    cached_block, expires_at, value = cached
+                    if now < expires_at and (block is None or cached_block is None or cached_block == block):
+                        self.hits[func.__name__] = self.hits.get(func.__name__, 0) + 1
+                        return value
+
+                self.misses[func.__name__] = self.misses.get(func.__name__, 0) + 1
+                value = func(*args, **kwargs)
+                with self._lock:
+                    self._entries[key] = (block, now + entry_ttl, value)
+                    self._tags[key] = tags
+                return value
+
+            return wrapper
+        return decorator
+
+    def invalidates(self, *tags: str) -> Callable:
+        """Mark a write tool; entries tagged with any of `tags` are dropped when it runs"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    # Drop even on failure: a write that errored may still have landed
+                    self.invalidate(tags)
+
+            return wrapper
+        return decorator
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = set(tags)
+        with self._lock:
+            for key in [key for key, key_tags in self._tags.items() if tags.intersection(key_tags)]:
+                self._entries.pop(key, None)
+                self._tags.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name in set(self.hits) | set(self.misses):
+            hits, misses = self.hits.get(name, 0), self.misses.get(name, 0)
+            tools[name] = {'hits': hits, 'misses': misses, 'hitRate': round(hits / (hits + misses), 4)}
+        total_hits, total_misses = sum(self.hits.values()), sum(self.misses.values())
+        lookups = total_hits + total_misses
+        return {
+            'entries': len(self._entries),
+            'hits': total_hits,
+            'misses': total_misses,
+            'hitRate': round(total_hits / lookups, 4) if lookups else 0,
+            'tools': tools,
+        }
+
+
+tool_cache = ToolCache(ttl=float(os.getenv('TOOL_CACHE_TTL', '2')))
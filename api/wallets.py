@@ -0,0 +1,150 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+import hashlib
+import threading
+
+# The wallet the current tool call, chat turn or action acts for; None means the pool's default
+current_wallet_id: ContextVar[Optional[str]] = ContextVar('current_wallet_id', default=None)
+_current_lane: ContextVar[Optional['TransactionLane']] = ContextVar('current_lane', default=None)
+
+
+@contextmanager
+def use_wallet(wallet_id: Optional[str]) -> Iterator[None]:
+    """Act for `wallet_id` inside the block (a no-op for None)"""
+    if wallet_id is None:
+        yield
+        return
+    token = current_wallet_id.set(wallet_id)
+    try:
+        yield
+    finally:
+        current_wallet_id.reset(token)
+
+
+class TransactionLane:
+    """Runs one wallet's transactions one at a time, in the order they were submitted.
+
+    Each lane is a single worker thread, so lanes for different wallets run
+    in parallel while a wallet's own nonces and allowances never race.
+    """
+
+    def __init__(self, wallet_id: str):
+        self.wallet_id = wallet_id
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'lane-{wallet_id[:8]}')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def _call(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        _current_lane.set(self)
+        current_wallet_id.set(self.wallet_id)
+        return func(*args, **kwargs)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue `func` behind this wallet's earlier transactions"""
+        with self._lock:
+            self.pending += 1
+        # Run with the caller's context (plus this wallet), so context variables carry over to the lane
+        future = self._executor.submit(copy_context().run, self._call, func, args, kwargs)
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run `func` on the lane and wait for it; calls already on this lane run inline"""
+        if _current_lane.get() is self:
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+
+class WalletPool:
+    """The agent wallets, imported on first use and routed to by session.
+
+    `wallet_data` is the WALLET_DATA mapping of wallet id to its export
+    (seed). `importer(wallet_id, data)` turns one entry into a wallet; it
+    runs at most once per wallet. Sessions map onto wallets by rendezvous
+    hashing, so a session keeps its wallet across restarts and adding a
+    wallet only moves the sessions that now hash to it.
+    """
+
+    def __init__(self, wallet_data: Dict[str, Dict[str, Any]], default_id: Optional[str], importer: Callable[[str, Dict[str, Any]], Any]):
+        ids = list(wallet_data)
+        if default_id is not None:
+            ids = [default_id] + [wallet_id for wallet_id in ids if wallet_id != default_id]
+        self.ids: List[str] = ids
+        self.default_id = ids[0] if ids else default_id
+        self.wallet_data = wallet_data
+        self.importer = importer
+        self.lanes: Dict[str, TransactionLane] = {wallet_id: TransactionLane(wallet_id) for wallet_id in ids}
+        self._wallets: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {wallet_id: threading.Lock() for wallet_id in ids}
+        self._override: Optional[Any] = None
+
+    def __contains__(self, wallet_id: str) -> bool:
+        return wallet_id in self.lanes
+
+    def current_id(self) -> Optional[str]:
+        return current_wallet_id.get() or self.default_id
+
+    def get(self, wallet_id: Optional[str] = None) -> Any:
+        """The wallet for `wallet_id`, or for the current context, importing it on first use"""
+        if self._override is not None:
+            return self._override
+        wallet_id = wallet_id or self.current_id()
+        wallet = self._wallets.get(wallet_id)
+        if wallet is None:
+            if wallet_id is None:
+                raise KeyError("No wallets configured; set WALLET_DATA")
+            if wallet_id not in self._locks:
+                raise KeyError(f"Unknown wallet {wallet_id}")
+            with self._locks[wallet_id]:
+                wallet = self._wallets.get(wallet_id)
+                if wallet is None:
+                    wallet = self._wallets[wallet_id] = self.importer(wallet_id, self.wallet_data[wallet_id])
+        return wallet
+
+    def set_override(self, wallet: Any) -> None:
+        """Answer every get() with `wallet` (e.g. a cassette's replay wallet)"""
+        self._override = wallet
+
+    def ready(self, wallet_id: Optional[str] = None) -> bool:
+        return self._override is not None or (wallet_id or self.default_id) in self._wallets
+
+    def route(self, key: str) -> Optional[str]:
+        """The wallet that serves `key` (a session id, an agent name)"""
+        if not self.ids:
+            return None
+        return max(self.ids, key=lambda wallet_id: hashlib.sha256(f'{key}:{wallet_id}'.encode()).digest())
+
+    def lane(self, wallet_id: Optional[str] = None) -> TransactionLane:
+        return self.lanes[wallet_id or self.current_id()]
+
+    def serialized(self, func: Callable) -> Callable:
+        """Run a write tool on the current wallet's lane"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.lanes:
+                return func(*args, **kwargs)
+            return self.lane().run(func, *args, **kwargs)
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'defaultWallet': self.default_id,
+            'wallets': [
+                {
+                    'id': wallet_id,
+                    'imported': wallet_id in self._wallets,
+                    'pending': self.lanes[wallet_id].pending,
+                    'completed': self.lanes[wallet_id].completed,
+                }
+                for wallet_id in self.ids
+            ],
+        }
@@ -4,6 +4,7 @@ import { useState } from 'react'
 import { Loader2, MessageCircle } from 'lucide-react'
 import ChatWindow from '@/app/components/ChatWindow'
 import CredentialWidget from '@/app/components/CredentialWidget'
+import { runAaveAction } from '@/app/lib/aave'
 
 export default function BearishStrategyPage() {
   const [amount, setAmount] = useState<string>('')
@@ -20,22 +21,7 @@ export default function BearishStrategyPage() {
     setResult(null)
 
     try {
-      const response = await fetch('/api/aave', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          action: 'supply',
-          amount: amount
-        }),
-      })
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`)
-      }
-      
-      const data = await response.json()
+      const data = await runAaveAction('supply', amount)
       console.log("API Response:", data)
       setResult(data)
     } catch (err: unknown) {
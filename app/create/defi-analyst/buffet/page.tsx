@@ -4,6 +4,7 @@ import { useState } from 'react'
 import { Loader2, MessageCircle } from 'lucide-react'
 import ChatWindow from '@/app/components/ChatWindow'
 import CredentialWidget from '@/app/components/CredentialWidget'
+import { runAaveAction } from '@/app/lib/aave'
 
 interface SupplyResponse {
   txHash: string
@@ -24,18 +25,7 @@ export default function BuffetStrategyPage() {
     setResult(null)
 
     try {
-      const response = await fetch('/api/aave', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          action: 'supply',
-          amount: amount
-        }),
-      })
-
-      const data = await response.json()
+      const data = await runAaveAction('supply', amount)
       console.log("API Response:", data)
       setResult(data)
     } catch (err) {
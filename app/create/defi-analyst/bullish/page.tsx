@@ -4,6 +4,7 @@ import { useState } from 'react'
 import { Loader2, MessageCircle, AlertCircle, CheckCircle2, ChevronDown, ChevronUp, ExternalLink } from 'lucide-react'
 import ChatWindow from '@/app/components/ChatWindow'
 import CredentialWidget from '@/app/components/CredentialWidget'
+import { runAaveAction } from '@/app/lib/aave'
 
 interface SupplyResponse {
   txHash: string
@@ -68,20 +69,11 @@ export default function BullishStrategyPage() {
     updateStepStatus(stepNumber, 'loading')
     
     try {
-      const response = await fetch('/api/aave', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ action, amount }),
-      })
-
-      const data = await response.json()
-
-      if (!response.ok) {
-        throw new Error(data.message || `Failed to execute step ${stepNumber}`)
-      }
+      // Resolves only once the step's transaction is confirmed
+      const data = await runAaveAction(action, amount)
 
       await new Promise(resolve => setTimeout(resolve, 1000))
-      updateStepStatus(stepNumber, 'complete', data.txHash)
+      updateStepStatus(stepNumber, 'complete', data.response?.txHash)
       return data
     } catch (error: any) {
       updateStepStatus(stepNumber, 'error')
@@ -0,0 +1,45 @@
+export interface AaveActionResult {
+  success: boolean
+  jobId: string
+  status: string
+  response?: any
+  error?: string
+}
+
+const POLL_INTERVAL_MS = 2000
+const MAX_POLL_MS = 5 * 60 * 1000
+const PENDING_STATUSES = ['pending', 'queued', 'running']
+
+// Runs an Aave action and resolves only once its transaction is confirmed; rejects if it failed
+export async function runAaveAction(action: string, amount: string): Promise<AaveActionResult> {
+  const response = await fetch('/api/aave?wait=60', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ action, amount }),
+  })
+  let data = await response.json()
+
+  if (!response.ok) {
+    throw new Error(data.error || `Failed to ${action} (HTTP ${response.status})`)
+  }
+
+  // 202: still queued or running, so poll the job until it finishes
+  const deadline = Date.now() + MAX_POLL_MS
+  while (PENDING_STATUSES.includes(data.status)) {
+    if (Date.now() > deadline) {
+      throw new Error(`Timed out waiting for ${action} to confirm`)
+    }
+    await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))
+    const poll = await fetch(`/api/aave/jobs/${data.jobId}`)
+    if (!poll.ok) {
+      throw new Error(`Failed to check ${action} (HTTP ${poll.status})`)
+    }
+    const job = await poll.json()
+    data = { ...data, status: job.status, success: job.status === 'confirmed', response: job.result, error: job.error }
+  }
+
+  if (!data.success) {
+    throw new Error(data.error || `Failed to ${action}`)
+  }
+  return data
+}
@@ -0,0 +1,298 @@
+"""Offline end-to-end benchmarks for the API.
+
+Starts the fake JSON-RPC node (fake_rpc.py) and the fake OpenAI API
+(fake_llm.py) in this process, then launches the API server against them
+in a subprocess (Flask or ASGI) and measures:
+
+  pools   GET /api/lending/pools latency (p50/p90/p99) and throughput
+  lend    POST /api/lending/lend submission latency and throughput
+  chat    time to first token and full turn latency on /ws/chat, with N
+          concurrent WebSocket clients
+
+Nothing leaves the machine. The JSON report goes to stdout (and --output),
+so runs can be compared over time.
+
+    python benchmarks/bench.py --server asgi --rpc-latency-ms 40 --chat-clients 50 --output bench.json
+"""
+from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import socket
+
+import requests
+from simple_websocket import Client
+
+import fake_llm
+import fake_rpc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Well-known local dev chain key (Hardhat/Anvil account 0); only ever signs for the fake node
+DEV_PRIVATE_KEY = '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcaee6b2c0e5ab1e5b'
+ETH_POOL_ADDRESS = '0x571621Ce60Cebb0c1D442B5afb38B1663C6Bf017'
+
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2),
+        'p50_ms': round(pick(50) * 1000, 2),
+        'p90_ms': round(pick(90) * 1000, 2),
+        'p99_ms': round(pick(99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    if kind == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--app-dir', 'api', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'api/index', 'run', '-p', str(port)]
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def wait_until_up(base_url: str, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API server exited during startup:\n{server.stderr.read()}")
+        try:
+            if requests.get(f"{base_url}/api/ready", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API server not ready after {timeout}s")
+
+
+def run_load(request: Callable[[requests.Session], bool], total: int, concurrency: int) -> Dict[str, Any]:
+    """Run `total` requests over `concurrency` threads, each with its own keep-alive session"""
+    latencies, failures = [], 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(_):
+        nonlocal failures
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = request(session)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            failures += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'failures': failures,
+        'throughput_rps': round(total / duration, 2),
+        'latency': percentiles(latencies),
+    }
+
+
+def bench_pools(base_url: str, total: int, concurrency: int) -> Dict[str, Any]:
+    def request(session):
+        response = session.get(f"{base_url}/api/lending/pools", timeout=30)
+        return response.status_code == 200 and bool(response.json().get('pools'))
+
+    return run_load(request, total, concurrency)
+
+
+def bench_lend(base_url: str, total: int, concurrency: int) -> Dict[str, Any]:
+    def request(session):
+        response = session.post(f"{base_url}/api/lending/lend", json={
+            'asset': 'ETH',
+            'tokenAmount': 0.01,
+            'poolAddress': ETH_POOL_ADDRESS,
+        }, timeout=30)
+        return response.status_code == 200 and response.json().get('success') is True
+
+    return run_load(request, total, concurrency)
+
+
+def bench_chat(ws_url: str, clients: int, turns: int) -> Dict[str, Any]:
+    ttft, turn_latency = [], []
+    failures = 0
+    lock = threading.Lock()
+    ready = threading.Barrier(clients)
+
+    def client(_):
+        nonlocal failures
+        completed = 0
+        try:
+            ws = Client(f"{ws_url}/ws/chat")
+        except Exception:
+            with lock:
+                failures += turns
+            ready.abort()
+            return
+        try:
+            json.loads(ws.receive(timeout=30))  # session frame
+            ready.wait(timeout=60)
+            for turn in range(turns):
+                started = time.perf_counter()
+                first = None
+                ws.send(json.dumps({'role': 'user', 'content': f'Benchmark message {turn}'}))
+                while True:
+                    message = ws.receive(timeout=60)
+                    if message is None:
+                        raise TimeoutError('no frame within 60s')
+                    frame = json.loads(message)
+                    if frame.get('type') == 'delta' and first is None:
+                        first = time.perf_counter() - started
+                    if frame.get('type') == 'content' and frame.get('done'):
+                        break
+                with lock:
+                    ttft.append(first if first is not None else time.perf_counter() - started)
+                    turn_latency.append(time.perf_counter() - started)
+                completed += 1
+        except Exception as e:
+            print(f"Chat client failed: {e!r}", file=sys.stderr)
+            with lock:
+                failures += turns - completed
+        finally:
+            ws.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    duration = time.perf_counter() - started
+
+    return {
+        'clients': clients,
+        'turns_per_client': turns,
+        'completed_turns': len(turn_latency),
+        'failures': failures,
+        'turns_per_second': round(len(turn_latency) / duration, 2),
+        'ttft': percentiles(ttft),
+        'turn': percentiles(turn_latency),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--scenarios', nargs='+', choices=['pools', 'lend', 'chat'], default=['pools', 'lend', 'chat'])
+    parser.add_argument('--rpc-latency-ms', type=float, default=30)
+    parser.add_argument('--rpc-jitter-ms', type=float, default=10)
+    parser.add_argument('--block-time', type=float, default=2.0)
+    parser.add_argument('--llm-ttft-ms', type=float, default=300)
+    parser.add_argument('--llm-token-ms', type=float, default=15)
+    parser.add_argument('--llm-tokens', type=int, default=60)
+    parser.add_argument('--pool-requests', type=int, default=500)
+    parser.add_argument('--pool-concurrency', type=int, default=16)
+    parser.add_argument('--no-pool-cache', action='store_true', help='read the chain on every pools request')
+    parser.add_argument('--lend-requests', type=int, default=200)
+    parser.add_argument('--lend-concurrency', type=int, default=8)
+    parser.add_argument('--chat-clients', type=int, default=20)
+    parser.add_argument('--chat-turns', type=int, default=3)
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    _, chain, rpc_url = fake_rpc.serve(latency_ms=args.rpc_latency_ms, jitter_ms=args.rpc_jitter_ms, block_time=args.block_time)
+    _, llm, llm_url = fake_llm.serve(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens)
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    env = {
+        **os.environ,
+        'BASE_SEPOLIA_RPC': rpc_url,
+        'PRIVATE_KEY': DEV_PRIVATE_KEY,
+        'OPENAI_BASE_URL': llm_url,
+        'OPENAI_API_KEY': 'fake',
+        'CROSSMINT_TEMPLATE_ID': 'bench',
+        'CROSSMINT_API_KEY': 'bench',
+        'CROSSMINT_BASE_URL': 'http://127.0.0.1:9',
+        'CHAT_SESSION_DB': os.path.join(workdir, 'chat_sessions.db'),
+        'LLM_MAX_CONCURRENCY': str(max(args.chat_clients, 1)),
+        # The wallet lives on CDP, which isn't available offline
+        'WARMUP_ON_START': 'false',
+    }
+    if args.no_pool_cache:
+        env.update({'POOLS_CACHE_FRESH_FOR': '0', 'POOLS_CACHE_MAX_STALENESS': '0'})
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(args.server, port, env)
+    report: Dict[str, Any] = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'server': args.server,
+            'rpc': {'latency_ms': args.rpc_latency_ms, 'jitter_ms': args.rpc_jitter_ms, 'block_time': args.block_time},
+            'llm': {'ttft_ms': args.llm_ttft_ms, 'token_ms': args.llm_token_ms, 'tokens': args.llm_tokens},
+            'pool_cache': not args.no_pool_cache,
+        }
+    }
+
+    try:
+        wait_until_up(base_url, server)
+
+        if 'pools' in args.scenarios:
+            print("pools...", file=sys.stderr)
+            report['pools'] = bench_pools(base_url, args.pool_requests, args.pool_concurrency)
+        if 'lend' in args.scenarios:
+            print("lend...", file=sys.stderr)
+            report['lend'] = bench_lend(base_url, args.lend_requests, args.lend_concurrency)
+        if 'chat' in args.scenarios:
+            print("chat...", file=sys.stderr)
+            report['chat'] = bench_chat(base_url.replace('http://', 'ws://'), args.chat_clients, args.chat_turns)
+
+        report['rpc'] = chain.stats()
+        report['llm_requests'] = llm.requests
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""OpenAI-compatible chat completions stand-in for offline benchmarks.
+
+Serves POST /v1/chat/completions. Streaming requests get `tokens` content
+chunks as server-sent events: the first after `ttft_ms`, then one every
+`token_ms`. Non-streaming requests get the whole reply after the same
+total delay. It never calls tools, so a chat turn costs exactly one
+completion.
+
+    python benchmarks/fake_llm.py --port 8600 --ttft-ms 300 --token-ms 15
+    OPENAI_BASE_URL=http://127.0.0.1:8600/v1 OPENAI_API_KEY=fake ...
+"""
+from typing import Any, Dict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import threading
+import time
+import uuid
+
+
+class FakeLLM:
+    def __init__(self, ttft_ms: float = 300, token_ms: float = 15, tokens: int = 60):
+        self.ttft_ms = ttft_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def words(self):
+        return [f"word{i} " for i in range(self.tokens)]
+
+    def chunk(self, completion_id: str, model: str, delta: Dict[str, Any], finish_reason=None) -> Dict[str, Any]:
+        return {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def completion(self, completion_id: str, model: str) -> Dict[str, Any]:
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(self.words())},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': self.tokens, 'total_tokens': self.tokens},
+        }
+
+
+def make_handler(llm: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _event(self, payload) -> None:
+            data = payload if isinstance(payload, str) else json.dumps(payload)
+            self._write_chunk(f"data: {data}\n\n".encode())
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404)
+                return
+
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            with llm._lock:
+                llm.requests += 1
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            model = request.get('model', 'gpt-4o')
+
+            if not request.get('stream'):
+                time.sleep((llm.ttft_ms + llm.token_ms * llm.tokens) / 1000)
+                data = json.dumps(llm.completion(completion_id, model)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            time.sleep(llm.ttft_ms / 1000)
+            self._event(llm.chunk(completion_id, model, {'role': 'assistant', 'content': ''}))
+            for i, word in enumerate(llm.words()):
+                if i:
+                    time.sleep(llm.token_ms / 1000)
+                self._event(llm.chunk(completion_id, model, {'content': word}))
+            self._event(llm.chunk(completion_id, model, {}, finish_reason='stop'))
+            self._event('[DONE]')
+            self._write_chunk(b'')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, ttft_ms: float = 300, token_ms: float = 15, tokens: int = 60):
+    """Start the fake LLM on a daemon thread; returns (server, llm, base_url)"""
+    llm = FakeLLM(ttft_ms, token_ms, tokens)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(llm))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server, llm, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--ttft-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=15)
+    parser.add_argument('--tokens', type=int, default=60)
+    args = parser.parse_args()
+
+    _, _, url = serve(args.port, args.ttft_ms, args.token_ms, args.tokens)
+    print(f"Fake OpenAI API listening on {url}")
+    threading.Event().wait()
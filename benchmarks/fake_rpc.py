@@ -0,0 +1,223 @@
+"""Scripted Base Sepolia JSON-RPC stand-in for offline benchmarks.
+
+Answers the calls the lending agent and position reader make: block
+number, chain id, fee history, gas estimates, nonces, raw transactions and
+receipts, plus eth_call to the Chainlink feeds, Compound pools, Aave pool
+and USDC, directly or batched in Multicall3 aggregate3. Blocks advance
+every `block_time` seconds. Each HTTP request (a JSON-RPC batch counts
+once) waits `latency_ms` plus up to `jitter_ms` first, to mimic a remote
+node.
+
+    python benchmarks/fake_rpc.py --port 8545 --latency-ms 40
+"""
+from typing import Any, Dict, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import threading
+import time
+
+from eth_abi import decode, encode
+from eth_utils import keccak
+
+CHAIN_ID = 84532
+
+
+def selector(signature: str) -> bytes:
+    return keccak(text=signature)[:4]
+
+
+AGGREGATE3 = selector('aggregate3((address,bool,bytes)[])')
+
+# Chainlink answers (8 decimals) by feed address; unknown feeds get DEFAULT_PRICE
+PRICES = {
+    '0x7d9457550cc58d12d53b50b09f6af11100b8012d': 3000 * 10 ** 8,   # ETH/USD
+    '0xc8ccef06f38b140c4a8d23b8f0ca9c00fe44e8a8': 60000 * 10 ** 8,  # BTC/USD
+}
+DEFAULT_PRICE = 1000 * 10 ** 8
+
+
+class FakeChain:
+    """Chain state behind the fake node; safe to use from the server's handler threads"""
+
+    def __init__(self, block_time: float = 2.0, start_block: int = 18_000_000, confirm_blocks: int = 1):
+        self.block_time = block_time
+        self.start_block = start_block
+        self.confirm_blocks = confirm_blocks
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._transactions: Dict[str, int] = {}
+        self.requests = 0
+        self.calls: Dict[str, int] = {}
+
+        self._views = {
+            selector('getBlockNumber()'): lambda to, args: encode(['uint256'], [self.block_number]),
+            selector('latestAnswer()'): lambda to, args: encode(['int256'], [PRICES.get(to, DEFAULT_PRICE)]),
+            selector('decimals()'): lambda to, args: encode(['uint8'], [8 if to in PRICES else 6]),
+            selector('getSupplyRate()'): lambda to, args: encode(['uint256'], [1_500_000_000]),
+            selector('totalSupply()'): lambda to, args: encode(['uint256'], [25_000 * 10 ** 18]),
+            selector('balanceOf(address)'): lambda to, args: encode(['uint256'], [1_000 * 10 ** 6]),
+            selector('getUserAccountData(address)'): lambda to, args: encode(
+                ['uint256'] * 6,
+                [5_000 * 10 ** 8, 1_000 * 10 ** 8, 2_750 * 10 ** 8, 8_250, 7_500, 3 * 10 ** 18]
+            ),
+        }
+
+    @property
+    def block_number(self) -> int:
+        return self.start_block + int((time.monotonic() - self.started) / self.block_time)
+
+    def _view(self, to: str, data: bytes) -> Tuple[bool, bytes]:
+        handler = self._views.get(data[:4])
+        if handler is None:
+            return False, b''
+        return True, handler(to.lower(), data[4:])
+
+    def eth_call(self, tx: Dict[str, Any], block=None) -> str:
+        data = bytes.fromhex((tx.get('data') or tx.get('input') or '0x')[2:])
+        if data[:4] == AGGREGATE3:
+            (calls,) = decode(['(address,bool,bytes)[]'], data[4:])
+            results = [self._view(target, call_data) for target, _, call_data in calls]
+            return '0x' + encode(['(bool,bytes)[]'], [results]).hex()
+        success, output = self._view(tx.get('to', ''), data)
+        if not success:
+            raise ValueError('execution reverted')
+        return '0x' + output.hex()
+
+    def eth_fee_history(self, count, newest, percentiles=None) -> Dict[str, Any]:
+        count = int(count, 16) if isinstance(count, str) else int(count)
+        percentiles = percentiles or []
+        newest_block = self.block_number
+        return {
+            'oldestBlock': hex(newest_block - count + 1),
+            'baseFeePerGas': [hex(1_000_000 + 1_000 * i) for i in range(count + 1)],
+            'gasUsedRatio': [0.5] * count,
+            'reward': [[hex(100_000 * (i + 1)) for i in range(len(percentiles))] for _ in range(count)],
+        }
+
+    def send_raw_transaction(self, raw: str) -> str:
+        tx_hash = '0x' + keccak(hexstr=raw).hex().removeprefix('0x')
+        with self._lock:
+            self._transactions[tx_hash] = self.block_number
+        return tx_hash
+
+    def transaction_count(self) -> int:
+        # One signer per benchmark, so every transaction sent so far counts
+        return len(self._transactions)
+
+    def receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        sent_at = self._transactions.get(tx_hash)
+        if sent_at is None or self.block_number < sent_at + self.confirm_blocks:
+            return None
+        block_number = sent_at + self.confirm_blocks
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockHash': '0x' + keccak(block_number.to_bytes(32, 'big')).hex().removeprefix('0x'),
+            'blockNumber': hex(block_number),
+            'from': '0x' + '00' * 20,
+            'to': '0x' + '00' * 20,
+            'cumulativeGasUsed': hex(180_000),
+            'gasUsed': hex(180_000),
+            'effectiveGasPrice': hex(1_100_000),
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': '0x1',
+            'type': '0x2',
+        }
+
+    def handle(self, method: str, params: list) -> Any:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'eth_chainId':
+            return hex(CHAIN_ID)
+        if method == 'net_version':
+            return str(CHAIN_ID)
+        if method == 'eth_blockNumber':
+            return hex(self.block_number)
+        if method == 'eth_call':
+            return self.eth_call(*params)
+        if method == 'eth_feeHistory':
+            return self.eth_fee_history(*params)
+        if method == 'eth_estimateGas':
+            return hex(150_000)
+        if method == 'eth_gasPrice':
+            return hex(1_100_000)
+        if method == 'eth_maxPriorityFeePerGas':
+            return hex(100_000)
+        if method == 'eth_getTransactionCount':
+            return hex(self.transaction_count())
+        if method == 'eth_sendRawTransaction':
+            return self.send_raw_transaction(params[0])
+        if method == 'eth_getTransactionReceipt':
+            return self.receipt(params[0])
+        raise NotImplementedError(method)
+
+    def respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            response['result'] = self.handle(request['method'], request.get('params') or [])
+        except NotImplementedError as e:
+            response['error'] = {'code': -32601, 'message': f'Method not found: {e}'}
+        except Exception as e:
+            response['error'] = {'code': 3, 'message': str(e)}
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {'requests': self.requests, 'calls': dict(self.calls), 'transactions': len(self._transactions)}
+
+
+def make_handler(chain: FakeChain, latency_ms: float, jitter_ms: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            with chain._lock:
+                chain.requests += 1
+
+            delay = latency_ms + random.uniform(0, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            if isinstance(payload, list):
+                body = [chain.respond(request) for request in payload]
+            else:
+                body = chain.respond(payload)
+
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, latency_ms: float = 0, jitter_ms: float = 0, block_time: float = 2.0):
+    """Start the fake node on a daemon thread; returns (server, chain, url)"""
+    chain = FakeChain(block_time=block_time)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(chain, latency_ms, jitter_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-rpc', daemon=True).start()
+    return server, chain, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--block-time', type=float, default=2.0)
+    args = parser.parse_args()
+
+    _, _, url = serve(args.port, args.latency_ms, args.jitter_ms, args.block_time)
+    print(f"Fake RPC listening on {url}")
+    threading.Event().wait()
@@ -0,0 +1,133 @@
+"""Cold-start benchmark: how long the API modules take to import in a fresh interpreter.
+
+Every run starts a new Python process, so nothing is cached between runs,
+which is what a new gunicorn or serverless worker goes through. Pass
+--baseline to time another git ref as well (it's checked out to a
+temporary worktree) and get the speedup.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --baseline HEAD~1 --runs 10 --output import_time.json
+
+Environment variables come from the repo's .env, so eager imports that need
+credentials (CDP, Crossmint) can run. Without them, the baseline's failures
+are reported instead of timings.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run inside the child: put api/ and api/agents/ on the path like index.py does and time one import
+IMPORT_SNIPPET = """
+import json, sys, time
+sys.path[:0] = ['.', 'agents']
+started = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({'seconds': time.perf_counter() - started}))
+"""
+
+
+def load_env() -> dict:
+    env = dict(os.environ)
+    try:
+        from dotenv import dotenv_values
+        env.update({k: v for k, v in dotenv_values(os.path.join(REPO_ROOT, '.env')).items() if v is not None})
+    except ImportError:
+        pass
+    return env
+
+
+def time_import(tree: str, module: str, env: dict, timeout: float) -> dict:
+    started = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-c', IMPORT_SNIPPET, module],
+            cwd=os.path.join(tree, 'api'),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'error': f'timed out after {timeout}s'}
+    wall = time.perf_counter() - started
+
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit code {proc.returncode}'}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {'import': result['seconds'], 'process': wall}
+
+
+def summarize(samples: list) -> dict:
+    timings = [sample for sample in samples if 'error' not in sample]
+    summary = {'runs': len(samples), 'failures': len(samples) - len(timings)}
+    if timings:
+        for key in ('import', 'process'):
+            values = [sample[key] for sample in timings]
+            summary[key] = {
+                'min': round(min(values), 4),
+                'median': round(statistics.median(values), 4),
+                'max': round(max(values), 4),
+            }
+    errors = sorted({sample['error'] for sample in samples if 'error' in sample})
+    if errors:
+        summary['errors'] = errors
+    return summary
+
+
+def bench_tree(tree: str, modules: list, runs: int, env: dict, timeout: float) -> dict:
+    results = {}
+    for module in modules:
+        samples = [time_import(tree, module, env, timeout) for _ in range(runs)]
+        results[module] = summarize(samples)
+        print(f"  {module}: {json.dumps(results[module])}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=['agents', 'lending_agent', 'index', 'asgi'])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--baseline', help='git ref to compare against, e.g. HEAD~1')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    env = load_env()
+    report = {'python': sys.version.split()[0], 'runs': args.runs, 'current': {}}
+
+    print("current tree", file=sys.stderr)
+    report['current'] = bench_tree(REPO_ROOT, args.modules, args.runs, env, args.timeout)
+
+    if args.baseline:
+        worktree = tempfile.mkdtemp(prefix='import-time-')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.baseline], cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            print(f"baseline {args.baseline}", file=sys.stderr)
+            report['baseline'] = {'ref': args.baseline, 'modules': bench_tree(worktree, args.modules, args.runs, env, args.timeout)}
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=REPO_ROOT, capture_output=True)
+
+        speedup = {}
+        for module in args.modules:
+            current, baseline = report['current'][module], report['baseline']['modules'][module]
+            if 'import' in current and 'import' in baseline:
+                speedup[module] = round(baseline['import']['median'] / max(current['import']['median'], 1e-9), 2)
+        report['speedup'] = speedup
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
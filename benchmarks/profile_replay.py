@@ -0,0 +1,136 @@
+"""Profile the Python-side cost of pool reads, position reads and agent tool calls from a cassette.
+
+Record once against the live testnet (uses the repo's .env), then replay
+offline as often as needed. At zero latency the timings are pure CPU
+overhead, so regressions show up without network noise.
+
+    python benchmarks/profile_replay.py --record cassette.jsonl.gz
+    python benchmarks/profile_replay.py --replay cassette.jsonl.gz --latency zero --iterations 200 --output profile.json
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(REPO_ROOT, 'api')
+sys.path[:0] = [API_DIR, os.path.join(API_DIR, 'agents')]
+
+# Every call should reach the (replayed) chain, not the tool cache
+os.environ['TOOL_CACHE_TTL'] = '0'
+os.environ.setdefault('OPENAI_API_KEY', 'replay')
+# Only signs for replayed requests when no key is configured
+os.environ.setdefault('PRIVATE_KEY', '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcaee6b2c0e5ab1e5b')
+
+from cassette import Cassette  # noqa: E402
+from lending_agent import AsyncLendingAgent  # noqa: E402
+import agents  # noqa: E402
+
+READ_TOOLS = ('get_position', 'get_default_address', 'get_bearish_strategy')
+
+
+def tool_loop(swarm):
+    """One round of Swarm tool dispatch over the read-only tools, as a chat turn runs it"""
+    from openai.types.chat import ChatCompletionMessageToolCall
+    from openai.types.chat.chat_completion_message_tool_call import Function
+
+    tool_calls = [
+        ChatCompletionMessageToolCall(id=f'call_{i}', type='function', function=Function(name=name, arguments='{}'))
+        for i, name in enumerate(READ_TOOLS)
+    ]
+    return lambda: swarm.handle_tool_calls(tool_calls, agents.reputation_agent.functions, {}, False)
+
+
+def scenarios(agent):
+    from llm import get_llm
+
+    loop = asyncio.new_event_loop()
+    return {
+        'pools': lambda: loop.run_until_complete(agent.fetch_pools()),
+        'position': agents.get_position,
+        'tool_loop': tool_loop(get_llm().swarm),
+    }
+
+
+def run(scenario, iterations, profile):
+    timings = []
+    profile.enable()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        scenario()
+        timings.append(time.perf_counter() - started)
+    profile.disable()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'max_ms': round(max(timings) * 1000, 3),
+    }
+
+
+def top_functions(profile, limit):
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in sorted(
+        stats.stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:limit]:
+        rows.append({
+            'function': f'{os.path.relpath(filename, REPO_ROOT) if filename.startswith(REPO_ROOT) else filename}:{line}({function})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--record', metavar='CASSETTE')
+    mode.add_argument('--replay', metavar='CASSETTE')
+    parser.add_argument('--latency', default='zero', help='"zero", "recorded" or a scale factor (replay only)')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--scenarios', nargs='+', choices=['pools', 'position', 'tool_loop'], default=['pools', 'position', 'tool_loop'])
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--profile-out', help='write raw cProfile stats here (for snakeviz etc.)')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    recording = args.record is not None
+    cassette = Cassette(args.record or args.replay, mode='record' if recording else 'replay', latency=args.latency)
+
+    agent = AsyncLendingAgent()
+    for w3 in (agent.w3, agent._background_w3()):
+        cassette.wrap_web3(w3)
+    cassette.install_cdp(agents)
+
+    profile = cProfile.Profile()
+    report = {'cassette': cassette.path, 'mode': cassette.mode, 'latency': args.latency, 'scenarios': {}}
+    available = scenarios(agent)
+    for name in args.scenarios:
+        print(f"{name}...", file=sys.stderr)
+        # A recording only needs each request once
+        report['scenarios'][name] = run(available[name], 1 if recording else args.iterations, profile)
+
+    if recording:
+        cassette.uninstall()
+        cassette.save()
+    else:
+        report['top_functions'] = top_functions(profile, args.top)
+        if args.profile_out:
+            profile.dump_stats(args.profile_out)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
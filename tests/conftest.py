@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The API modules import each other as top-level modules, the way index.py runs them
+sys.path[:0] = [os.path.join(ROOT, 'api'), os.path.join(ROOT, 'api', 'agents'), os.path.join(ROOT, 'benchmarks')]
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from action_queue import ActionQueue, QueueFull, IdempotencyConflict
+from wallets import WalletPool, current_wallet_id
+
+
+def _queue(run, ids=('a', 'b'), **kwargs):
+    pool = WalletPool({wallet_id: {} for wallet_id in ids}, None, lambda wallet_id, data: wallet_id)
+    return ActionQueue(run, pool, **kwargs)
+
+
+def _blocked(**kwargs):
+    """A queue whose actions wait until the returned event is set"""
+    release = threading.Event()
+    return _queue(lambda request: release.wait(5) and request, **kwargs), release
+
+
+def test_submit_runs_the_action_on_its_wallet():
+    queue = _queue(lambda request: (request, current_wallet_id.get()))
+    job, created = queue.submit('b', {'action': 'supply'}, 'req')
+
+    assert created and job['status'] == 'queued' and job['wallet'] == 'b'
+    job = queue.wait(job['id'], 5)
+    assert job['status'] == 'confirmed'
+    assert job['result'] == ('req', 'b')
+
+
+def test_failed_action_marks_the_job_error():
+    def run(request):
+        raise RuntimeError('reverted')
+
+    queue = _queue(run)
+    job, _ = queue.submit('a', {'action': 'borrow'}, 'req')
+    job = queue.wait(job['id'], 5)
+    assert (job['status'], job['error']) == ('error', 'reverted')
+    assert queue.depth == 0
+
+
+def test_repeated_idempotency_key_returns_the_original_job():
+    queue, release = _blocked()
+    first, created = queue.submit('a', {'action': 'supply', 'amount': '1'}, 'req', idempotency_key='k')
+    again, created_again = queue.submit('a', {'amount': '1', 'action': 'supply'}, 'req', idempotency_key='k')
+    release.set()
+
+    assert created and not created_again
+    assert again['id'] == first['id']
+    assert queue.depth == 1
+
+
+def test_idempotency_key_reused_for_another_request_conflicts():
+    queue, release = _blocked()
+    queue.submit('a', {'action': 'supply', 'amount': '1'}, 'req', idempotency_key='k')
+    with pytest.raises(IdempotencyConflict):
+        queue.submit('a', {'action': 'supply', 'amount': '2'}, 'req', idempotency_key='k')
+    release.set()
+
+
+def test_idempotency_keys_are_scoped_to_the_wallet():
+    queue, release = _blocked()
+    first, _ = queue.submit('a', {'action': 'supply', 'amount': '1'}, 'req', idempotency_key='k')
+    second, created = queue.submit('b', {'action': 'supply', 'amount': '1'}, 'req', idempotency_key='k')
+    release.set()
+
+    assert created and second['id'] != first['id']
+    assert (first['wallet'], second['wallet']) == ('a', 'b')
+
+
+def test_idempotency_keys_expire():
+    queue, release = _blocked(idempotency_ttl=0)
+    first, _ = queue.submit('a', {'action': 'supply'}, 'req', idempotency_key='k')
+    second, created = queue.submit('a', {'action': 'supply'}, 'req', idempotency_key='k')
+    release.set()
+    assert created and second['id'] != first['id']
+
+
+def test_full_wallet_raises_queue_full_with_retry_after():
+    queue, release = _blocked(max_depth_per_wallet=2, max_concurrency=1)
+    queue.seconds_per_action = 10
+    queue.submit('a', {'n': 1}, 'req')
+    queue.submit('a', {'n': 2}, 'req')
+
+    with pytest.raises(QueueFull) as error:
+        queue.submit('a', {'n': 3}, 'req')
+    assert error.value.retry_after == 20
+
+    # Another wallet still has room
+    queue.submit('b', {'n': 4}, 'req')
+    release.set()
+
+
+def test_full_queue_raises_queue_full_for_every_wallet():
+    queue, release = _blocked(max_depth=2, max_concurrency=2)
+    queue.submit('a', {'n': 1}, 'req')
+    queue.submit('b', {'n': 2}, 'req')
+
+    with pytest.raises(QueueFull) as error:
+        queue.submit('b', {'n': 3}, 'req')
+    assert error.value.retry_after >= 1
+    release.set()
+
+
+def test_depth_drains_as_jobs_finish():
+    queue, release = _blocked()
+    jobs = [queue.submit('a', {'n': n}, n)[0] for n in range(3)]
+    assert queue.stats()['byWallet'] == {'a': 3}
+
+    release.set()
+    for job in jobs:
+        assert queue.wait(job['id'], 5)['status'] == 'confirmed'
+    assert queue.depth == 0
+    assert queue.stats()['byWallet'] == {}
+
+
+def test_actions_without_wallets_use_the_fallback_lane():
+    queue = _queue(lambda request: current_wallet_id.get(), ids=())
+    job, _ = queue.submit(None, {'action': 'supply'}, 'req')
+    assert queue.wait(job['id'], 5)['result'] == 'default'
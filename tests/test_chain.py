@@ -0,0 +1,41 @@
+import importlib
+import threading
+
+import pytest
+from web3 import Web3
+
+import chain
+from positions import PositionReader
+
+
+@pytest.fixture
+def cold_chain(monkeypatch):
+    """chain as a fresh process sees it: no client, registry or Multicall built yet"""
+    monkeypatch.setenv('BASE_SEPOLIA_RPC', 'http://127.0.0.1:1')
+    yield importlib.reload(chain)
+    importlib.reload(chain)
+
+
+def _within(seconds, func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert result, f"{func.__name__} did not return within {seconds}s"
+    return result[0]
+
+
+def test_get_registry_from_cold_state(cold_chain):
+    registry = _within(5, cold_chain.get_registry)
+    assert registry.get('usdc').address == Web3.to_checksum_address(cold_chain.USDC_ADDRESS)
+    assert cold_chain.get_registry() is registry
+
+
+def test_get_multicall_from_cold_state(cold_chain):
+    multicall = _within(5, cold_chain.get_multicall)
+    assert multicall.w3 is cold_chain.get_web3()
+
+
+def test_position_reader_builds_nothing_until_used(cold_chain):
+    PositionReader()
+    assert cold_chain._w3 is None and cold_chain._registry is None and cold_chain._multicall is None
@@ -0,0 +1,141 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from crossmint import CrossmintClient
+
+TEMPLATE = 'template-1'
+
+
+class CredentialServer:
+    """Local stand-in for the Crossmint credentials API.
+
+    `script[email]` lists (status, headers, delay) answers to give that
+    recipient before issuing; every request is recorded with its
+    idempotency key and arrival time.
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                email = body['recipient'].split(':')[1]
+                with server._lock:
+                    server.requests.append((email, self.headers['x-idempotency-key'], time.monotonic()))
+                    answers = server.script.get(email) or []
+                    status, headers, delay = answers.pop(0) if answers else (200, {}, 0)
+                time.sleep(delay)
+
+                if self.path != f'/api/v1-alpha1/credentials/templates/{TEMPLATE}/vcs':
+                    status = 404
+                payload = {'id': f'vc-{email}', 'subject': body['credential']['subject']} if status == 200 else {}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def attempts(self, email):
+        return [(key, at) for sent, key, at in self.requests if sent == email]
+
+
+@pytest.fixture
+def server():
+    server = CredentialServer()
+    yield server
+    server.httpd.shutdown()
+
+
+def _client(server, **kwargs):
+    kwargs.setdefault('backoff_factor', 0)
+    return CrossmintClient('key', TEMPLATE, base_url=server.url, timeout=(2.0, 5.0), **kwargs)
+
+
+def test_rate_limits_and_server_errors_are_retried_with_one_key(server):
+    server.script['ada@example.com'] = [(429, {}, 0), (503, {}, 0), (502, {}, 0)]
+
+    credential = _client(server).issue('ada@example.com', {'score': 80}, idempotency_key='key-1')
+
+    assert credential == {'id': 'vc-ada@example.com', 'subject': {'score': 80}}
+    assert [key for key, _ in server.attempts('ada@example.com')] == ['key-1'] * 4
+
+
+def test_retry_after_is_honoured(server):
+    server.script['ada@example.com'] = [(429, {'Retry-After': '1'}, 0)]
+
+    _client(server).issue('ada@example.com', {})
+
+    (first_key, first), (second_key, second) = server.attempts('ada@example.com')
+    assert second - first >= 0.9
+    # A generated key is reused on the retry too
+    assert first_key == second_key
+
+
+def test_exhausted_retries_raise_the_last_status(server):
+    server.script['ada@example.com'] = [(500, {}, 0)] * 3
+
+    with pytest.raises(requests.HTTPError) as error:
+        _client(server, max_retries=2).issue('ada@example.com', {})
+
+    assert error.value.response.status_code == 500
+    assert len(server.attempts('ada@example.com')) == 3
+
+
+def test_client_errors_are_not_retried(server):
+    server.script['ada@example.com'] = [(400, {}, 0)]
+
+    with pytest.raises(requests.HTTPError):
+        _client(server).issue('ada@example.com', {})
+    assert len(server.attempts('ada@example.com')) == 1
+
+
+def test_issue_many_keeps_recipient_order_and_reports_each_failure(server):
+    emails = [f'user{i}@example.com' for i in range(6)]
+    # The first answer arrives last, and one recipient is rejected outright
+    server.script[emails[0]] = [(200, {}, 0.3)]
+    server.script[emails[3]] = [(422, {}, 0)]
+    recipients = [{'email': email, 'subject': {'n': i}} for i, email in enumerate(emails)]
+    recipients[1]['idempotencyKey'] = 'mine'
+
+    results = _client(server).issue_many(recipients, max_workers=4)
+
+    assert [result['email'] for result in results] == emails
+    assert [result['success'] for result in results] == [True, True, True, False, True, True]
+    assert '422' in results[3]['error'] and 'credential' not in results[3]
+    assert results[5]['credential']['subject'] == {'n': 5}
+    assert results[1]['idempotencyKey'] == 'mine'
+    assert len({result['idempotencyKey'] for result in results}) == len(emails)
+
+
+def test_resending_a_partly_failed_batch_reuses_its_keys(server):
+    client = _client(server)
+    server.script['b@example.com'] = [(400, {}, 0)]
+    first = client.issue_many([{'email': email, 'subject': {}} for email in ('a@example.com', 'b@example.com')])
+
+    again = client.issue_many([{'email': r['email'], 'subject': {}, 'idempotencyKey': r['idempotencyKey']}
+                               for r in first])
+
+    assert [r['success'] for r in first] == [True, False]
+    assert all(r['success'] for r in again)
+    for result in first:
+        keys = [key for key, _ in server.attempts(result['email'])]
+        assert keys == [result['idempotencyKey']] * 2
@@ -0,0 +1,113 @@
+from history import ConversationHistory, SUMMARY_PREFIX, group_turns, summarize_turns
+
+
+def _ask(text):
+    return {'role': 'user', 'content': text}
+
+
+def _position_lookup(call_id, result):
+    """An assistant tool call and the tool's answer, as the agent loop records them"""
+    return [
+        {'role': 'assistant', 'content': None, 'tool_calls': [
+            {'id': call_id, 'type': 'function', 'function': {'name': 'get_position', 'arguments': '{}'}}
+        ]},
+        {'role': 'tool', 'tool_call_id': call_id, 'tool_name': 'get_position', 'content': result},
+    ]
+
+
+def test_short_conversations_are_sent_as_is():
+    history = ConversationHistory(token_budget=10_000)
+    messages = [_ask('What is my health factor?'), *_position_lookup('c1', '{"healthFactor": 3.1}'),
+                {'role': 'assistant', 'content': 'It is 3.1.'}]
+
+    history.extend(messages)
+
+    assert history.messages == messages
+    assert history.summary == ''
+
+
+def test_group_turns_keeps_tool_results_with_their_call():
+    messages = [_ask('hi'), *_position_lookup('c1', 'a'), *_position_lookup('c2', 'b')]
+    assert [[m['role'] for m in unit] for unit in group_turns(messages)] == [
+        ['user'], ['assistant', 'tool'], ['assistant', 'tool']
+    ]
+
+
+def test_summary_has_one_line_per_message():
+    units = group_turns([_ask('Supply   100\nUSDC'), *_position_lookup('c1', '{"supplied": 100}')])
+    assert summarize_turns(units).splitlines() == [
+        '- user: Supply 100 USDC',
+        '- assistant called get_position',
+        '- tool get_position returned: {"supplied": 100}',
+    ]
+
+
+def test_long_conversations_fold_the_oldest_turns_into_a_system_summary():
+    history = ConversationHistory(token_budget=600, keep_recent=2, max_summary_chars=800)
+    for i in range(20):
+        history.append(_ask(f'question {i} ' + 'padding ' * 50))
+
+    assert history.tokens() <= 600
+    summary = history.messages[0]
+    assert summary['role'] == 'system' and summary['content'] == SUMMARY_PREFIX + history.summary
+    # Everything dropped so far is summarized, newest last, right before the oldest kept turn
+    oldest_kept = int(history.turns[0]['content'].split()[1])
+    assert history.summary.splitlines()[-1].startswith(f'- user: question {oldest_kept - 1} ')
+    assert history.turns[-1]['content'].startswith('question 19 ')
+
+
+def test_recent_turns_survive_even_over_budget():
+    history = ConversationHistory(token_budget=10, keep_recent=3)
+    history.extend([_ask(f'question {i}') for i in range(5)])
+    assert [m['content'] for m in history.turns] == ['question 2', 'question 3', 'question 4']
+
+
+def test_trimming_never_leaves_an_orphaned_tool_result():
+    history = ConversationHistory(token_budget=150, keep_recent=2)
+    for i in range(10):
+        history.append(_ask(f'check {i}'))
+        history.extend(_position_lookup(f'c{i}', 'x' * 100))
+
+    assert history.turns[0]['role'] != 'tool'
+    for unit in group_turns(history.turns):
+        if unit[0].get('tool_calls'):
+            assert [m['role'] for m in unit] == ['assistant', 'tool']
+
+
+def test_old_tool_results_are_truncated_without_touching_the_originals():
+    lookup = _position_lookup('c1', 'y' * 50)
+    history = ConversationHistory(token_budget=100_000, keep_recent=1, max_tool_chars=10)
+
+    history.extend(lookup)
+    assert history.turns[1]['content'] == 'y' * 50  # still recent
+    history.append(_ask('thanks'))
+
+    assert history.turns[1]['content'] == 'y' * 10 + '… [truncated 40 chars]'
+    assert lookup[1]['content'] == 'y' * 50
+
+
+def test_custom_summarizer_receives_the_previous_summary_and_dropped_messages():
+    calls = []
+
+    def summarizer(previous, messages):
+        calls.append((previous, [m['content'] for m in messages]))
+        return f'summary {len(calls)}'
+
+    history = ConversationHistory(token_budget=30, keep_recent=1, summarizer=summarizer)
+    for i in range(3):
+        history.append(_ask(f'question {i} ' + 'padding ' * 20))
+
+    assert [previous for previous, _ in calls] == ['', 'summary 1']
+    assert [dropped[0].split()[1] for _, dropped in calls] == ['0', '1']
+    assert history.summary == 'summary 2'
+
+
+def test_summary_cap_drops_whole_lines_from_the_oldest_end():
+    history = ConversationHistory(token_budget=10, keep_recent=1, max_summary_chars=300)
+    for i in range(30):
+        history.append(_ask(f'question {i} ' + 'padding ' * 5))
+
+    assert len(history.summary) <= 300
+    assert all(line.startswith('- user: question ') for line in history.summary.splitlines())
+    assert 'question 28 ' in history.summary
+    assert 'question 0 ' not in history.summary
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+import pytest
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+
+from chain import USDC_ADDRESS
+from contracts import load_abi, AAVE_POOL_EVENTS
+from indexer import (
+    ActivityIndexer, EventDecoder, ReputationIndex, CHECKPOINT_FILE, COLUMNS,
+    SUPPLY, BORROW, REPAY, LIQUIDATED, TRANSFER_OUT, TRANSFER_IN, BLOCKS_PER_DAY
+)
+
+ALICE = '0x' + 'aa' * 20
+# Ends in a zero byte, which numpy's S20 dtype strips
+BOB = '0x' + 'bb' * 19 + '00'
+ZERO = '0x' + '00' * 20
+WETH = '0x' + '42' * 20
+ABI = load_abi('aave_v3.json', AAVE_POOL_EVENTS) + load_abi('usdc.json', ['Transfer'])
+
+
+def _raw(address):
+    return bytes.fromhex(address[2:])
+
+
+def _log(name, block=1, log_index=0, **values):
+    """A raw log for event `name`, shaped the way eth_getLogs returns it"""
+    event = next(entry for entry in ABI if entry.get('type') == 'event' and entry['name'] == name)
+    topics = [event_abi_to_log_topic(event)]
+    data_types, data_values = [], []
+    for param in event['inputs']:
+        if param['indexed']:
+            topics.append(encode([param['type']], [values[param['name']]]))
+        else:
+            data_types.append(param['type'])
+            data_values.append(values[param['name']])
+    return {'topics': topics, 'data': encode(data_types, data_values), 'blockNumber': block, 'logIndex': log_index}
+
+
+def _supply(account, amount, block, reserve=USDC_ADDRESS):
+    return _log('Supply', block, reserve=reserve, user=account, onBehalfOf=account, amount=amount, referralCode=0)
+
+
+def _rows(*rows):
+    blocks, kinds, accounts = zip(*rows)
+    return {
+        'block': np.array(blocks, dtype=np.uint64),
+        'log_index': np.zeros(len(rows), dtype=np.uint32),
+        'kind': np.array(kinds, dtype=np.uint8),
+        'account': np.array([_raw(account) for account in accounts], dtype='S20'),
+        'token': np.array([_raw(USDC_ADDRESS)] * len(rows), dtype='S20'),
+        'amount': np.ones(len(rows), dtype=np.float64),
+    }
+
+
+class LogNode:
+    """Serves eth_getLogs from a fixed list, refusing ranges wider than `max_span` blocks"""
+
+    def __init__(self, logs, head, max_span=None):
+        self.logs = logs
+        self.block_number = head
+        self.max_span = max_span
+        self.ranges = []
+        self.codec = Web3().codec
+        self.eth = self
+
+    @staticmethod
+    def to_checksum_address(address):
+        return Web3.to_checksum_address(address)
+
+    def get_logs(self, params):
+        start, end = params['fromBlock'], params['toBlock']
+        self.ranges.append((start, end))
+        if self.max_span is not None and end - start + 1 > self.max_span:
+            raise ValueError('query returned more than 10000 results')
+        return [log for log in self.logs if start <= log['blockNumber'] <= end]
+
+
+class Decimals:
+    def token_decimals(self, address):
+        return 6 if address.lower() == USDC_ADDRESS.lower() else 18
+
+
+def _indexer(directory, node, **kwargs):
+    kwargs.setdefault('start_block', 1)
+    kwargs.setdefault('confirmations', 0)
+    return ActivityIndexer(str(directory), w3=node, registry=Decimals(), **kwargs)
+
+
+def test_decoder_reads_indexed_fields_as_raw_addresses():
+    decoder = EventDecoder(Web3().codec, ABI)
+
+    name, fields = decoder.decode(_log(
+        'Borrow', reserve=USDC_ADDRESS, user=ALICE, onBehalfOf=BOB, amount=5_000_000,
+        interestRateMode=2, borrowRate=10 ** 25, referralCode=0
+    ))
+
+    assert name == 'Borrow'
+    assert (fields['reserve'], fields['onBehalfOf']) == (_raw(USDC_ADDRESS), _raw(BOB))
+    assert (fields['user'], fields['amount'], fields['borrowRate']) == (ALICE, 5_000_000, 10 ** 25)
+    assert decoder.decode({'topics': [b'\x00' * 32], 'data': '0x'}) is None
+    assert len(decoder.topics) == len(AAVE_POOL_EVENTS) + 1
+
+
+def test_index_counts_and_active_blocks_accumulate_across_batches():
+    index = ReputationIndex(capacity=1)
+    # Rows within a batch needn't be in block order
+    index.apply(_rows((500, SUPPLY, ALICE), (300, SUPPLY, ALICE), (400, BORROW, BOB)))
+    index.apply(_rows((200, REPAY, ALICE), (900, REPAY, ALICE)))
+    index.apply({column: np.array([]) for column in COLUMNS})
+
+    alice, bob = index.ids[_raw(ALICE)], index.ids[_raw(BOB)]
+    assert len(index) == 2
+    assert list(index.counts[alice, [SUPPLY, REPAY]]) == [2, 2]
+    assert (index.first_block[alice], index.last_block[alice]) == (200, 900)
+    assert (index.first_block[bob], index.last_block[bob]) == (400, 400)
+
+
+def test_scores_reward_repayment_and_penalize_liquidation():
+    index = ReputationIndex()
+    index.apply(_rows(
+        (1, SUPPLY, ALICE), (2, BORROW, ALICE), (BLOCKS_PER_DAY * 90, REPAY, ALICE),
+        (1, SUPPLY, BOB), (2, BORROW, BOB), (3, LIQUIDATED, BOB),
+    ))
+
+    alice, bob, unknown = index.scores([ALICE, Web3.to_checksum_address(BOB), '0x' + 'cc' * 20])
+
+    assert alice['indexed'] and bob['indexed']
+    assert (alice['components']['tenure'], alice['components']['repayment']) == (1.0, 1.0)
+    assert bob['components']['liquidations'] == 1
+    assert alice['score'] > bob['score']
+    assert unknown == {'address': '0x' + 'cc' * 20, 'score': 0, 'indexed': False}
+
+
+def test_sync_indexes_confirmed_blocks_in_token_units(tmp_path):
+    node = LogNode([
+        _supply(ALICE, 250 * 10 ** 6, block=3),
+        _supply(ALICE, 2 * 10 ** 18, block=4, reserve=WETH),
+        # A mint has no sender to credit
+        _log('Transfer', block=5, **{'from': ZERO, 'to': BOB, 'value': 7 * 10 ** 6}),
+        _log('Transfer', block=6, **{'from': BOB, 'to': ALICE, 'value': 10 ** 6}),
+        _supply(BOB, 10 ** 6, block=9),
+    ], head=10)
+    indexer = _indexer(tmp_path, node, confirmations=2)
+
+    assert indexer.sync() == 5
+    assert indexer.indexed_block == 8
+
+    index = indexer.index
+    alice, bob = index.ids[_raw(ALICE)], index.ids[_raw(BOB)]
+    assert index.volume[alice, SUPPLY] == 252.0
+    assert index.counts[alice, TRANSFER_IN] == 1
+    assert (index.counts[bob, TRANSFER_IN], index.counts[bob, TRANSFER_OUT]) == (1, 1)
+    assert index.counts[bob, SUPPLY] == 0
+
+
+def test_sync_halves_the_range_when_get_logs_fails(tmp_path):
+    node = LogNode([_supply(ALICE, 10 ** 6, block=b) for b in range(1, 101)], head=100, max_span=25)
+    indexer = _indexer(tmp_path, node, initial_range=100, min_range=10)
+
+    assert indexer.sync() == 100
+
+    assert node.ranges[:3] == [(1, 100), (1, 50), (1, 25)]
+    # The failed sizes stay off limits while the ceiling lasts
+    assert max(end - start + 1 for start, end in node.ranges[3:]) <= 25
+    assert node.ranges[-1][1] == 100
+
+
+def test_sync_gives_up_below_the_minimum_range(tmp_path):
+    indexer = _indexer(tmp_path, LogNode([], head=100, max_span=5), initial_range=20, min_range=10)
+    with pytest.raises(ValueError):
+        indexer.sync()
+
+
+def test_restart_rebuilds_from_segments_and_resumes_after_the_checkpoint(tmp_path):
+    node = LogNode([_supply(ALICE, 10 ** 6, block=2), _supply(BOB, 10 ** 6, block=5)], head=6)
+    indexer = _indexer(tmp_path, node)
+    indexer.sync()
+    indexer.flush()
+
+    with open(tmp_path / CHECKPOINT_FILE) as f:
+        checkpoint = json.load(f)
+    assert checkpoint['block'] == 6 and len(checkpoint['segments']) == 1
+
+    node.logs.append(_supply(ALICE, 10 ** 6, block=8))
+    node.block_number, node.ranges = 9, []
+    restarted = _indexer(tmp_path, node)
+
+    assert restarted.sync() == 1
+    assert node.ranges == [(7, 9)]
+    assert restarted.scores([ALICE, BOB])['scores'][0]['actions']['supply'] == 2
+    assert restarted.scores([ALICE, BOB])['scores'][1]['indexed']
@@ -0,0 +1,42 @@
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Metric, Registry, NAMESPACE, registry
+
+
+def test_metric_needs_samples():
+    with pytest.raises(TypeError):
+        Metric('bare', 'No samples')
+
+
+def test_registry_renders_the_exposition_format():
+    metrics = Registry()
+    requests = metrics.register(Counter('requests_total', 'Requests', ('route',), namespace='app'))
+    depth = metrics.register(Gauge('depth', 'Depth'))
+    latency = metrics.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+
+    requests.inc(route='/a "b"')
+    requests.inc(2, route='/a "b"')
+    depth.set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    assert metrics.render().splitlines() == [
+        '# HELP app_requests_total Requests',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{route="/a \\"b\\""} 3',
+        '# HELP depth Depth',
+        '# TYPE depth gauge',
+        'depth 7',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        'latency_seconds_sum 0.55',
+        'latency_seconds_count 2',
+    ]
+
+
+def test_app_metrics_share_the_namespace():
+    names = [line.split()[2] for line in registry.render().splitlines() if line.startswith('# TYPE')]
+    assert names and all(name.startswith(NAMESPACE + '_') for name in names)
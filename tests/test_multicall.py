@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from eth_abi import encode
+from web3 import AsyncWeb3, Web3
+
+from fake_rpc import serve
+from multicall import Call, CallResult, Multicall, MULTICALL3_ADDRESS, abi_output_types
+from contracts import load_abi, USDC_METHODS
+
+USDC = '0x036CbD53842c5426634e7929541eC2318f3dCF7e'
+AAVE_POOL = '0x07eA79F68B2B3df564D0A34F8e19D9B1e339814b'
+ACCOUNT = '0x' + '11' * 20
+BALANCE = 1_000 * 10 ** 6
+
+
+@pytest.fixture(scope='module')
+def node():
+    # Blocks an hour apart, so every call in a test sees the same block
+    server, chain, url = serve(block_time=3600)
+    yield chain, url
+    server.shutdown()
+
+
+def test_output_types_flatten_structs():
+    abi = {'outputs': [
+        {'type': 'tuple[]', 'components': [
+            {'type': 'address'},
+            {'type': 'tuple', 'components': [{'type': 'uint256'}, {'type': 'bool'}]},
+        ]},
+        {'type': 'uint8'},
+    ]}
+    assert abi_output_types(abi) == ['(address,(uint256,bool))[]', 'uint8']
+
+
+def test_prepare_encodes_a_bound_contract_function():
+    usdc = Web3().eth.contract(address=USDC, abi=load_abi('usdc.json', USDC_METHODS))
+
+    call = Multicall.prepare(usdc.functions.balanceOf(ACCOUNT))
+
+    assert call.target == USDC
+    assert call.data == bytes.fromhex('70a08231') + encode(['address'], [ACCOUNT])
+    assert (call.output_types, call.label) == (['uint256'], 'balanceOf')
+    # Already prepared calls pass through untouched
+    assert Multicall.prepare(call) is call
+
+
+def test_block_number_leads_every_batch_and_must_not_fail():
+    multicall = Multicall(Web3())
+
+    encoded = multicall.encode([Call(USDC, b'\x01', ['uint256'], 'a'), Call(AAVE_POOL, b'\x02', ['uint256'], 'b')])
+
+    assert encoded[0][:2] == (Web3.to_checksum_address(MULTICALL3_ADDRESS), False)
+    assert encoded[1:] == [(USDC, True, b'\x01'), (AAVE_POOL, True, b'\x02')]
+
+
+def test_failed_empty_or_undecodable_results_become_failures():
+    multicall = Multicall(Web3())
+    calls = [Call(USDC, b'', ['uint256'], 'reverted'), Call(USDC, b'', ['uint256'], 'empty'),
+             Call(USDC, b'', ['uint256'], 'garbled'), Call(USDC, b'', ['uint256', 'address'], 'pair')]
+
+    result = multicall.decode(calls, [
+        (True, encode(['uint256'], [42])),
+        (False, b''),
+        (True, b''),
+        (True, b'\x01'),
+        (True, encode(['uint256', 'address'], [8, ACCOUNT])),
+    ])
+
+    assert result.block_number == 42
+    assert result.results == [CallResult(False, None)] * 3 + [CallResult(True, (8, ACCOUNT))]
+
+
+def test_aggregate_sends_one_eth_call_for_the_whole_batch(node):
+    chain, url = node
+    w3 = Web3(Web3.HTTPProvider(url))
+    usdc = w3.eth.contract(address=USDC, abi=load_abi('usdc.json', USDC_METHODS))
+    before = chain.stats()['calls'].get('eth_call', 0)
+
+    result = Multicall(w3).aggregate([
+        usdc.functions.balanceOf(ACCOUNT),
+        Call(USDC, b'\xde\xad\xbe\xef', ['uint256'], 'unknown'),
+        usdc.functions.decimals(),
+    ])
+
+    assert chain.stats()['calls']['eth_call'] == before + 1
+    assert result.block_number == chain.block_number
+    # The unknown selector reverts on its own without sinking the calls around it
+    assert result.results == [CallResult(True, BALANCE), CallResult(False, None), CallResult(True, 6)]
+
+
+def test_aggregate_async_matches_aggregate(node):
+    chain, url = node
+
+    async def read():
+        w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(url))
+        usdc = w3.eth.contract(address=USDC, abi=load_abi('usdc.json', USDC_METHODS))
+        return await Multicall(w3).aggregate_async([usdc.functions.balanceOf(ACCOUNT)])
+
+    result = asyncio.run(read())
+
+    assert result.block_number == chain.block_number
+    assert result.results == [CallResult(True, BALANCE)]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from web3.exceptions import Web3RPCError
+
+from nonces import NonceManager
+
+
+def _submit(*errors):
+    """A submit callable that raises `errors` in turn, then succeeds, recording every nonce it was given"""
+    sent = []
+    pending = list(errors)
+
+    def submit(nonce):
+        sent.append(nonce)
+        if pending:
+            raise pending.pop(0)
+        return f'0x{nonce}'
+
+    return submit, sent
+
+
+def test_nonces_are_allocated_locally_after_the_first_fetch():
+    fetches = []
+    manager = NonceManager('0xabc')
+    submit, sent = _submit()
+
+    for _ in range(3):
+        manager.send(submit, lambda: fetches.append(1) or 7)
+
+    assert sent == [7, 8, 9]
+    assert len(fetches) == 1
+
+
+def test_nonce_too_low_resyncs_and_retries():
+    chain_nonce = iter([5, 9])
+    manager = NonceManager('0xabc')
+    submit, sent = _submit(Web3RPCError('nonce too low'))
+
+    assert manager.send(submit, lambda: next(chain_nonce)) == '0x9'
+    assert sent == [5, 9]
+
+
+def test_already_known_is_not_resubmitted():
+    manager = NonceManager('0xabc')
+    submit, sent = _submit(Web3RPCError('already known'))
+
+    with pytest.raises(Web3RPCError):
+        manager.send(submit, lambda: 3)
+
+    # The node may hold this transaction already, so the counter resyncs instead of handing 3 out again
+    assert sent == [3]
+    assert manager.needs_sync
+
+
+def test_rejected_transaction_gives_its_nonce_back():
+    manager = NonceManager('0xabc')
+    submit, sent = _submit(Web3RPCError('insufficient funds for gas'))
+
+    with pytest.raises(Web3RPCError):
+        manager.send(submit, lambda: 3)
+    manager.send(submit, lambda: 100)
+
+    assert sent == [3, 3]
+
+
+def test_timeout_resyncs_instead_of_reusing_the_nonce():
+    manager = NonceManager('0xabc')
+    submit, sent = _submit(TimeoutError())
+
+    with pytest.raises(TimeoutError):
+        manager.send(submit, lambda: 3)
+    assert sent == [3]
+    assert manager.needs_sync
+
+
+def test_asend_matches_send():
+    manager = NonceManager('0xabc')
+    submit, sent = _submit(Web3RPCError('already known'))
+
+    async def asubmit(nonce):
+        return submit(nonce)
+
+    async def fetch():
+        return 3
+
+    with pytest.raises(Web3RPCError):
+        asyncio.run(manager.asend(asubmit, fetch))
+    assert sent == [3]
+    assert manager.needs_sync
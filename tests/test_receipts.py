@@ -0,0 +1,108 @@
+import time
+
+from jobs import JobStore
+from receipts import ReceiptWatcher
+
+RECEIPT = {'status': '0x1', 'blockNumber': '0x10', 'gasUsed': '0x5208'}
+
+
+class FakeEth:
+    def __init__(self, receipts, down=False):
+        self.receipts = receipts
+        self.down = down
+        self.single_calls = []
+
+    @property
+    def block_number(self):
+        if self.down:
+            raise ConnectionError('node is down')
+        return 1
+
+    def get_transaction_receipt(self, tx_hash):
+        self.single_calls.append(tx_hash)
+        receipt = self.receipts.get(tx_hash)
+        if receipt is None:
+            raise LookupError(tx_hash)
+        return receipt
+
+
+class FakeProvider:
+    def __init__(self, receipts, fail=False):
+        self.receipts = receipts
+        self.fail = fail
+        self.batches = 0
+
+    def make_batch_request(self, requests):
+        self.batches += 1
+        if self.fail:
+            raise ConnectionError('batch requests are not supported')
+        return [{'result': self.receipts.get(params[0])} for _, params in requests]
+
+
+class FakeWeb3:
+    def __init__(self, receipts, fail_batch=False, down=False):
+        self.eth = FakeEth(receipts, down)
+        self.provider = FakeProvider(receipts, fail_batch)
+
+
+def _watcher(w3, **kwargs):
+    jobs = JobStore()
+    return ReceiptWatcher(w3, jobs, **kwargs), jobs
+
+
+def _wait_while_pending(jobs, job_id, seconds=5):
+    deadline = time.monotonic() + seconds
+    while jobs.get(job_id)['status'] == 'pending' and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_batch_receipts_confirm_jobs():
+    w3 = FakeWeb3({'0xa': RECEIPT})
+    watcher, jobs = _watcher(w3)
+    confirmed, pending = jobs.create(), jobs.create()
+    watcher._pending = {'0xa': {'job_id': confirmed['id'], 'since': time.monotonic()},
+                        '0xb': {'job_id': pending['id'], 'since': time.monotonic()}}
+
+    watcher._check(['0xa', '0xb'])
+
+    job = jobs.get(confirmed['id'])
+    assert (job['status'], job['blockNumber'], job['gasUsed']) == ('confirmed', 16, 21000)
+    assert jobs.get(pending['id'])['status'] == 'pending'
+    assert list(watcher._pending) == ['0xb']
+    assert w3.eth.single_calls == []
+
+
+def test_failed_batch_falls_back_to_one_request_per_hash():
+    w3 = FakeWeb3({'0xa': {'status': 0, 'blockNumber': 16, 'gasUsed': 50_000}}, fail_batch=True)
+    watcher, jobs = _watcher(w3)
+    job = jobs.create()
+    watcher._pending = {'0xa': {'job_id': job['id'], 'since': time.monotonic()}}
+
+    watcher._check(['0xa'])
+
+    assert w3.provider.batches == 1
+    assert w3.eth.single_calls == ['0xa']
+    assert jobs.get(job['id'])['status'] == 'failed'
+
+
+def test_timeouts_end_jobs_while_the_node_is_failing():
+    watcher, jobs = _watcher(FakeWeb3({}, down=True), poll_interval=0.01, timeout=0.05)
+    job = jobs.create()
+
+    watcher.track('0xa', job['id'])
+    _wait_while_pending(jobs, job['id'])
+
+    assert jobs.get(job['id'])['status'] == 'timeout'
+    assert watcher.pending_count == 0
+
+
+def test_timeouts_end_jobs_when_no_new_block_arrives():
+    w3 = FakeWeb3({})
+    watcher, jobs = _watcher(w3, poll_interval=0.01, timeout=0.05)
+    job = jobs.create()
+
+    watcher.track('0xa', job['id'])
+    _wait_while_pending(jobs, job['id'])
+
+    # Only the first poll saw a new block; the timeout still fired on a later one
+    assert jobs.get(job['id'])['status'] == 'timeout'
@@ -0,0 +1,120 @@
+from contextvars import ContextVar
+import threading
+
+import pytest
+
+from wallets import WalletPool, TransactionLane, current_wallet_id, use_wallet
+
+SESSIONS = [f'session-{i}' for i in range(500)]
+request_id: ContextVar[str] = ContextVar('request_id', default='')
+
+
+class Importer:
+    """Counts imports per wallet and hands back a stand-in wallet"""
+
+    def __init__(self):
+        self.imported = []
+
+    def __call__(self, wallet_id, data):
+        self.imported.append(wallet_id)
+        return {'id': wallet_id, 'seed': data['seed']}
+
+
+def _pool(ids, default_id=None, importer=None):
+    return WalletPool({wallet_id: {'seed': f'seed-{wallet_id}'} for wallet_id in ids}, default_id, importer or Importer())
+
+
+def test_sessions_keep_their_wallet_whatever_the_config_order():
+    first, second = _pool(['a', 'b', 'c']), _pool(['c', 'a', 'b'])
+    assert [first.route(s) for s in SESSIONS] == [second.route(s) for s in SESSIONS]
+
+
+def test_sessions_spread_over_every_wallet():
+    routed = [_pool(['a', 'b', 'c']).route(s) for s in SESSIONS]
+    assert all(routed.count(wallet_id) > len(SESSIONS) / 6 for wallet_id in 'abc')
+
+
+def test_adding_a_wallet_only_moves_sessions_onto_it():
+    before, after = _pool(['a', 'b', 'c']), _pool(['a', 'b', 'c', 'd'])
+    moved = [s for s in SESSIONS if after.route(s) != before.route(s)]
+    assert moved and all(after.route(s) == 'd' for s in moved)
+    assert _pool([]).route('session') is None
+
+
+def test_get_follows_the_context_and_defaults_to_the_configured_wallet():
+    pool = _pool(['a', 'b', 'c'], default_id='b')
+
+    assert pool.ids == ['b', 'a', 'c']
+    assert pool.get()['id'] == 'b'
+    with use_wallet('c'):
+        assert pool.get()['seed'] == 'seed-c'
+    with use_wallet(None):
+        assert pool.current_id() == 'b'
+    with pytest.raises(KeyError, match='Unknown wallet'):
+        pool.get('z')
+    with pytest.raises(KeyError, match='WALLET_DATA'):
+        _pool([]).get()
+
+
+def test_concurrent_first_use_imports_a_wallet_once():
+    importer = Importer()
+    pool = _pool(['a'], importer=importer)
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        pool.get('a')
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert importer.imported == ['a']
+    assert pool.ready('a') and not pool.ready('b')
+
+
+def test_override_answers_every_get_without_importing():
+    importer = Importer()
+    pool = _pool(['a'], importer=importer)
+    pool.set_override('replay')
+    assert (pool.get('a'), pool.ready()) == ('replay', True)
+    assert importer.imported == []
+
+
+def test_lane_runs_in_submission_order_with_the_callers_context():
+    lane = TransactionLane('a')
+    seen = []
+    token = request_id.set('req-1')
+    try:
+        futures = [lane.submit(lambda i=i: seen.append((i, current_wallet_id.get(), request_id.get())))
+                   for i in range(20)]
+    finally:
+        request_id.reset(token)
+    for future in futures:
+        future.result()
+
+    assert seen == [(i, 'a', 'req-1') for i in range(20)]
+
+
+def test_serialized_tools_run_on_the_current_wallets_lane():
+    pool = _pool(['a', 'b'])
+    threads = []
+
+    @pool.serialized
+    def send():
+        threads.append(threading.current_thread().name)
+        # A tool that calls another serialized tool runs it inline instead of deadlocking
+        return nested() if len(threads) == 1 else current_wallet_id.get()
+
+    @pool.serialized
+    def nested():
+        return send()
+
+    with use_wallet('b'):
+        assert send() == 'b'
+    assert len(set(threads)) == 1 and threads[0].startswith('lane-b')
+
+    # Without wallets there is no lane to serialize on
+    assert _pool([]).serialized(lambda: 'inline')() == 'inline'